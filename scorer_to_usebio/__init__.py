@@ -1,4 +1,9 @@
 from .convert import Event, InvalidEventType, InvalidResultsException, Session, convert, using_lxml
+from .converter import ConversionResult, Converter
+from .parallel import convert_parallel
+from .metadata import scan
+from .metrics import Metrics
+from .stream import SessionBuilder, convert_stream
 
 try:
     from scorer_to_usebio.qt import main as gui
@@ -12,4 +17,5 @@ except ImportError:
         pip = Path(sys.executable).parent / "pip"
         print("{} install PyQt5".format(pip))
 
-__all__ = [Event, InvalidEventType, InvalidResultsException, Session, convert, gui, using_lxml]
+__all__ = [ConversionResult, Converter, Event, InvalidEventType, InvalidResultsException, Metrics, Session, SessionBuilder, convert, convert_parallel,
+           convert_stream, gui, scan, using_lxml]
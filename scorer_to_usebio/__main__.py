@@ -1,8 +1,20 @@
 import argparse
 import errno
+import importlib
+import logging
+import os
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import JOURNAL_NAME, Journal, convert_batch, convert_pipelined
 from .convert import convert, using_lxml
+from .converter import Converter
+from .harden import DEFAULT_LIMITS
+from .memory import MemoryReport, convert_file, should_stream
+from .metrics import Metrics, MetricsExporter, serve_metrics
+from .parallel import convert_parallel
+from .stream import convert_stream
 
 def swallow_errors(callable, *args):
     try:
@@ -15,14 +27,35 @@ def swallow_errors(callable, *args):
         else:
             raise
 
+logger = logging.getLogger(__name__)
+
+MEGABYTE = 1024 * 1024
+
 def include_dtd(opts):
     if using_lxml:
         return opts.dtd
     else:
         return False
 
-def process_file(opts, file):
-    converted = convert(file, include_dtd(opts))[1]
+def process_file(opts, file, executor=None):
+    report = MemoryReport() if opts.memory_report else None
+    streaming = False
+    if file != '-' and opts.max_memory and should_stream(file, opts.max_memory * MEGABYTE):
+        logger.warning("streaming %s: converting it whole would likely need more than %d MB",
+                       file, opts.max_memory)
+        streaming = True
+
+    if file == '-':
+        stdin = sys.stdin.buffer if hasattr(sys.stdin, 'buffer') else sys.stdin
+        converted = convert_stream(stdin, include_dtd(opts))[1]
+    elif streaming or report is not None:
+        converted = convert_file(file, include_dtd(opts), streaming, report)[1]
+    elif executor:
+        converted = convert_parallel(file, include_dtd(opts), executor)[1]
+    else:
+        converted = convert(file, include_dtd(opts))[1]
+    if report is not None and report.phases:
+        print('memory used converting {}:\n{}'.format(file, report.format()), file=sys.stderr)
     params = {
         'encoding': 'utf-8'
     }
@@ -35,18 +68,145 @@ def process_file(opts, file):
         converted.write(sys.stdout, **params)
     sys.stdout.flush()
 
+def pretty(opts):
+    if using_lxml:
+        return opts.pretty
+    else:
+        return False
+
+def process_batch(opts):
+
+    # Batches may come from anywhere, so are always parsed safely
+    converter = Converter(include_dtd(opts), pretty(opts), pool='process', workers=opts.jobs,
+                          limits=DEFAULT_LIMITS, cpu_limit=opts.cpu_limit, wall_limit=opts.time_limit)
+    journal = Journal(opts.journal or os.path.join(opts.output, JOURNAL_NAME))
+    metrics = Metrics()
+    exporter = MetricsExporter(metrics, opts.metrics, opts.metrics_json, opts.metrics_interval)
+    server = serve_metrics(metrics, opts.metrics_port) if opts.metrics_port else None
+    exporter.start()
+    try:
+        if opts.read_ahead:
+            (converted, failed, skipped) = convert_pipelined(opts.files, opts.output, journal, converter, opts.resume,
+                                                             metrics=metrics, readahead=opts.read_ahead)
+        else:
+            (converted, failed, skipped) = convert_batch(opts.files, opts.output, journal, converter, opts.resume,
+                                                         metrics=metrics)
+    except KeyboardInterrupt:
+
+        # Finished files are in the journal: don't let the interruption pass
+        # silently, so it is clear the run needs resuming.
+        logger.warning("interrupted: use --resume to carry on")
+        sys.exit(130)
+    finally:
+        journal.close()
+        exporter.stop()
+        if server:
+            server.shutdown()
+    logger.info("converted %d file(s), %d failed, %d skipped", converted, failed, skipped)
+    if failed:
+        sys.exit(1)
+
 def process_files(opts):
-    for file in opts.files:
-        process_file(opts, file)
+    if opts.output:
+        process_batch(opts)
+    elif opts.jobs > 1:
+        with ProcessPoolExecutor(opts.jobs) as executor:
+            for file in opts.files:
+                process_file(opts, file, executor)
+    else:
+        for file in opts.files:
+            process_file(opts, file)
+
+# Command -> the module implementing it, which is only imported to run it
+COMMANDS = {
+    'anonymize': 'anonymize',
+    'archive': 'archive',
+    'benchmark': 'benchmark',
+    'diff': 'diff',
+    'export': 'export',
+    'aggregate': 'aggregate',
+    'ledger': 'ledger',
+    'lint': 'lint',
+    'live': 'live',
+    'regress': 'regression',
+    'scan': 'metadata',
+    'scorecards': 'scorecard',
+    'simultaneous': 'simultaneous',
+}
+
+# The main function of the command named by the first argument, if any. A file
+# of the same name is converted instead, as it would be if there were no such
+# command.
+def get_command(args):
+    if not args or args[0] not in COMMANDS or os.path.exists(args[0]):
+        return None
+    return importlib.import_module('.' + COMMANDS[args[0]], __package__).main
 
 def main():
-    parser = argparse.ArgumentParser(description='Convert scorer results file to USEBIO format.')
+
+    # Report warnings and errors on stderr (as they would be by default, if the
+    # package logger did not have a handler for capturing diagnostics), and
+    # the package's summaries of what was done
+    logging.basicConfig()
+    logging.getLogger('scorer_to_usebio').setLevel(logging.INFO)
+
+    command = get_command(sys.argv[1:])
+    if command is not None:
+        swallow_errors(command, sys.argv[2:])
+        swallow_errors(sys.stdout.close)
+        return
+
+    parser = argparse.ArgumentParser(
+        description='Convert scorer results file to USEBIO format.',
+        epilog='other commands: {} (use "<command> -h" for help)'.format(', '.join(sorted(COMMANDS))))
     if using_lxml:
         parser.add_argument('-p', '--pretty', help='pretty-print the XML', action='store_true')
         parser.add_argument('-d', '--dtd', help='add a DTD to the XML', action='store_true')
-    parser.add_argument('files', metavar='file', nargs='+', help='file(s) to convert')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes: converting files in parallel with --output, '
+                             'otherwise sections of each file')
+    parser.add_argument('-o', '--output', metavar='dir',
+                        help='write each converted file to this directory, journalling each as it is done')
+    parser.add_argument('--journal', metavar='file',
+                        help='journal of converted files (default: {} in the output directory)'.format(JOURNAL_NAME))
+    parser.add_argument('--resume', action='store_true',
+                        help='skip files already converted (per the journal) and unchanged since')
+    parser.add_argument('--read-ahead', metavar='N', type=int,
+                        help='with --output, read up to N files ahead (and write outputs behind) in the background, '
+                             'overlapping I/O with conversion: for files on slow storage, e.g. network shares')
+    parser.add_argument('files', metavar='file', nargs='+', help="file(s) to convert ('-' to read from stdin)")
+
+    parser.add_argument('--cpu-limit', metavar='seconds', type=float,
+                        help='with --output, stop converting any file which takes more than this much CPU time')
+    parser.add_argument('--time-limit', metavar='seconds', type=float,
+                        help='with --output, stop converting any file which takes longer than this')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='report the memory used by each phase of conversion (on stderr)')
+    parser.add_argument('--max-memory', metavar='MB', type=int,
+                        help='stream files which would likely need more than this much memory to convert whole')
+
+    metrics = parser.add_argument_group('metrics', 'Conversion metrics, for batches converted with --output.')
+    metrics.add_argument('--metrics', metavar='file', help='write metrics to this file, in Prometheus text format')
+    metrics.add_argument('--metrics-json', metavar='file', help='append JSON snapshots of the metrics to this file')
+    metrics.add_argument('--metrics-port', metavar='port', type=int,
+                         help='serve metrics in Prometheus format at http://localhost:<port>/metrics')
+    metrics.add_argument('--metrics-interval', metavar='seconds', type=float, default=15,
+                         help='how often to write metrics (default: %(default)s)')
 
     opts = parser.parse_args()
+    if opts.read_ahead is not None and opts.read_ahead < 1:
+        parser.error("--read-ahead must be at least 1")
+    if opts.output:
+        if not os.path.isdir(opts.output):
+            parser.error("output directory '{}' does not exist".format(opts.output))
+        if '-' in opts.files:
+            parser.error("stdin cannot be converted with --output")
+        if opts.memory_report or opts.max_memory:
+            parser.error("--memory-report and --max-memory cannot be used with --output")
+    elif opts.resume or opts.journal or opts.cpu_limit or opts.time_limit or opts.read_ahead:
+        parser.error("--resume, --journal, --read-ahead and time limits can only be used with --output")
+    elif opts.metrics or opts.metrics_json or opts.metrics_port:
+        parser.error("metrics are only available with --output")
     swallow_errors(process_files, opts)
     swallow_errors(sys.stdout.close)
 
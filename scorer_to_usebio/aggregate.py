@@ -0,0 +1,140 @@
+import argparse
+import copy
+import csv
+import sys
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from .convert import ET, Event, Pair, Score, Section, Session, build_tree, element, serialize, using_lxml
+
+# Pairs are matched across sessions by their players' NZB numbers (or names,
+# for players without one), in either order.
+def get_player_key(player):
+    return 'id:{}'.format(player.id) if player.has_id() else 'name:{}'.format(player.name.strip().lower())
+
+def get_pair_key(players):
+    return frozenset(get_player_key(player) for player in players)
+
+def read_event(path):
+    return Event.fromxml(ET.parse(path).getroot())
+
+# Read MPs carried forward (e.g. from a qualifying stage) from a CSV file with
+# nzb_no_1, nzb_no_2 and match_points (as "scored/available") columns, as
+# pair key -> [scored, available]
+def read_carry_forward(path):
+    carry_forward = {}
+    with open(path, 'r') as file:
+        for row in csv.DictReader(file):
+            key = frozenset('id:{}'.format(row[column].strip()) for column in ('nzb_no_1', 'nzb_no_2'))
+            (scored, available) = row['match_points'].split('/')
+            carry_forward[key] = [Decimal(scored), Decimal(available)]
+    return carry_forward
+
+# A multi-session event: the pairs' totals are cumulative over the sessions,
+# and the boards of each session are kept in their own section.
+class AggregateEvent(Event):
+    def get_usebio_xml(self):
+        (xml, event) = self.get_event_xml()
+        self.write_participants(event, list(self.session.pairs.values()))
+        for (sec_id, sdata) in self.session.sections.items():
+            section = element(event, 'SECTION')
+            section.set('SECTION_ID', sec_id)
+            self.write_boards(section, sdata.boards)
+        return xml
+
+# Combine the events for each session (in order) into one, in a single pass
+# over each session's pairs and travellers. Pairs are numbered in the order
+# they first appear, and their places calculated (once) over the whole field.
+# The club and date are taken from the first session.
+def aggregate(events, carry_forward=None, event_name=None):
+    if not events:
+        raise ValueError("no sessions to aggregate")
+
+    session = Session()
+    pairs = OrderedDict()
+    for (ii, event) in enumerate(events):
+
+        # Session pair ID -> combined pair ID, for the session's travellers
+        ids = {}
+        for pair in event.session.pairs.values():
+            key = get_pair_key(pair.players)
+            combined = pairs.get(key)
+            if combined is None:
+                combined = pairs[key] = new_pair(str(len(pairs) + 1), pair, carry_forward)
+            elif combined.dir != pair.dir:
+
+                # Pairs which sat a different direction in different sessions
+                # have no direction overall
+                combined.dir = None
+            combined.matchpoints[0] += pair.matchpoints[0]
+            combined.matchpoints[1] += pair.matchpoints[1]
+            combined.boards_played += pair.boards_played
+            ids[pair.id] = combined.id
+
+        for (sec_id, sdata) in sorted(event.session.sections.items()):
+            label = get_section_label(ii + 1, sec_id, len(event.session.sections))
+            section = session.sections[label] = Section(label, sdata.handicapped)
+            for (board, travellers) in sdata.boards.items():
+                section.boards[board] = [renumber(traveller, ids) for traveller in travellers]
+
+    for pair in pairs.values():
+        pair.score.total_score = pair.score.percentage = Session.percentage(*pair.matchpoints)
+        session.pairs[pair.id] = pair
+
+    first = events[0]
+    return AggregateEvent(first.club_name, first.club_id, first.scoring_type, first.board_scoring,
+                          event_name or first.event_name, first.event_date, session)
+
+# Sections are kept apart by prefixing their IDs with the number of the session
+# they were in (or just numbered by session, if each has only one)
+def get_section_label(session, sec_id, sections):
+    return str(session) if sections == 1 else '{}{}'.format(session, sec_id)
+
+# A pair for the whole event, starting from any carry-forward. Handicaps and
+# master points are per session, so aren't carried over.
+def new_pair(number, pair, carry_forward):
+    score = Score(None, None, None, Decimal(0), [])
+    combined = Pair(number, pair.dir, pair.players, score, '0/0', id=number)
+    if carry_forward:
+        (scored, available) = carry_forward.get(get_pair_key(pair.players), (0, 0))
+        combined.matchpoints = [Decimal(scored), Decimal(available)]
+    return combined
+
+def renumber(traveller, ids):
+    traveller = copy.copy(traveller)
+    traveller.ns = ids.get(traveller.ns, traveller.ns)
+    traveller.ew = ids.get(traveller.ew, traveller.ew)
+    return traveller
+
+# Read the sessions in parallel, then combine them
+def aggregate_files(files, executor, carry_forward=None, event_name=None):
+    events = list(executor.map(read_event, files))
+    return aggregate(events, carry_forward, event_name)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio aggregate',
+        description='Combine the results of several sessions into a single USEBIO event, with overall totals and places.')
+    parser.add_argument('-o', '--output', metavar='file', help='write the event to this file (default: stdout)')
+    parser.add_argument('-n', '--name', help='event name (default: that of the first session)')
+    parser.add_argument('-c', '--carry-forward', metavar='file',
+                        help='CSV file of MPs carried forward, with nzb_no_1, nzb_no_2 and match_points columns')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of sessions to read in parallel (default: one per CPU)')
+    if using_lxml:
+        parser.add_argument('-p', '--pretty', help='pretty-print the XML', action='store_true')
+    parser.add_argument('files', metavar='file', nargs='+', help='results file for each session, in order')
+
+    opts = parser.parse_args(args)
+    carry_forward = read_carry_forward(opts.carry_forward) if opts.carry_forward else None
+    with ProcessPoolExecutor(opts.jobs) as executor:
+        event = aggregate_files(opts.files, executor, carry_forward, opts.name)
+    output = serialize(build_tree(event), getattr(opts, 'pretty', False))
+    if opts.output:
+        with open(opts.output, 'wb') as file:
+            file.write(output)
+    else:
+        stdout = sys.stdout.buffer if hasattr(sys.stdout, 'buffer') else sys.stdout
+        stdout.write(output)
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import hmac
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from .batch import get_output_paths
+from .convert import ET, NO_PLAYER_ID
+
+KEY_VARIABLE = 'SCORER_TO_USEBIO_KEY'
+
+PLAYERS = [
+    ('player_name_1', 'nzb_no_1'),
+    ('player_name_2', 'nzb_no_2'),
+]
+
+ATTRIBUTE_ENTITIES = {
+    '"': '&quot;',
+    '\n': '&#10;',
+    '\r': '&#13;',
+    '\t': '&#9;',
+}
+
+class Pseudonyms(object):
+    def __init__(self, key):
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+        self.key = key
+
+    # Pseudonyms are derived from a keyed hash of the player's NZB number (or
+    # their name if they don't have one), so the same player always gets the
+    # same pseudonym, no matter which file they appear in, as long as the same
+    # key is used. Without the key they cannot be reversed.
+    def get_player(self, name, id):
+        identity = 'id:{}'.format(id) if id not in NO_PLAYER_ID else 'name:{}'.format(name)
+        digest = hmac.new(self.key, identity.encode('utf-8'), hashlib.sha256).hexdigest()
+        name = 'p{}'.format(digest[:10])
+
+        # Players without a number keep it (empty or zero) as it is. Numbers
+        # are taken from 64 bits of the hash, so different players are very
+        # unlikely to be given the same one even across a large corpus (and
+        # then be merged as one player), and are never zero.
+        if id not in NO_PLAYER_ID:
+            id = str(int(digest[10:26], 16) + 1)
+        return (name, id)
+
+    def anonymize_pair(self, attrs):
+        for (name_attr, id_attr) in PLAYERS:
+            if name_attr in attrs or id_attr in attrs:
+                (name, id) = self.get_player(attrs.get(name_attr), attrs.get(id_attr))
+                if name_attr in attrs:
+                    attrs[name_attr] = name
+                if id_attr in attrs:
+                    attrs[id_attr] = id
+        return attrs
+
+class StreamingWriter(object):
+    def __init__(self, output):
+        self.output = output
+
+        # Element text is only known once the parser has moved on to the next
+        # element, likewise tails: hence we write them on the following event.
+        self.last = None
+
+        # Whether the last start tag is still open (i.e. may be self-closed)
+        self.open = False
+
+        # Elements currently open, from the root down
+        self.open_elements = []
+
+    def write(self, text):
+        self.output.write(text.encode('utf-8'))
+
+    def start(self, elem, attrs):
+        self.flush()
+        self.write('<' + elem.tag)
+        for (name, value) in attrs.items():
+            self.write(' {}="{}"'.format(name, escape(value, ATTRIBUTE_ENTITIES)))
+        self.open = True
+        self.last = ('start', elem)
+        self.open_elements.append(elem)
+
+    def end(self, elem):
+        if self.open and self.last[1] is elem and not elem.text:
+            self.write('/>')
+            self.open = False
+        else:
+            self.flush()
+            self.write('</{}>'.format(elem.tag))
+        self.open_elements.pop()
+        self.last = ('end', elem)
+
+    def flush(self):
+        if self.last is None:
+            return
+
+        (action, elem) = self.last
+        if action == 'start':
+            if self.open:
+                self.write('>')
+                self.open = False
+            if elem.text:
+                self.write(escape(elem.text))
+        else:
+            if elem.tail:
+                self.write(escape(elem.tail))
+
+            # Finished with this element entirely: discard it. Clearing it
+            # leaves it in its parent, so also remove the elements before it
+            # from there (as stream.SessionBuilder does).
+            elem.clear()
+            if self.open_elements:
+                parent = self.open_elements[-1]
+                while parent[0] is not elem:
+                    del parent[0]
+        self.last = None
+
+def anonymize(source, output, pseudonyms):
+    writer = StreamingWriter(output)
+    writer.write('<?xml version="1.0"?>\n')
+    for (action, elem) in ET.iterparse(source, events=('start', 'end')):
+        if action == 'start':
+            attrs = dict(elem.attrib)
+            if elem.tag == 'pair':
+                pseudonyms.anonymize_pair(attrs)
+            writer.start(elem, attrs)
+        else:
+            writer.end(elem)
+    writer.flush()
+    writer.write('\n')
+
+def anonymize_file(key, path, output_path):
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'wb') as output:
+        anonymize(path, output, Pseudonyms(key))
+    return output_path
+
+def get_key(opts):
+    if opts.key is not None:
+        return opts.key
+    return os.environ.get(KEY_VARIABLE)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio anonymize',
+        description='Replace player names and NZB numbers in scorer results files with consistent pseudonyms.')
+    parser.add_argument('-k', '--key',
+                        help='secret key used to generate pseudonyms (default: ${})'.format(KEY_VARIABLE))
+    parser.add_argument('-o', '--output', metavar='dir',
+                        help='write anonymized files to this directory (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files to anonymize in parallel (default: one per CPU)')
+    parser.add_argument('files', metavar='file', nargs='+', help='file(s) to anonymize')
+
+    opts = parser.parse_args(args)
+    key = get_key(opts)
+    if not key:
+        parser.error('a key must be given with --key or ${}'.format(KEY_VARIABLE))
+
+    if opts.output is None:
+        output = sys.stdout.buffer if hasattr(sys.stdout, 'buffer') else sys.stdout
+        pseudonyms = Pseudonyms(key)
+        for file in opts.files:
+            anonymize(file, output, pseudonyms)
+        return
+
+    if not os.path.isdir(opts.output):
+        parser.error("output directory '{}' does not exist".format(opts.output))
+
+    # Files with the same name in different directories keep their
+    # directories, so they don't overwrite each other
+    outputs = get_output_paths(opts.output, opts.files)
+    with ProcessPoolExecutor(opts.jobs) as executor:
+        futures = [executor.submit(anonymize_file, key, file, outputs[file]) for file in opts.files]
+        for future in futures:
+            future.result()
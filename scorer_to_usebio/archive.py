@@ -0,0 +1,241 @@
+import argparse
+import csv
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .convert import ET, Event
+from .files import canonical_path, find_results_files, get_signature
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    signature TEXT NOT NULL,
+    club_id INTEGER,
+    club_name TEXT,
+    date TEXT,
+    event_name TEXT
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    pair_id TEXT NOT NULL,
+    section TEXT,
+    direction TEXT,
+    place INTEGER,
+    percentage REAL,
+    boards_played INTEGER,
+    PRIMARY KEY (event_id, pair_id)
+);
+CREATE TABLE IF NOT EXISTS players (
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    pair_id TEXT NOT NULL,
+    seat INTEGER NOT NULL,
+    nzb_no TEXT,
+    name TEXT,
+    PRIMARY KEY (event_id, pair_id, seat)
+);
+CREATE INDEX IF NOT EXISTS events_date ON events(date);
+CREATE INDEX IF NOT EXISTS events_club ON events(club_id, date);
+CREATE INDEX IF NOT EXISTS players_nzb_no ON players(nzb_no);
+'''
+
+RESULTS_QUERY = '''
+SELECT e.date, e.club_name, e.event_name, p.pair_id, p.direction, p.place, p.percentage,
+       pl.nzb_no, pl.name, partner.nzb_no, partner.name
+FROM players pl
+JOIN events e ON e.id = pl.event_id
+JOIN pairs p ON p.event_id = pl.event_id AND p.pair_id = pl.pair_id
+LEFT JOIN players partner ON partner.event_id = pl.event_id AND partner.pair_id = pl.pair_id
+                         AND partner.seat != pl.seat
+'''
+
+RESULTS_COLUMNS = ['date', 'club', 'event', 'pair', 'direction', 'place', 'percentage',
+                   'nzb_no', 'name', 'partner_nzb_no', 'partner_name']
+
+# Scorer dates are day/month/year: store them in ISO format so they sort and
+# can be compared as text.
+def parse_date(date):
+    try:
+        return datetime.datetime.strptime(date, '%d/%m/%Y').date().isoformat()
+    except (TypeError, ValueError):
+        return date
+
+# Convert a results file into the rows to insert for it. These are returned
+# rather than the event itself so only plain data is passed back from workers.
+def read_event_rows(path):
+    event = Event.fromxml(ET.parse(path).getroot())
+    event_row = (event.club_id, event.club_name, parse_date(event.event_date), event.event_name)
+    places = event.places
+    pair_rows = []
+    player_rows = []
+    for (sec_id, section) in event.session.sections.items():
+        for pair in section.pairs:
+            pair_rows.append((pair.id, sec_id, pair.dir, places[pair.id],
+                              float(pair.score.percentage), pair.boards_played))
+            for (seat, player) in enumerate(pair.players, 1):
+                player_rows.append((pair.id, seat, player.id if player.has_id() else None, player.name))
+    return (event_row, pair_rows, player_rows)
+
+class Archive(object):
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get_stale_files(self, files):
+        known = dict(self.db.execute('SELECT file, signature FROM events'))
+        stale = []
+        for file in files:
+            signature = ' '.join(str(x) for x in get_signature(file))
+            if known.get(file) != signature:
+                stale.append((file, signature))
+        return stale
+
+    def add_event(self, file, signature, rows):
+        (event_row, pair_rows, player_rows) = rows
+        self.db.execute('DELETE FROM events WHERE file = ?', (file,))
+        cursor = self.db.execute(
+            'INSERT INTO events (file, signature, club_id, club_name, date, event_name) VALUES (?, ?, ?, ?, ?, ?)',
+            (file, signature) + event_row)
+        event_id = cursor.lastrowid
+        self.db.executemany('INSERT INTO pairs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            [(event_id,) + row for row in pair_rows])
+        self.db.executemany('INSERT INTO players VALUES (?, ?, ?, ?, ?)',
+                            [(event_id,) + row for row in player_rows])
+
+    # Add an event within a savepoint, so if it fails part way through it is
+    # rolled back, leaving any previous version of the event as it was
+    def add_event_atomically(self, file, signature, future):
+        if not self.db.in_transaction:
+            self.db.execute('BEGIN')
+        self.db.execute('SAVEPOINT event')
+        try:
+            self.add_event(file, signature, future.result())
+        except BaseException:
+            self.db.execute('ROLLBACK TO event')
+            raise
+        finally:
+            self.db.execute('RELEASE event')
+
+    # Re-key any events recorded by other paths (e.g. by older versions, which
+    # recorded them as given) by their canonical paths, dropping duplicates
+    def canonicalise(self):
+        files = [file for (file,) in self.db.execute('SELECT file FROM events')]
+        known = set(files)
+        for file in files:
+            key = canonical_path(file)
+            if key == file:
+                continue
+            if key in known:
+                self.db.execute('DELETE FROM events WHERE file = ?', (file,))
+            else:
+                self.db.execute('UPDATE events SET file = ? WHERE file = ?', (key, file))
+                known.add(key)
+
+    # Add any new or changed files to the archive, converting them using the
+    # given executor. Events are committed in batches, each in a transaction.
+    # Files are recorded by their canonical paths, so each is only added once
+    # however it is given.
+    def ingest(self, files, executor, batch_size=100):
+        files = list(OrderedDict((canonical_path(file), None) for file in files))
+        with self.db:
+            self.canonicalise()
+        stale = self.get_stale_files(files)
+        futures = [(file, signature, executor.submit(read_event_rows, file)) for (file, signature) in stale]
+        failed = 0
+        with self.db:
+            for (ii, (file, signature, future)) in enumerate(futures, 1):
+                try:
+                    self.add_event_atomically(file, signature, future)
+                except Exception as err:
+                    logger.error("error converting %s: %s", file, err)
+                    failed += 1
+                if ii % batch_size == 0:
+                    self.db.commit()
+        return (len(stale), failed)
+
+    def get_results(self, nzb_no=None, club_id=None, start=None, end=None):
+        clauses = []
+        params = []
+        if nzb_no is not None:
+            clauses.append('pl.nzb_no = ?')
+            params.append(nzb_no)
+        if club_id is not None:
+            clauses.append('e.club_id = ?')
+            params.append(club_id)
+        if start is not None:
+            clauses.append('e.date >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('e.date <= ?')
+            params.append(end)
+
+        query = RESULTS_QUERY
+        if clauses:
+            query += 'WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY e.date, e.club_name, e.event_name, p.place'
+        return self.db.execute(query, params).fetchall()
+
+def ingest_main(opts):
+    archive = Archive(opts.database)
+    try:
+        with ProcessPoolExecutor(opts.jobs) as executor:
+            (read, failed) = archive.ingest(find_results_files(opts.paths), executor)
+        logger.info("ingested %d new or changed file(s), %d failed", read - failed, failed)
+    finally:
+        archive.close()
+
+def query_main(opts):
+    start = opts.start
+    end = opts.end
+    if opts.year is not None:
+        start = '{:04d}-01-01'.format(opts.year)
+        end = '{:04d}-12-31'.format(opts.year)
+
+    archive = Archive(opts.database)
+    try:
+        results = archive.get_results(opts.player, opts.club, start, end)
+    finally:
+        archive.close()
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(RESULTS_COLUMNS)
+    writer.writerows(results)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio archive',
+        description='Index converted events, pairs and players in an SQLite database, and query them.')
+    parser.add_argument('-d', '--database', default='archive.sqlite',
+                        help='archive database (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    ingest = commands.add_parser('ingest', help='add new or changed results files to the archive')
+    ingest.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files to convert in parallel (default: one per CPU)')
+    ingest.add_argument('paths', metavar='path', nargs='+',
+                        help='results file(s), or directories containing them, to add')
+    ingest.set_defaults(func=ingest_main)
+
+    query = commands.add_parser('query', help='list results from the archive as CSV')
+    query.add_argument('-p', '--player', metavar='nzb_no', help='only results for this NZB number')
+    query.add_argument('-c', '--club', metavar='club_no', type=int, help='only results at this club')
+    query.add_argument('-y', '--year', type=int, help='only results in this year')
+    query.add_argument('--start', metavar='yyyy-mm-dd', help='only results on or after this date')
+    query.add_argument('--end', metavar='yyyy-mm-dd', help='only results on or before this date')
+    query.set_defaults(func=query_main)
+
+    opts = parser.parse_args(args)
+    opts.func(opts)
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .files import canonical_path, write_atomically
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = 'journal.jsonl'
+
+JournalEntry = namedtuple('JournalEntry', ['input', 'digest', 'output', 'status'])
+
+STATUS_OK = 'ok'
+
+# How many files the pipelined batch reads ahead of those being converted
+DEFAULT_READAHEAD = 8
+
+def get_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# An append-only record of each input converted (or not) by a batch run. The
+# latest entry for an input wins, so a rerun just appends newer entries. Inputs
+# are looked up by their canonical paths, so each is recognised however it is
+# given.
+class Journal(object):
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            self.read()
+        self.file = open(path, 'a')
+
+    def read(self):
+        with open(self.path, 'r') as file:
+            for line in file:
+                try:
+                    entry = JournalEntry(**json.loads(line))
+                except (ValueError, TypeError):
+
+                    # Most likely the last line, cut short by a crash
+                    logger.warning("ignoring invalid journal entry: %s", line.rstrip())
+                    continue
+                self.entries[canonical_path(entry.input)] = entry
+
+    def close(self):
+        self.file.close()
+
+    # Each entry is flushed to disk as soon as it is made, so it survives a
+    # crash immediately after.
+    def record(self, entry):
+        self.file.write(json.dumps(entry._asdict(), sort_keys=True) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entries[canonical_path(entry.input)] = entry
+
+    # Whether an input has already been converted successfully, and is unchanged
+    def is_done(self, input, digest):
+        entry = self.entries.get(canonical_path(input))
+        return (entry is not None and entry.status == STATUS_OK and entry.digest == digest and
+                os.path.exists(entry.output))
+
+def get_error_status(err):
+    return 'error: {}: {}'.format(type(err).__name__, err)
+
+# Where to write the output for each input: outputs keep the inputs' directory
+# structure below the deepest directory they all share, so inputs with the same
+# name in different directories don't overwrite each other.
+def get_output_paths(output_dir, inputs):
+    if not inputs:
+        return {}
+    paths = [os.path.abspath(input) for input in inputs]
+    common = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return dict((input, os.path.join(output_dir, os.path.relpath(path, common)))
+                for (input, path) in zip(inputs, paths))
+
+def write_output(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_atomically(path, data)
+
+# Convert files into the output directory, recording each in the journal as it
+# finishes. If resuming, files already converted (and unchanged since) are
+# skipped: anything else, including previous failures, is converted (again).
+# Returns counts of files converted, failed and skipped. Each conversion is
+# recorded in the given metrics, if any.
+def convert_batch(files, output_dir, journal, converter, resume=False, executor=None, metrics=None):
+    files = list(files)
+    outputs = get_output_paths(output_dir, files)
+    digests = {}
+    converted = failed = skipped = 0
+    for file in files:
+        try:
+            digest = get_digest(file)
+        except EnvironmentError as err:
+            logger.error("error reading %s: %s", file, err)
+            journal.record(JournalEntry(file, None, outputs[file], get_error_status(err)))
+            failed += 1
+            continue
+
+        if resume and journal.is_done(file, digest):
+            skipped += 1
+        else:
+            digests[file] = digest
+
+    for result in converter.convert_many(list(digests), executor, ordered=False):
+        if metrics is not None:
+            metrics.record(result)
+
+        output_path = outputs[result.name]
+        error = result.error
+        if error is None:
+            try:
+                write_output(output_path, result.output)
+            except EnvironmentError as err:
+                error = err
+
+        if error is None:
+            status = STATUS_OK
+            converted += 1
+        else:
+            status = get_error_status(error)
+            logger.error("error converting %s: %s", result.name, error)
+            failed += 1
+        journal.record(JournalEntry(result.name, digests[result.name], output_path, status))
+    return (converted, failed, skipped)
+
+def read_file(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+# Writes outputs, and records them in the journal, on a thread of its own, so
+# slow writes overlap with reading and converting the files after them. The
+# queue is bounded, so converted files can only get so far ahead of writing.
+class WriteBehind(object):
+    def __init__(self, journal, depth):
+        self.journal = journal
+        self.queue = queue.Queue(depth)
+        self.converted = self.failed = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='write-behind')
+        self.thread.daemon = True
+        self.thread.start()
+
+    # The output is written first, if there is one: the entry's status is
+    # only as given if that succeeds.
+    def put(self, entry, output=None):
+        self.queue.put((entry, output))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            # After an error (e.g. the journal can't be written) keep taking
+            # items, so the pipeline isn't left blocked, until closed
+            if self.error is None:
+                try:
+                    self.write(*item)
+                except BaseException as err:
+                    self.error = err
+
+    def write(self, entry, output):
+        if output is not None:
+            try:
+                write_output(entry.output, output)
+            except EnvironmentError as err:
+                logger.error("error writing %s: %s", entry.output, err)
+                entry = entry._replace(status=get_error_status(err))
+        if entry.status == STATUS_OK:
+            self.converted += 1
+        else:
+            self.failed += 1
+        self.journal.record(entry)
+
+    # Waits for everything queued to be written, then re-raises any error
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+# As convert_batch, but pipelined for inputs with slow (high latency) storage,
+# e.g. network shares: up to readahead files are read in background threads
+# ahead of being converted, and outputs written behind on another. Reading,
+# converting and writing then overlap, and each file is read only once (its
+# digest is taken from the data read). At most readahead files are held at
+# each stage, so memory is bounded however many files there are.
+def convert_pipelined(files, output_dir, journal, converter, resume=False, executor=None, metrics=None,
+                      readahead=DEFAULT_READAHEAD):
+    if executor is None:
+        with converter.create_executor() as executor:
+            return convert_pipelined(files, output_dir, journal, converter, resume, executor, metrics, readahead)
+
+    files = list(files)
+    skipped = 0
+    writer = WriteBehind(journal, readahead)
+    try:
+        with ThreadPoolExecutor(readahead) as readers:
+            pipeline = Pipeline(files, get_output_paths(output_dir, files), converter, executor, readers, writer, metrics, readahead)
+            while pipeline.reads or pipeline.conversions:
+                if pipeline.reads and len(pipeline.conversions) < readahead:
+                    (file, data) = pipeline.next_read()
+                    if data is None:
+                        continue
+                    digest = hashlib.sha256(data).hexdigest()
+                    if resume and journal.is_done(file, digest):
+                        skipped += 1
+                    else:
+                        pipeline.convert(file, digest, data)
+                    pipeline.finish(wait_for_one=False)
+                else:
+                    pipeline.finish(wait_for_one=True)
+    finally:
+        writer.close()
+    return (writer.converted, writer.failed, skipped)
+
+class Pipeline(object):
+    def __init__(self, files, outputs, converter, executor, readers, writer, metrics, readahead):
+        self.files = iter(files)
+        self.outputs = outputs
+        self.converter = converter
+        self.executor = executor
+        self.readers = readers
+        self.writer = writer
+        self.metrics = metrics
+        self.readahead = readahead
+
+        # Reads in input order, and conversion future -> (file, digest). Files
+        # given more than once are only converted once, as in convert_batch.
+        self.reads = deque()
+        self.conversions = {}
+        self.seen = set()
+        self.fill()
+
+    def fill(self):
+        while len(self.reads) < self.readahead:
+            file = next(self.files, None)
+            if file is None:
+                return
+            if file not in self.seen:
+                self.seen.add(file)
+                self.reads.append((file, self.readers.submit(read_file, file)))
+
+    # The next file read (in order), and its data, or None if it couldn't be
+    # read (which is recorded as a failure)
+    def next_read(self):
+        (file, future) = self.reads.popleft()
+        self.fill()
+        try:
+            return (file, future.result())
+        except EnvironmentError as err:
+            logger.error("error reading %s: %s", file, err)
+            self.writer.put(JournalEntry(file, None, self.outputs[file], get_error_status(err)))
+            return (file, None)
+
+    def convert(self, file, digest, data):
+        self.conversions[self.executor.submit(self.converter.convert, data)] = (file, digest)
+
+    # Hand any finished conversions on to be written, waiting for at least one
+    # if asked to
+    def finish(self, wait_for_one):
+        if wait_for_one:
+            done = wait(self.conversions, return_when=FIRST_COMPLETED).done
+        else:
+            done = [future for future in self.conversions if future.done()]
+        for future in done:
+            (file, digest) = self.conversions.pop(future)
+
+            # Converted from the data read, so the result needs naming
+            result = self.converter.get_result(future, file)._replace(name=file)
+            if self.metrics is not None:
+                self.metrics.record(result)
+
+            entry = JournalEntry(file, digest, self.outputs[file], STATUS_OK)
+            if result.error is None:
+                self.writer.put(entry, result.output)
+            else:
+                logger.error("error converting %s: %s", file, result.error)
+                self.writer.put(entry._replace(status=get_error_status(result.error)))
@@ -0,0 +1,292 @@
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from xml.sax.saxutils import quoteattr
+
+from .convert import ET, Event, build_tree, clear_caches, serialize, using_lxml
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+# Larger sessions than any of the examples: (sections, tables, boards)
+SYNTHETIC_SESSIONS = [
+    (1, 13, 26),
+    (4, 15, 27),
+    (8, 20, 32),
+]
+
+CONTRACTS = ['1 NT', '2 S', '3 NT', '4 H', '4 S X', '5 D', '6 NT', 'P']
+RESULTS = ['=', '+1', '-1', '+2', '-2']
+DECLARERS = ['N', 'E', 'S', 'W']
+
+PHASES = ['parse', 'model', 'output']
+
+# Metrics recorded for each phase, and whether a higher value is better
+METRICS = [
+    ('relative_throughput', True),
+    ('peak_memory', False),
+    ('retained_blocks', False),
+]
+
+DEFAULT_TOLERANCES = {
+    'relative_throughput': 0.25,
+    'peak_memory': 0.10,
+    'retained_blocks': 0.10,
+}
+
+# Generate a session in which every pair plays every board, in sections of the
+# given size. The content is random (but repeatable) and plausible enough to be
+# converted, but the results mean nothing.
+def synthetic_session(sections, tables, boards, seed=0):
+    rng = random.Random(seed)
+    top = 20 * (tables - 1)
+    lines = ['<?xml version="1.0"?>',
+             '<session club="Synthetic Bridge Club" club_no="1" scoring_type="MP" '
+             'event_name="Synthetic {}x{}x{}" event_date="1/1/2016">'.format(sections, tables, boards),
+             '<sections>']
+    sec_ids = [chr(ord('A') + ii) for ii in range(sections)]
+    for sec_id in sec_ids:
+        lines.append('<section sectid="{}" tables="{}" handicap="false"/>'.format(sec_id, tables))
+    lines.append('</sections>')
+
+    lines.append('<board_results>')
+    for sec_id in sec_ids:
+        lines.append('<brsection id="{}">'.format(sec_id))
+        for board in range(1, boards + 1):
+            ranks = list(range(tables))
+            rng.shuffle(ranks)
+            for table in range(1, tables + 1):
+                contract = rng.choice(CONTRACTS)
+                result = '' if contract == 'P' else rng.choice(RESULTS)
+                mps = ranks[table - 1] * 20
+                lines.append('<result tab="{}" bd="{}" rnd="{}" ns="{}" ew="{}" dec={} cont={} lead="" res={} '
+                             'score="{}" mp_ns="{}" mp_ew="{}"/>'.format(
+                                 table, board, board, table, (table + board - 1) % tables + 1,
+                                 quoteattr(rng.choice(DECLARERS)), quoteattr(contract), quoteattr(result),
+                                 rng.randrange(-20, 20) * 10, mps, top - mps))
+        lines.append('</brsection>')
+    lines.append('</board_results>')
+
+    lines.append('<scores>')
+    player = 0
+    for sec_id in sec_ids:
+        lines.append('<scsection id="{}">'.format(sec_id))
+        for dir in ['N', 'E']:
+            for number in range(1, tables + 1):
+                lines.append('<pair player_name_1="p{0}" player_name_2="p{1}" match_points="{2}/{3}" place="{4}" '
+                             'dir="{5}" no="{4}" nzb_no_1="{0}" nzb_no_2="{1}" res="50.00" raw_score="50.00" '
+                             'handicap="0"/>'.format(player + 1, player + 2, top * boards // 2, top * boards,
+                                                     number, dir))
+                player += 2
+        lines.append('</scsection>')
+    lines.append('</scores>')
+    lines.append('</session>')
+    return '\n'.join(lines).encode('utf-8')
+
+# The fixed workload: (name, data) for each input
+def get_workload():
+    workload = []
+    names = os.listdir(EXAMPLES_DIR) if os.path.isdir(EXAMPLES_DIR) else []
+    for name in sorted(names):
+        if name.endswith('.xml'):
+            with open(os.path.join(EXAMPLES_DIR, name), 'rb') as file:
+                workload.append((name, file.read()))
+    for size in SYNTHETIC_SESSIONS:
+        workload.append(('synthetic-{}x{}x{}'.format(*size), synthetic_session(*size)))
+    return workload
+
+def run_phases(data):
+    root = ET.fromstring(data)
+    yield 'parse'
+    event = Event.fromxml(root)
+    yield 'model'
+    serialize(build_tree(event))
+    yield 'output'
+
+def count_travellers(data):
+    event = Event.fromxml(ET.fromstring(data))
+    return sum(len(travellers) for section in event.session.sections.values()
+               for travellers in section.boards.values())
+
+# Parse, walk and serialize a document, without any of the conversion code.
+# This does the same sort of work as the phases, so how long it takes shows how
+# fast the machine is at converting, and throughput can be compared across
+# machines relative to it.
+def run_reference(data):
+    root = ET.fromstring(data)
+    total = 0
+    for elem in root.iter():
+        attrs = dict(elem.attrib)
+        total += sum(len(value) for value in attrs.values())
+    ET.tostring(root)
+    return total
+
+# Time taken by the reference workload and by each phase, on the same input.
+# The reference is run just before the phases each time, so anything slowing
+# the machine down while they run affects both alike, and the median of each
+# over several runs is used.
+#
+# As with timeit, the garbage collector is disabled while timing: when it runs
+# depends on everything allocated before, so it can make a phase several times
+# slower in one run than the next.
+def time_phases(data, repeat):
+    references = []
+    times = dict((phase, []) for phase in PHASES)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for ii in range(repeat):
+            start = time.perf_counter()
+            run_reference(data)
+            now = time.perf_counter()
+            references.append(now - start)
+            start = now
+            for phase in run_phases(data):
+                now = time.perf_counter()
+                times[phase].append(now - start)
+                start = now
+            gc.collect()
+    finally:
+        if enabled:
+            gc.enable()
+    return (statistics.median(references),
+            dict((phase, statistics.median(values)) for (phase, values) in times.items()))
+
+# Peak memory used by, and the number of memory blocks still allocated after,
+# each phase. Caches are cleared first so the numbers are the same however often
+# this is run.
+def trace_phases(data):
+    clear_caches()
+    gc.collect()
+    results = {}
+    tracemalloc.start()
+    try:
+        (start, peak) = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        for phase in run_phases(data):
+            (current, peak) = tracemalloc.get_traced_memory()
+            results[phase] = (peak - start, sys.getallocatedblocks() - blocks)
+            tracemalloc.stop()
+            tracemalloc.start()
+            (start, peak) = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+    finally:
+        tracemalloc.stop()
+    return results
+
+# Run the workload, returning each metric for each phase. Throughput is in
+# travellers per second of the reference workload (run on the same inputs, on
+# the same machine), over the whole workload, so it does not depend on how fast
+# the machine is.
+def measure(workload, repeat=5):
+    reference = 0.0
+    seconds = dict((phase, 0.0) for phase in PHASES)
+    peak_memory = dict((phase, 0) for phase in PHASES)
+    retained_blocks = dict((phase, 0) for phase in PHASES)
+    travellers = 0
+    for (name, data) in workload:
+        travellers += count_travellers(data)
+        (elapsed, times) = time_phases(data, repeat)
+        reference += elapsed
+        for (phase, elapsed) in times.items():
+            seconds[phase] += elapsed
+        for (phase, (peak, blocks)) in trace_phases(data).items():
+            peak_memory[phase] = max(peak_memory[phase], peak)
+            retained_blocks[phase] += blocks
+
+    return dict((phase, {
+        'relative_throughput': round(travellers * reference / seconds[phase]),
+        'peak_memory': peak_memory[phase],
+        'retained_blocks': retained_blocks[phase],
+    }) for phase in PHASES)
+
+# Baselines are kept for each XML backend, since they perform very differently
+def get_backend():
+    return 'lxml' if using_lxml else 'etree'
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {'tolerances': DEFAULT_TOLERANCES, 'backends': {}}
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def save_baseline(baseline, path):
+    temp = path + '.tmp'
+    with open(temp, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write('\n')
+    os.replace(temp, path)
+
+# Compare results to the baseline: returns a report line for each metric of
+# each phase, and whether any regressed beyond its tolerance.
+def compare(baseline, results, tolerances):
+    report = []
+    regressed = False
+    for phase in PHASES:
+        for (metric, higher_is_better) in METRICS:
+            actual = results[phase][metric]
+
+            # A metric missing from the baseline (e.g. one added since it was
+            # saved) can't be checked, so fails until the baseline is saved again
+            expected = baseline[phase].get(metric)
+            if expected is None:
+                regressed = True
+                report.append('{:<8} {:<20} {:>12} {:>12} {:>8}  {}'.format(
+                    phase, metric, '-', actual, '', 'NOT RECORDED'))
+                continue
+
+            change = (actual - expected) / expected if expected else 0.0
+            worse = -change if higher_is_better else change
+            failed = worse > tolerances[metric]
+            regressed = regressed or failed
+            report.append('{:<8} {:<20} {:>12} {:>12} {:>+8.1%}  {}'.format(
+                phase, metric, expected, actual, change, 'REGRESSED' if failed else 'ok'))
+    return (report, regressed)
+
+def parse_tolerance(text):
+    (metric, value) = text.split('=', 1)
+    if metric not in DEFAULT_TOLERANCES:
+        raise argparse.ArgumentTypeError("unknown metric '{}'".format(metric))
+    return (metric, float(value))
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio benchmark',
+        description='Measure conversion performance on a fixed workload, and check it against a baseline.')
+    parser.add_argument('-b', '--baseline', metavar='file', required=True, help='baseline file')
+    parser.add_argument('-s', '--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of timed runs of each input (default: %(default)s)')
+    parser.add_argument('-t', '--tolerance', metavar='metric=fraction', type=parse_tolerance, action='append',
+                        default=[], help='allowed regression for a metric, overriding the baseline (e.g. relative_throughput=0.5)')
+
+    opts = parser.parse_args(args)
+    baseline = load_baseline(opts.baseline)
+    results = measure(get_workload(), opts.repeat)
+    backend = get_backend()
+
+    if opts.save:
+        baseline['backends'][backend] = results
+        save_baseline(baseline, opts.baseline)
+        print('saved {} baseline to {}'.format(backend, opts.baseline))
+        return
+
+    if backend not in baseline['backends']:
+        sys.exit("no {} baseline in {}".format(backend, opts.baseline))
+
+    tolerances = dict(DEFAULT_TOLERANCES)
+    tolerances.update(baseline.get('tolerances', {}))
+    tolerances.update(opts.tolerance)
+
+    (report, regressed) = compare(baseline['backends'][backend], results, tolerances)
+    print('{:<8} {:<20} {:>12} {:>12} {:>8}'.format('phase', 'metric', 'baseline', 'current', 'change'))
+    for line in report:
+        print(line)
+    if regressed:
+        sys.exit(1)
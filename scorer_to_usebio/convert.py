@@ -1,3 +1,4 @@
+import io
 import logging
 
 from collections import namedtuple, OrderedDict
@@ -13,7 +14,7 @@ except ImportError:
     except ImportError:
         import xml.etree.ElementTree as ET
 
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 # TODO:
 # * Teams
@@ -48,14 +49,50 @@ DECIMAL_001 = Decimal('0.01')
 
 DIRECTIONS = ['ns', 'ew']
 
+# Attributes without which a pair, traveller or board result can't be read
+PAIR_ATTRIBUTES = ('no', 'match_points', 'res', 'raw_score', 'handicap')
+TRAVELLER_ATTRIBUTES = ('cont', 'mp_ns', 'mp_ew')
+RESULT_ATTRIBUTES = ('bd',) + TRAVELLER_ATTRIBUTES
+
+# Players without an NZB number are recorded with an empty or zero number
+NO_PLAYER_ID = ('', '0', None)
+
+logger = logging.getLogger(__name__)
+
+# The same few hundred contracts, results, leads, etc. are repeated thousands
+# of times across a session (and across sessions when converting a batch of
+# files). Intern them and cache their decoded values, so each is only parsed
+# once and only one copy is kept in memory.
+#
+# The caches are bounded to stop a pathological input growing them without
+# limit: they are simply emptied if they fill up.
+CACHE_LIMIT = 8192
+interned = {}
+decoded_contracts = {}
+decoded_mps = {}
+
+# Our exceptions take different constructor arguments to the message they pass
+# on to Exception, so need some help to be pickled (e.g. when raised in a worker
+# process): restore them directly from their message.
+def restore_exception(cls, args):
+    exc = cls.__new__(cls)
+    Exception.__init__(exc, *args)
+    return exc
+
 class InvalidEventType(Exception):
     def __init__(self, type):
         Exception.__init__(self, "invalid/unhandled scoring type '{}'".format(type))
 
+    def __reduce__(self):
+        return (restore_exception, (self.__class__, self.args))
+
 class InvalidResultsException(Exception):
     def __init__(self, msg):
         Exception.__init__(self, msg)
 
+    def __reduce__(self):
+        return (restore_exception, (self.__class__, self.args))
+
 class DuplicatePair(InvalidResultsException):
     def __init__(self, pair):
         InvalidResultsException.__init__(self, "duplicate pair: {}".format(pair))
@@ -82,8 +119,33 @@ class InvalidMatchPoints(InvalidResultsException):
         msg = "invalid match point value: {}".format(mps)
         InvalidResultsException.__init__(self, msg)
 
+class InvalidResultMatchPoints(InvalidResultsException):
+    def __init__(self, attribute, board, value):
+        msg = "invalid {} for board {}: '{}'".format(attribute, board, value)
+        InvalidResultsException.__init__(self, msg)
+
+class DuplicateResult(InvalidResultsException):
+    def __init__(self, round, table, board):
+        msg = "duplicate result for round {}, table {}, board {}".format(round, table, board)
+        InvalidResultsException.__init__(self, msg)
+
+class MissingAttributes(InvalidResultsException):
+    def __init__(self, names):
+        msg = "missing attribute(s): {}".format(", ".join(names))
+        InvalidResultsException.__init__(self, msg)
+
+# Errors in the input data (i.e. anything we might get from bad values)
+DATA_ERRORS = (InvalidResultsException, ArithmeticError, TypeError, ValueError)
+
 MasterPoints = namedtuple('MasterPoints', ['type', 'points'])
 
+# A problem found with the results, and where (as given in the results file):
+# any of section, board and pair may be None if not applicable.
+Problem = namedtuple('Problem', ['level', 'message', 'section', 'board', 'pair'])
+
+# The results entered for a round of a section, and any problems with them
+RoundSummary = namedtuple('RoundSummary', ['round', 'tables', 'results', 'missing', 'duplicates', 'misplaced'])
+
 class Score(object):
     def __init__(self, place, total_score, adjustment, handicap, mps):
         self.place = place
@@ -150,6 +212,9 @@ class Player(object):
         id = pair.get('nzb_no_%d' % which)
         return Player(name, id)
 
+    def has_id(self):
+        return self.id not in NO_PLAYER_ID
+
     def get_usebio_xml(self):
         player = ET.Element('PLAYER')
         element(player, 'PLAYER_NAME', self.name)
@@ -177,6 +242,7 @@ class Pair(object):
 
     @staticmethod
     def fromxml(pair, handicapped):
+        check_attributes(pair, PAIR_ATTRIBUTES)
         no = pair.get('no')
         dir = Pair.get_pair_direction(pair.get('dir'))
         players = (Player.fromxml(pair, 1), Player.fromxml(pair, 2))
@@ -225,42 +291,75 @@ class Traveller(object):
         self.ew_mps = ew_mps
 
     @staticmethod
-    def fromxml(result, section):
+    def fromxml(result, ns, ew):
 
         # Scorer records what looks like floor(MPs * 10).
         #
         # Nothing we can do about the floor bit, but divide by 10 to get close
         # to proper MP values.
         #
-        # Phantoms are recorded with -9999 MPs hard-coded: return None in this case.
-        def get_mps(dir):
-            mps = result.get('mp_%s' % dir)
-            if mps == '-9999':
-                return None
-            else:
-                return Decimal(mps) / 10
-
-        # If this is a phantom then just skip it (i.e. return None).
+        # Phantoms are recorded with -9999 MPs hard-coded: if this is a phantom
+        # then just skip it (i.e. return None).
         #
         # This is not a pretty way of detecting phantoms, but it seems reliable
         # and will do for now.
-        (ns_mps, ew_mps) = get_mps('ns'), get_mps('ew')
-        if ns_mps is None or ew_mps is None:
+        ns_mps = result.get('mp_ns')
+        ew_mps = result.get('mp_ew')
+        contract = result.get('cont')
+        if contract is None or ns_mps is None or ew_mps is None:
+            check_attributes(result, TRAVELLER_ATTRIBUTES)
+        if ns_mps == '-9999' or ew_mps == '-9999':
             return None
 
-        (ns, ew) = [section.get_pair_id(dir, result.get(dir)) for dir in DIRECTIONS]
-        contract = result.get('cont')
+        try:
+            ns_mps = Traveller.decode_mps(ns_mps)
+            ew_mps = Traveller.decode_mps(ew_mps)
+        except InvalidOperation:
+            raise Traveller.get_invalid_mps(result)
 
         # Annoying: need to convert from contract/result to count of tricks won
-        tricks = Traveller.get_trick_count(contract, result.get('res'))
+        (contract, tricks) = Traveller.decode_contract(contract, result.get('res'))
 
         return Traveller(ns, ew,
-                         Traveller.convert_contract(contract),
-                         result.get('dec'),
-                         result.get('lead'),
+                         contract,
+                         intern_text(result.get('dec')),
+                         intern_text(result.get('lead')),
                          tricks,
-                         result.get('score'),
-                         ns_mps, ew_mps)
+                         intern_text(result.get('score')),
+                         ns_mps,
+                         ew_mps)
+
+    # Which of a result's MPs is invalid, as an error naming it and the board
+    @staticmethod
+    def get_invalid_mps(result):
+        for attribute in ('mp_ns', 'mp_ew'):
+            value = result.get(attribute)
+            try:
+                Traveller.decode_mps(value)
+            except InvalidOperation:
+                return InvalidResultMatchPoints(attribute, result.get('bd'), value)
+
+    @staticmethod
+    def decode_contract(contract, result):
+        key = (contract, result)
+        decoded = decoded_contracts.get(key)
+        if decoded is None:
+            decoded = (intern_text(Traveller.convert_contract(contract)),
+                       Traveller.get_trick_count(contract, result))
+            add_to_cache(decoded_contracts, key, decoded)
+        return decoded
+
+    @staticmethod
+    def decode_mps(mps):
+        decoded = decoded_mps.get(mps)
+        if decoded is None:
+            decoded = Decimal(mps) / 10
+
+            # Decimal accepts these, but they can't be scored
+            if not decoded.is_finite():
+                raise InvalidOperation(mps)
+            add_to_cache(decoded_mps, mps, decoded)
+        return decoded
 
     @staticmethod
     def get_trick_count(contract, result):
@@ -307,6 +406,105 @@ class Traveller(object):
         element(xml, 'EW_MATCH_POINTS', self.ew_mps)
         return xml
 
+# Where each result was played, by round, table and board, so results can be
+# checked against the movement as they are read. Each check is a dictionary
+# lookup or two, and only the first result at each table in each round needs
+# more, so checking costs little however large the event.
+#
+# A grid is only kept while its section's results are being read: once they
+# have all been checked it is summarised (see get_summaries) and dropped.
+class ResultGrid(object):
+    def __init__(self):
+
+        # round -> table -> [NS pair, EW pair, boards played, result count],
+        # with the boards as a bit mask (since there are only a few at each
+        # table each round)
+        self.tables = {}
+
+        # round -> (NS pair number -> table, EW pair number -> table)
+        self.seats = {}
+
+        self.duplicates = defaultdict(int)
+        self.misplaced = defaultdict(int)
+
+    # Add a result, returning descriptions of anything out of place about it.
+    # An exact duplicate (i.e. of a result already entered for the same board
+    # at the same table and round) is raised rather than added.
+    def add(self, round, table, board, ns, ew):
+        bit = 1 << board
+        tables = self.tables.get(round)
+        if tables is None:
+            tables = self.tables[round] = {}
+            self.seats[round] = ({}, {})
+        entry = tables.get(table)
+        if entry is None:
+            tables[table] = [ns, ew, bit, 1]
+
+            # Only the first result at a table need be checked against the
+            # other tables: the rest are checked against it
+            (ns_seats, ew_seats) = self.seats[round]
+            ns_seat = ns_seats.setdefault(ns, table)
+            ew_seat = ew_seats.setdefault(ew, table)
+            if ns_seat == table and ew_seat == table:
+                return ()
+            problems = tuple("round {}: {} pair {} at tables {} and {}".format(round, dir, number, seat, table)
+                             for (dir, number, seat) in (('ns', ns, ns_seat), ('ew', ew, ew_seat))
+                             if seat != table)
+        else:
+            if entry[2] & bit:
+                self.duplicates[round] += 1
+                raise DuplicateResult(round, table, board)
+            entry[2] |= bit
+            entry[3] += 1
+            if entry[0] == ns and entry[1] == ew:
+                return ()
+            problems = ("round {}, table {}: result for {}/{} at the table of {}/{}".format(
+                round, table, ns, ew, entry[0], entry[1]),)
+
+        self.misplaced[round] += 1
+        return problems
+
+    def count(self, round, table):
+        entry = self.tables.get(round, {}).get(table)
+        return entry[3] if entry is not None else 0
+
+    # Tables which have fewer results than most others in the same round, as
+    # (round, table, results found, results expected)
+    def get_missing(self):
+        tables = set(table for counts in self.tables.values() for table in counts)
+
+        missing = []
+        for round in sorted(self.tables, key=grid_order):
+            counts = dict((table, entry[3]) for (table, entry) in self.tables[round].items())
+            low = min(counts.values())
+            high = max(counts.values())
+            if low == high and len(counts) == len(tables):
+                continue
+
+            # The most common count (or the highest, if there is a tie) is taken
+            # to be what every table should have
+            frequency = Counter(counts.get(table, 0) for table in tables)
+            expected = max(frequency.items(), key=lambda x: (x[1], x[0]))[0]
+            for table in sorted(tables, key=grid_order):
+                found = counts.get(table, 0)
+                if found < expected:
+                    missing.append((round, table, found, expected))
+        return missing
+
+    def get_summaries(self, missing=None):
+        if missing is None:
+            missing = self.get_missing()
+        missing_count = defaultdict(int)
+        for (round, table, found, expected) in missing:
+            missing_count[round] += expected - found
+        return [RoundSummary(round, len(tables), sum(entry[3] for entry in tables.values()),
+                             missing_count[round], self.duplicates[round], self.misplaced[round])
+                for (round, tables) in sorted(self.tables.items(), key=lambda item: grid_order(item[0]))]
+
+# Rounds and tables are kept as given, but sorted numerically where possible
+def grid_order(value):
+    return (0, int(value), '') if value.isdigit() else (1, 0, value)
+
 class Section(object):
     def __init__(self, id, handicapped):
         self.id = id
@@ -317,6 +515,7 @@ class Section(object):
         }
         self.pairs = []
         self.boards = defaultdict(list)
+        self.unknown_pairs = set()
 
     def set_pair_id(self, dir, dir_id, pair_id):
         mapping = self.id_mappings[dir]
@@ -331,50 +530,111 @@ class Section(object):
         if self.has_pair_id(dir, id):
             return self.id_mappings[dir][id]
         else:
-            logging.error("unknown pair ID '%s' for %s", id, dir)
-            return "unknown: {}".format(self.id)
+            logger.error("unknown pair ID '%s' for %s", id, dir)
+            return self.get_unknown_pair_id()
+
+    def get_unknown_pair_id(self):
+        return "unknown: {}".format(self.id)
 
     @staticmethod
     def fromxml(section):
         return Section(section.get('sectid'), section.get('handicapped'))
 
 class Session(object):
-    def __init__(self):
+    def __init__(self, strict=True):
         self.pairs = {}
         self.sections = {}
+        self.board_top = None
+
+        # Flat (section, direction, number) -> pair index, used to resolve both
+        # pairs of each traveller with a single lookup apiece.
+        self.pair_index = {}
+
+        # Section ID -> ResultGrid, for sections whose results are being read,
+        # and a summary of each round's results (see get_round_summaries) once
+        # they have been checked.
+        self.grids = {}
+        self.round_summaries = {}
+
+        # Normally invalid results stop the conversion, but when not strict
+        # (e.g. when linting) they are recorded and the session read as far as
+        # possible, so all the problems with it can be found in one go.
+        self.strict = strict
+        self.problems = []
 
     @staticmethod
-    def fromxml(root):
-        session = Session()
+    def fromxml(root, strict=True):
+        session = Session(strict)
         session.read_sections(root)
         session.read_pairs(root)
         session.read_boards(root)
+        session.check_grids()
+        session.report_unknown_pairs()
         session.fixup_scores()
         return session
 
     def read_sections(self, root):
         for section in root.findall('./sections/section'):
-            self.sections[section.get('sectid')] = Section.fromxml(section)
+            self.add_section(section)
+
+    def record(self, level, msg, section=None, board=None, pair=None):
+        self.problems.append(Problem(level, msg, section, board, pair))
+
+    # Warnings never stop the conversion, but are logged, and recorded when not
+    # strict
+    def warn(self, msg, section=None, board=None, pair=None):
+        logger.warning("section %s: %s", section, msg)
+        if not self.strict:
+            self.record('warning', msg, section, board, pair)
+
+    def error(self, err, section=None, board=None, pair=None):
+        if self.strict:
+            raise err
+        self.record('error', str(err), section, board, pair)
+
+    def get_section(self, sec_id):
+        sdata = self.sections.get(sec_id)
+        if sdata is None:
+            self.error(InvalidResultsException("unknown section: {}".format(sec_id)), sec_id)
+        return sdata
+
+    def add_section(self, section):
+        self.sections[section.get('sectid')] = Section.fromxml(section)
 
     def read_pairs(self, root):
         for section in root.findall("./scores/scsection"):
-            sdata = self.sections[section.get('id')]
-            for pair in section.findall("pair"):
-                pair = Pair.fromxml(pair, sdata.handicapped)
-                sdata.pairs.append(pair)
-            self.assign_ids(sdata, sdata.pairs)
+            self.read_section_pairs(section.get('id'), section.findall("pair"))
+
+        self.check_for_duplicates(self.pairs.values(), self.error)
 
-        self.check_for_duplicates(self.pairs.values())
+    def read_section_pairs(self, sec_id, pairs):
+        sdata = self.get_section(sec_id)
+        if sdata is None:
+            return
+        for pair in pairs:
+            try:
+                pair = Pair.fromxml(pair, sdata.handicapped)
+            except DATA_ERRORS as err:
+                self.error(err, sec_id, pair=pair.get('no'))
+                continue
+            sdata.pairs.append(pair)
+        self.assign_ids(sdata, sdata.pairs)
 
+    # Duplicates are raised, unless a function to report them is given
     @staticmethod
-    def check_for_duplicates(pairs):
+    def check_for_duplicates(pairs, report=None):
+        def duplicate(pair, which):
+            if report is None:
+                raise DuplicatePair(which)
+            report(DuplicatePair(which), pair=pair.id)
+
         unique_ids = set()
         unique_pairs = set()
         for pair in pairs:
             if pair.id in unique_ids:
-                raise DuplicatePair(pair.id)
+                duplicate(pair, pair.id)
             if pair.players in unique_pairs:
-                raise DuplicatePair(pair.players)
+                duplicate(pair, pair.players)
             unique_ids.add(pair.id)
             unique_pairs.add(pair.players)
 
@@ -382,7 +642,6 @@ class Session(object):
         id_func = self.get_id_function(section, pairs)
         for pair in pairs:
             pair.id = id_func(pair)
-            self.pairs[pair.id] = pair
 
             # Record the pair number for one or both of NS and EW.
             #
@@ -392,7 +651,25 @@ class Session(object):
             # will be recorded for both directions.
             for dir in DIRECTIONS:
                 if pair.plays(dir):
-                    section.set_pair_id(dir, pair.number, pair.id)
+                    try:
+                        section.set_pair_id(dir, pair.number, pair.id)
+                    except DuplicatePairMapping as err:
+                        self.error(err, section.id, pair=pair.id)
+
+            self.index_pair(section, pair)
+
+    def index_pair(self, section, pair):
+        self.pairs[pair.id] = pair
+        for dir in DIRECTIONS:
+            if pair.plays(dir):
+                self.pair_index[(section.id, dir, pair.number)] = pair
+
+    def merge_section(self, section, grid=None):
+        self.sections[section.id] = section
+        if grid is not None:
+            self.grids[section.id] = grid
+        for pair in section.pairs:
+            self.index_pair(section, pair)
 
     def get_id_function(self, section, pairs):
 
@@ -414,28 +691,103 @@ class Session(object):
 
     def read_boards(self, root):
         for section in root.findall("./board_results/brsection"):
-            sec_id = section.get('id')
-            sdata = self.sections[sec_id]
-            for result in section.findall("result"):
-                board = int(result.get('bd'))
-
-                # Traveller will be None if this was a phantom board
-                traveller = Traveller.fromxml(result, sdata)
-                if not traveller:
-                    continue
-
-                sdata.boards[board].append(traveller)
-                for dir in DIRECTIONS:
-                    if self.has_pair(sec_id, dir, result.get(dir)):
-                        pair = self.get_pair(sec_id, dir, result.get(dir))
-                        pair.boards_played += 1
-
-    def has_pair(self, sec_id, dir, dir_id):
-        return self.sections[sec_id].has_pair_id(dir, dir_id)
+            self.read_section_boards(section.get('id'), section.findall("result"))
+            self.check_grid(section.get('id'))
+
+    def read_section_boards(self, sec_id, results):
+        sdata = self.get_section(sec_id)
+        if sdata is None:
+            return
+        index = self.pair_index
+        grid = self.grids.get(sec_id)
+        if grid is None:
+            grid = self.grids[sec_id] = ResultGrid()
+        unknown_id = sdata.get_unknown_pair_id()
+        for result in results:
+            ns_no = result.get('ns')
+            ew_no = result.get('ew')
+            ns = index.get((sec_id, 'ns', ns_no))
+            ew = index.get((sec_id, 'ew', ew_no))
+            round = result.get('rnd')
+            table = result.get('tab')
+
+            # Traveller will be None if this was a phantom board
+            try:
+                board = result.get('bd')
+                if board is None:
+                    check_attributes(result, RESULT_ATTRIBUTES)
+                board = int(board)
+                traveller = Traveller.fromxml(result,
+                                              ns.id if ns else unknown_id,
+                                              ew.id if ew else unknown_id)
+
+                # Check where the result was played against the rest. Phantoms
+                # are included, since they take up a place in the movement, but
+                # results without a round and table (as from older versions of
+                # scorer) can't be checked.
+                if round is not None and table is not None:
+                    problems = grid.add(round, table, board, ns_no, ew_no)
+                    if problems:
+                        self.report_misplaced(sdata, board, problems)
+            except DuplicateResult as err:
+
+                # Scorer accepts these, so only warn: the result is still used
+                self.warn(str(err), sec_id, str(board))
+            except DATA_ERRORS as err:
+                self.error(err, sec_id, result.get('bd'))
+                continue
+            if not traveller:
+                continue
 
-    def get_pair(self, sec_id, dir, dir_id):
-        pair_id = self.sections[sec_id].get_pair_id(dir, dir_id)
-        return self.pairs[pair_id]
+            sdata.boards[board].append(traveller)
+            if ns:
+                ns.boards_played += 1
+            else:
+                self.add_unknown_pair(sdata, board, 'ns', ns_no)
+            if ew:
+                ew.boards_played += 1
+            else:
+                self.add_unknown_pair(sdata, board, 'ew', ew_no)
+
+    def report_misplaced(self, section, board, problems):
+        for problem in problems:
+            self.warn("misplaced result: {}".format(problem), section.id, str(board))
+
+    # Check for missing results once all of a section's results have been read,
+    # keeping only a summary of each round rather than the whole grid.
+    def check_grid(self, sec_id):
+        grid = self.grids.pop(sec_id, None)
+        if grid is None:
+            return
+        missing = grid.get_missing()
+        for (round, table, found, expected) in missing:
+            self.warn("round {}, table {}: {} of {} results missing".format(
+                round, table, expected - found, expected), sec_id)
+        self.round_summaries[sec_id] = grid.get_summaries(missing)
+
+    def check_grids(self):
+        for sec_id in sorted(self.grids):
+            self.check_grid(sec_id)
+
+    # Per-round summaries of the results for each section, as section ID ->
+    # list of RoundSummary
+    def get_round_summaries(self):
+        return OrderedDict((sec_id, self.round_summaries.get(sec_id, []))
+                           for sec_id in sorted(self.sections))
+
+    # Unknown pairs are logged once per section (see report_unknown_pairs), but
+    # each occurrence is recorded when not strict, to help track them down.
+    def add_unknown_pair(self, section, board, dir, id):
+        section.unknown_pairs.add((dir, id))
+        if not self.strict:
+            self.record('warning', "unknown pair ID '{}' for {}".format(id, dir), section.id, str(board))
+
+    def report_unknown_pairs(self):
+        for (sec_id, sdata) in sorted(self.sections.items()):
+            if sdata.unknown_pairs:
+                unknown = sorted(sdata.unknown_pairs, key=lambda x: (x[0], str(x[1])))
+                unknown = ", ".join("{} {}".format(id, dir) for (dir, id) in unknown)
+                logger.error("unknown pair IDs in section %s: %s", sec_id, unknown)
 
     def fixup_scores(self):
 
@@ -459,17 +811,21 @@ class Session(object):
 
         # Find adjusted travellers and MPs scored for each board
         for section in self.sections.values():
-            for travellers in section.boards.values():
+            for (board, travellers) in section.boards.items():
                 for traveller in travellers:
                     total_mps = (traveller.ns_mps + traveller.ew_mps).quantize(DECIMAL_1)
                     mps_scored_count[total_mps] += 1
                     if traveller.score == 'Adj':
-                        adjust.append(traveller)
+                        adjust.append((section.id, board, traveller))
+
+        if not mps_scored_count:
+            self.error(InvalidResultsException("no board results found"))
+            return
 
         # Find the most commonly used MP score
         # TODO: Check the MP counts look sane (i.e. should be almost all the same)
         mps_scored = sorted([(count, score) for (score, count) in mps_scored_count.items()])
-        mps = mps_scored[-1][1]
+        mps = self.board_top = mps_scored[-1][1]
 
         # Check the adjusted value is in multiples of 5%
         # Anything else likely means we've got unexpected input
@@ -477,13 +833,17 @@ class Session(object):
             return (score / 5) != (score / 5).quantize(DECIMAL_1)
 
         # Set scores on adjusted travellers
-        for traveller in adjust:
+        for (sec_id, board, traveller) in adjust:
+            if not mps:
+                self.error(InvalidResultsException("board top is zero: can't calculate adjustment for {}/{}".format(
+                    traveller.ns, traveller.ew)), sec_id, str(board))
+                continue
             ns = self.percentage(traveller.ns_mps, mps, DECIMAL_1)
             ew = self.percentage(traveller.ew_mps, mps, DECIMAL_1)
             adjustment = "A{}{}".format(ns, ew)
             if unexpected(ns) or unexpected(ew):
-                logging.warning("unexpected adjustment for %s %s/%s: %s",
-                                section.id, traveller.ns, traveller.ew, adjustment)
+                self.warn("unexpected adjustment for {}/{}: {}".format(
+                    traveller.ns, traveller.ew, adjustment), sec_id, board)
             traveller.score = adjustment
 
     @staticmethod
@@ -542,19 +902,41 @@ class Event(object):
         else:
             self.winners = 1
 
-        # Calculate places. We can't rely on scorer as it reports winners for
-        # each section and possibly direction (depending on movement), whereas
-        # we need to report them overall across sections.
+        # Calculated up front, so each pair's score never has scorer's place
+        self.update_places()
+
+        # Calculated when first needed
+        self._max_boards = None
+
+    # Calculate places. We can't rely on scorer as it reports winners for each
+    # section and possibly direction (depending on movement), whereas we need to
+    # report them overall across sections. This must be done again if the
+    # pairs' scores are changed.
+    def update_places(self):
         self.session.fixup_places(self.winners)
+        self.places = dict((pair.id, pair.score.place) for pair in self.session.pairs.values())
+
+    @property
+    def max_boards(self):
+        if self._max_boards is None:
+            self._max_boards = max([pair.boards_played for pair in self.session.pairs.values()])
+        return self._max_boards
 
     @staticmethod
     def fromxml(root):
+        Event.check_scoring_type(root)
+        session = Session.fromxml(root)
+        return Event.fromsession(root, session)
+
+    @staticmethod
+    def check_scoring_type(root):
 
         # TODO
         if root.get('scoring_type') != 'MP':
             raise InvalidEventType(root.get('scoring_type'))
 
-        session = Session.fromxml(root)
+    @staticmethod
+    def fromsession(root, session):
         return Event(root.get('club'),
                      root.get('club_no'),
                      'PAIRS',
@@ -564,6 +946,23 @@ class Event(object):
                      session)
 
     def get_usebio_xml(self):
+        (xml, event) = self.get_event_xml()
+        for (sec_id, sdata) in sorted(self.session.sections.items()):
+
+            # If there is a single section omit the tag
+            if len(self.session.sections) == 1:
+                section = event
+            else:
+                section = element(event, 'SECTION')
+                section.set('SECTION_ID', sec_id)
+
+            self.write_participants(section, sdata.pairs)
+            self.write_boards(section, sdata.boards)
+
+        return xml
+
+    # The USEBIO document and its event element, with the event details filled in
+    def get_event_xml(self):
         xml = ET.Element('USEBIO')
         xml.set('Version', '1.2')
 
@@ -571,8 +970,6 @@ class Event(object):
         element(club, 'CLUB_NAME', self.club_name)
         element(club, 'CLUB_ID_NUMBER', self.club_id)
 
-        max_boards = max([pair.boards_played for pair in self.session.pairs.values()])
-
         event = element(xml, 'EVENT')
         event.set('EVENT_TYPE', self.scoring_type)
         element(event, 'PROGRAM_NAME', 'Scorer')
@@ -581,31 +978,24 @@ class Event(object):
         element(event, 'DATE', self.event_date)
         element(event, 'WINNER_TYPE', self.winners)
         non_empty_element(event, 'BOARD_SCORING_METHOD', self.board_scoring)
-        element(event, 'BOARDS_PLAYED', max_boards)
+        element(event, 'BOARDS_PLAYED', self.max_boards)
         element(event, 'MPS_AWARDED_FLAG', 'Y')
+        return (xml, event)
 
-        for (sec_id, sdata) in sorted(self.session.sections.items()):
-
-            # If there is a single section omit the tag
-            if len(self.session.sections) == 1:
-                section = event
-            else:
-                section = element(event, 'SECTION')
-                section.set('SECTION_ID', sec_id)
-
-            consistent = Pair.consistent_seating(sdata.pairs)
-
-            participants = element(section, 'PARTICIPANTS')
-            for pair in sorted(sdata.pairs, key=lambda pair: Event.get_pair_key(pair, consistent)):
-                participants.append(pair.get_usebio_xml())
-
-            for board_id in sorted(sdata.boards.keys()):
-                board = element(section, 'BOARD')
-                element(board, 'BOARD_NUMBER', board_id)
-                for traveller in sdata.boards[board_id]:
-                    board.append(traveller.get_usebio_xml())
+    @staticmethod
+    def write_participants(parent, pairs):
+        consistent = Pair.consistent_seating(pairs)
+        participants = element(parent, 'PARTICIPANTS')
+        for pair in sorted(pairs, key=lambda pair: Event.get_pair_key(pair, consistent)):
+            participants.append(pair.get_usebio_xml())
 
-        return xml
+    @staticmethod
+    def write_boards(parent, boards):
+        for board_id in sorted(boards.keys()):
+            board = element(parent, 'BOARD')
+            element(board, 'BOARD_NUMBER', board_id)
+            for traveller in boards[board_id]:
+                board.append(traveller.get_usebio_xml())
 
     @staticmethod
     def get_pair_key(pair, use_dir):
@@ -617,11 +1007,52 @@ def convert(file, include_dtd = False):
 
     dom = ET.parse(file)
     event = Event.fromxml(dom.getroot())
-    converted = event.get_usebio_xml()
-    tree = ET.ElementTree(converted)
+    return (event, build_tree(event, include_dtd))
+
+def build_tree(event, include_dtd = False):
+    if include_dtd and not using_lxml:
+        raise ValueError("DTDs are only supported when using lxml")
+
+    tree = ET.ElementTree(event.get_usebio_xml())
     if include_dtd:
         add_dtd(tree)
-    return (event, tree)
+    return tree
+
+def serialize(tree, pretty = False, include_dtd = False):
+    params = {
+        'encoding': 'utf-8'
+    }
+    if using_lxml:
+        params['pretty_print'] = pretty
+        params['xml_declaration'] = include_dtd
+    output = io.BytesIO()
+    tree.write(output, **params)
+    return output.getvalue()
+
+# Raise if any of the given attributes of an element (or attribute dictionary)
+# are missing, naming all of them
+def check_attributes(elem, names):
+    missing = [name for name in names if elem.get(name) is None]
+    if missing:
+        raise MissingAttributes(missing)
+
+def intern_text(text):
+    if not text:
+        return text
+    value = interned.get(text)
+    if value is None:
+        value = add_to_cache(interned, text, text)
+    return value
+
+def add_to_cache(table, key, value):
+    if len(table) >= CACHE_LIMIT:
+        table.clear()
+    table[key] = value
+    return value
+
+def clear_caches():
+    for table in (interned, decoded_contracts, decoded_mps):
+        table.clear()
 
 def element(parent, name, value = None):
     assert parent is not None
@@ -0,0 +1,178 @@
+import io
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from .convert import Event, ET, build_tree, serialize
+from .harden import parse
+from .isolation import IsolatedExecutor
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+Diagnostic = namedtuple('Diagnostic', ['level', 'message'])
+
+# Timings are the seconds taken by each phase of the conversion (up to any
+# error), and input_size is None if not known (i.e. for a file object).
+ConversionResult = namedtuple('ConversionResult', [
+    'name', 'event', 'output', 'diagnostics', 'error', 'timings', 'input_size',
+])
+
+# Records problems logged via the package's loggers against the conversion
+# running in the current thread (if any).
+#
+# The handler is only attached to the package's logger while a conversion is
+# being captured: if it were always attached, problems logged when converting
+# any other way would not reach logging's last resort handler, and so would not
+# be shown at all unless the caller had configured logging.
+class DiagnosticsHandler(logging.Handler):
+    def __init__(self, logger):
+        logging.Handler.__init__(self)
+        self.logger = logger
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.active = 0
+
+    def emit(self, record):
+        diagnostics = getattr(self.local, 'diagnostics', None)
+        if diagnostics is not None:
+            diagnostics.append(Diagnostic(record.levelname, record.getMessage()))
+
+    def capture(self):
+        return CapturedDiagnostics(self)
+
+    # Attached while any conversion (in any thread) is being captured
+    def attach(self):
+        with self.lock:
+            if self.active == 0:
+                self.logger.addHandler(self)
+            self.active += 1
+
+    def detach(self):
+        with self.lock:
+            self.active -= 1
+            if self.active == 0:
+                self.logger.removeHandler(self)
+
+class CapturedDiagnostics(object):
+    def __init__(self, handler):
+        self.handler = handler
+        self.diagnostics = []
+        self.previous = None
+
+    def __enter__(self):
+        local = self.handler.local
+        self.previous = getattr(local, 'diagnostics', None)
+        local.diagnostics = self.diagnostics
+        self.handler.attach()
+        return self.diagnostics
+
+    def __exit__(self, *exc_info):
+        self.handler.detach()
+        self.handler.local.diagnostics = self.previous
+
+# Problems are logged via the package's loggers as usual, and also recorded
+# against the conversion running in the current thread (if any).
+diagnostics_handler = DiagnosticsHandler(logging.getLogger('scorer_to_usebio'))
+
+def get_name(input):
+    if isinstance(input, bytes):
+        return None
+    return input if isinstance(input, str) else getattr(input, 'name', None)
+
+class Converter(object):
+
+    # If limits (see harden.ParseLimits) are given, input is parsed safely
+    # within them. Time limits (in seconds) require a process pool: each
+    # conversion is then run in its own process, killed if it runs over.
+    def __init__(self, include_dtd=False, pretty=False, pool='thread', workers=None,
+                 limits=None, cpu_limit=None, wall_limit=None):
+        if pool not in POOLS:
+            raise ValueError("unknown pool type '{}': must be one of {}".format(pool, ', '.join(sorted(POOLS))))
+        if (cpu_limit or wall_limit) and pool != 'process':
+            raise ValueError("time limits can only be used with a process pool")
+
+        self.include_dtd = include_dtd
+        self.pretty = pretty
+        self.pool = pool
+        self.workers = workers
+        self.limits = limits
+        self.cpu_limit = cpu_limit
+        self.wall_limit = wall_limit
+
+    # Input may be a file name, a file object or the contents of a file (as bytes)
+    def convert(self, input):
+        name = get_name(input)
+        input_size = None
+        if isinstance(input, bytes):
+            source = io.BytesIO(input)
+            input_size = len(input)
+        else:
+            source = input
+            if isinstance(input, str) and os.path.isfile(input):
+                input_size = os.path.getsize(input)
+
+        timings = {}
+        def timed(phase, func, *args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                timings[phase] = time.perf_counter() - start
+
+        with diagnostics_handler.capture() as diagnostics:
+            try:
+                root = timed('parse', lambda: self.parse(source).getroot())
+                event = timed('model', Event.fromxml, root)
+                output = timed('output', lambda: serialize(build_tree(event, self.include_dtd),
+                                                           self.pretty, self.include_dtd))
+            except Exception as err:
+                return ConversionResult(name, None, None, diagnostics, err, timings, input_size)
+
+        return ConversionResult(name, event, output, diagnostics, None, timings, input_size)
+
+    def parse(self, source):
+        if self.limits is None:
+            return ET.parse(source)
+        return parse(source, self.limits)
+
+    def create_executor(self):
+        if self.cpu_limit or self.wall_limit:
+            return IsolatedExecutor(self.workers, self.cpu_limit, self.wall_limit)
+        return POOLS[self.pool](self.workers)
+
+    # Returns future -> input for each input
+    def submit(self, executor, inputs):
+        return OrderedDict((executor.submit(self.convert, input), input) for input in inputs)
+
+    # Yields results in the same order as the inputs, as soon as each is
+    # available, or in whatever order they complete if ordered is false.
+    def convert_many(self, inputs, executor=None, ordered=True):
+        if executor is None:
+            with self.create_executor() as executor:
+                for result in self.iter_results(self.submit(executor, inputs), ordered):
+                    yield result
+        else:
+            for result in self.iter_results(self.submit(executor, inputs), ordered):
+                yield result
+
+    @staticmethod
+    def iter_results(futures, ordered):
+        for future in (futures if ordered else as_completed(futures)):
+            yield Converter.get_result(future, futures[future])
+
+    # Conversion errors are caught and returned in the result, but running the
+    # conversion can fail too, e.g. if its worker is killed for running over
+    # its time limit.
+    @staticmethod
+    def get_result(future, input):
+        try:
+            return future.result()
+        except Exception as err:
+            return ConversionResult(get_name(input), None, None, [], err, {}, None)
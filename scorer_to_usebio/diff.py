@@ -0,0 +1,151 @@
+import argparse
+import sys
+
+from collections import OrderedDict, namedtuple
+
+from .convert import ET, Event
+
+# A difference between two USEBIO documents: what changed (the event details,
+# a pair or a traveller line) and its key, and the field which differs. The
+# field is None if the pair or traveller line was only in one of them.
+Difference = namedtuple('Difference', ['kind', 'key', 'field', 'old', 'new'])
+
+# A flattened element: the text of each leaf descendant, by its path below it.
+# Children repeated within their parent (e.g. players) are numbered.
+def get_fields(elem, fields=None, prefix=''):
+    if fields is None:
+        fields = OrderedDict()
+    counts = {}
+    for child in elem:
+        counts[child.tag] = counts.get(child.tag, 0) + 1
+    seen = {}
+    for child in elem:
+        name = prefix + child.tag
+        if counts[child.tag] > 1:
+            seen[child.tag] = seen.get(child.tag, 0) + 1
+            name = '{}[{}]'.format(name, seen[child.tag])
+        if len(child):
+            get_fields(child, fields, name + '/')
+        else:
+            fields[name] = (child.text or '').strip()
+    return fields
+
+def get_text(elem, tag):
+    return (elem.findtext(tag) or '').strip()
+
+# Index a USEBIO document in a single pass: the event details, pairs by their
+# number and traveller lines by (board, NS, EW)
+def index_usebio(root):
+    details = OrderedDict()
+    pairs = OrderedDict()
+    travellers = OrderedDict()
+
+    club = root.find('CLUB')
+    if club is not None:
+        get_fields(club, details, 'CLUB/')
+    event = root.find('EVENT')
+    if event is None:
+        return (details, pairs, travellers)
+
+    for (name, value) in event.attrib.items():
+        details['EVENT/@' + name] = value
+
+    # Pairs and boards are usually in the sections (if there are any), but
+    # may be given for the event as a whole (e.g. by aggregate or simultaneous)
+    sections = [event] + event.findall('SECTION')
+    for child in event:
+        if not len(child):
+            details['EVENT/' + child.tag] = (child.text or '').strip()
+
+    for section in sections:
+        for pair in section.findall('PARTICIPANTS/PAIR'):
+            add(pairs, get_text(pair, 'PAIR_NUMBER'), get_fields(pair))
+        for board in section.findall('BOARD'):
+            number = get_text(board, 'BOARD_NUMBER')
+            for line in board.findall('TRAVELLER_LINE'):
+                key = (number, get_text(line, 'NS_PAIR_NUMBER'), get_text(line, 'EW_PAIR_NUMBER'))
+                add(travellers, key, get_fields(line))
+    return (details, pairs, travellers)
+
+# Duplicate keys (which scorer should never produce) are kept apart by the
+# order they appear in, rather than one hiding the other
+def add(index, key, fields):
+    if key in index:
+        count = 2
+        while (key, count) in index:
+            count += 1
+        key = (key, count)
+    index[key] = fields
+
+def diff_fields(kind, key, old, new):
+    diffs = []
+    for (name, value) in old.items():
+        if new.get(name) != value:
+            diffs.append(Difference(kind, key, name, value, new.get(name)))
+    for (name, value) in new.items():
+        if name not in old:
+            diffs.append(Difference(kind, key, name, None, value))
+    return diffs
+
+def diff_index(kind, old, new):
+    diffs = []
+    for (key, fields) in old.items():
+        if key in new:
+            diffs.extend(diff_fields(kind, key, fields, new[key]))
+        else:
+            diffs.append(Difference(kind, key, None, fields, None))
+    for (key, fields) in new.items():
+        if key not in old:
+            diffs.append(Difference(kind, key, None, None, fields))
+    return diffs
+
+# Compare two USEBIO documents, matching pairs and traveller lines by their
+# keys rather than position, so e.g. a changed place or corrected traveller is
+# reported as such, wherever it appears. Takes time linear in their size.
+def diff_usebio(old, new):
+    (old_details, old_pairs, old_travellers) = index_usebio(old)
+    (new_details, new_pairs, new_travellers) = index_usebio(new)
+    return (diff_fields('event', None, old_details, new_details) +
+            diff_index('pair', old_pairs, new_pairs) +
+            diff_index('traveller', old_travellers, new_travellers))
+
+def diff_events(old, new):
+    return diff_usebio(old.get_usebio_xml(), new.get_usebio_xml())
+
+# Read a USEBIO file, or convert a scorer results file
+def read_usebio(path):
+    root = ET.parse(path).getroot()
+    if root.tag == 'USEBIO':
+        return root
+    return Event.fromxml(root).get_usebio_xml()
+
+def format_key(kind, key):
+    if isinstance(key, tuple) and isinstance(key[1], int):
+        return '{} (#{})'.format(format_key(kind, key[0]), key[1])
+    if kind == 'pair':
+        return 'pair {}'.format(key)
+    if kind == 'traveller':
+        return 'board {} {} v {}'.format(*key)
+    return 'event'
+
+def format_difference(diff):
+    key = format_key(diff.kind, diff.key)
+    if diff.field is None:
+        return '{}: {}'.format(key, 'removed' if diff.new is None else 'added')
+    return '{}: {}: {!r} -> {!r}'.format(key, diff.field, diff.old, diff.new)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio diff',
+        description='Show what changed between two conversions of a results file: pairs are matched by number and '
+                    'traveller lines by board and pairs. Either file may be USEBIO or a scorer results file.')
+    parser.add_argument('old', help='the earlier results')
+    parser.add_argument('new', help='the later results')
+
+    opts = parser.parse_args(args)
+    diffs = diff_usebio(read_usebio(opts.old), read_usebio(opts.new))
+    for diff in diffs:
+        print(format_difference(diff))
+    if diffs:
+        print('{} difference(s)'.format(len(diffs)), file=sys.stderr)
+        sys.exit(1)
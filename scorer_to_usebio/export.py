@@ -0,0 +1,210 @@
+import argparse
+import csv
+import logging
+import os
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .convert import ET, Event
+from .files import canonical_path, find_results_files
+
+logger = logging.getLogger(__name__)
+
+# Columns are stored as typed arrays: text values are stored as codes, indexing
+# into a dictionary shared by all the columns of the same kind.
+COLUMNS = [
+    ('session', 'l', 'sessions'),
+    ('section', 'l', 'sections'),
+    ('board', 'l', None),
+    ('ns', 'l', 'pairs'),
+    ('ew', 'l', 'pairs'),
+    ('contract', 'l', 'contracts'),
+    ('declarer', 'l', 'declarers'),
+    ('lead', 'l', 'leads'),
+    ('tricks', 'l', None),
+    ('score', 'l', None),
+    ('adjustment', 'l', 'adjustments'),
+    ('ns_mps', 'd', None),
+    ('ew_mps', 'd', None),
+]
+
+DICTIONARIES = sorted(set(dictionary for (name, type, dictionary) in COLUMNS if dictionary))
+
+DICTIONARY_PREFIX = 'dictionary:'
+
+class StringDictionary(object):
+    def __init__(self, values=('',)):
+        self.values = list(values)
+        self.codes = dict((value, code) for (code, value) in enumerate(self.values))
+
+    # Missing values are always code 0 (i.e. the empty string)
+    def encode(self, value):
+        value = value or ''
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class TravellerDataset(object):
+    def __init__(self):
+        self.columns = dict((name, array(type)) for (name, type, dictionary) in COLUMNS)
+        self.dictionaries = dict((name, StringDictionary()) for name in DICTIONARIES)
+
+    def __len__(self):
+        return len(self.columns['board'])
+
+    # Rows are keyed by the session (i.e. file) they came from, so adding a
+    # session again replaces its rows rather than adding them twice. A session
+    # which can't be added is left out entirely, rather than partly added.
+    def add_event(self, name, event):
+        self.remove_session(name)
+        start = len(self)
+        try:
+            self.add_travellers(name, event)
+        except BaseException:
+            for column in self.columns.values():
+                del column[start:]
+            raise
+
+    def remove_session(self, name):
+        code = self.dictionaries['sessions'].codes.get(name)
+        if code is None:
+            return
+        keep = [ii for (ii, session) in enumerate(self.columns['session']) if session != code]
+        if len(keep) < len(self):
+            for (column_name, column) in list(self.columns.items()):
+                self.columns[column_name] = array(column.typecode, [column[ii] for ii in keep])
+
+    def add_travellers(self, name, event):
+        session = self.dictionaries['sessions'].encode(name)
+        sections = self.dictionaries['sections']
+        pairs = self.dictionaries['pairs']
+        contracts = self.dictionaries['contracts']
+        declarers = self.dictionaries['declarers']
+        leads = self.dictionaries['leads']
+        adjustments = self.dictionaries['adjustments']
+        columns = self.columns
+        for (sec_id, sdata) in sorted(event.session.sections.items()):
+            section = sections.encode(sec_id)
+            for (board, travellers) in sorted(sdata.boards.items()):
+                for traveller in travellers:
+
+                    # Adjusted scores (e.g. A6040) are recorded separately, so
+                    # the score column is always numeric.
+                    (score, adjustment) = (traveller.score, None)
+                    try:
+                        score = int(score or 0)
+                    except ValueError:
+                        (score, adjustment) = (0, score)
+
+                    columns['session'].append(session)
+                    columns['section'].append(section)
+                    columns['board'].append(board)
+                    columns['ns'].append(pairs.encode(traveller.ns))
+                    columns['ew'].append(pairs.encode(traveller.ew))
+                    columns['contract'].append(contracts.encode(traveller.contract))
+                    columns['declarer'].append(declarers.encode(traveller.declarer))
+                    columns['lead'].append(leads.encode(traveller.lead))
+                    columns['tricks'].append(traveller.tricks)
+                    columns['score'].append(score)
+                    columns['adjustment'].append(adjustments.encode(adjustment))
+                    columns['ns_mps'].append(float(traveller.ns_mps))
+                    columns['ew_mps'].append(float(traveller.ew_mps))
+
+    @staticmethod
+    def load(path):
+        if path.endswith('.npz'):
+            return TravellerDataset.load_npz(path)
+        else:
+            return TravellerDataset.load_csv(path)
+
+    def save(self, path):
+        if path.endswith('.npz'):
+            self.save_npz(path)
+        else:
+            self.save_csv(path)
+
+    # Column-ordered CSV: each row holds a column (or dictionary), named by its
+    # first field, so each can be read in one go.
+    def save_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            for (name, type, dictionary) in COLUMNS:
+                writer.writerow([name] + self.columns[name].tolist())
+            for name in DICTIONARIES:
+                writer.writerow([DICTIONARY_PREFIX + name] + self.dictionaries[name].values)
+
+    @staticmethod
+    def load_csv(path):
+        dataset = TravellerDataset()
+        types = dict((name, type) for (name, type, dictionary) in COLUMNS)
+        with open(path, 'r', newline='') as file:
+            for row in csv.reader(file):
+                (name, values) = (row[0], row[1:])
+                if name.startswith(DICTIONARY_PREFIX):
+                    dataset.dictionaries[name[len(DICTIONARY_PREFIX):]] = StringDictionary(values)
+                elif types[name] == 'd':
+                    dataset.columns[name] = array('d', [float(value) for value in values])
+                else:
+                    dataset.columns[name] = array(types[name], [int(value) for value in values])
+        return dataset
+
+    def save_npz(self, path):
+        require_numpy()
+        arrays = {}
+        for (name, type, dictionary) in COLUMNS:
+            arrays[name] = numpy.frombuffer(self.columns[name], dtype=self.columns[name].typecode)
+        for name in DICTIONARIES:
+            arrays[DICTIONARY_PREFIX + name] = numpy.array(self.dictionaries[name].values, dtype=str)
+        numpy.savez_compressed(path, **arrays)
+
+    @staticmethod
+    def load_npz(path):
+        require_numpy()
+        dataset = TravellerDataset()
+        with numpy.load(path) as data:
+            for (name, type, dictionary) in COLUMNS:
+                dataset.columns[name] = array(type, data[name].astype(type).tobytes())
+            for name in DICTIONARIES:
+                dataset.dictionaries[name] = StringDictionary(data[DICTIONARY_PREFIX + name].tolist())
+        return dataset
+
+def require_numpy():
+    if numpy is None:
+        raise ImportError("You must install numpy in order to use the npz format")
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio export',
+        description='Export travellers from scorer results files as columns, for analysis.')
+    parser.add_argument('-a', '--append', action='store_true', help='append to the output dataset if it exists')
+    parser.add_argument('-o', '--output', required=True, metavar='file',
+                        help='dataset to write: .npz (requires numpy) or column-ordered .csv')
+    parser.add_argument('paths', metavar='path', nargs='+', help='results file(s), or directories containing them')
+
+    opts = parser.parse_args(args)
+    if opts.output.endswith('.npz') and numpy is None:
+        parser.error("numpy must be installed to use the npz format")
+
+    if opts.append and os.path.exists(opts.output):
+        dataset = TravellerDataset.load(opts.output)
+    else:
+        dataset = TravellerDataset()
+
+    # Sessions are named by the files' canonical paths, so appending a file
+    # again replaces its travellers however it is given
+    failed = 0
+    for file in find_results_files(opts.paths):
+        try:
+            dataset.add_event(canonical_path(file), Event.fromxml(ET.parse(file).getroot()))
+        except Exception as err:
+            logger.error("error reading %s: %s", file, err)
+            failed += 1
+    dataset.save(opts.output)
+    logger.info("wrote %d travellers to %s, %d file(s) failed", len(dataset), opts.output, failed)
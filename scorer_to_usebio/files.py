@@ -0,0 +1,67 @@
+import os
+import string
+
+alphanum = string.digits + string.ascii_letters
+filename_trans_table = str.maketrans(alphanum + "/ ", alphanum + "-_")
+
+# Expand any directories given into the scorer results (.xml) files beneath
+# them, in a consistent order. Files given explicitly are always included.
+def find_results_files(paths):
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+
+        found = []
+        for (root, dirs, names) in os.walk(path):
+            for name in names:
+                if name.lower().endswith('.xml'):
+                    found.append(os.path.join(root, name))
+        files.extend(sorted(found))
+    return files
+
+# The path by which to record a file (e.g. in a ledger or archive), so it is
+# the same whichever directory it was given from, and however it was reached
+def canonical_path(path):
+    return os.path.realpath(path)
+
+# Cheaply identify a version of a file, to detect when it has changed
+def get_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# Replace a file atomically, so it can never be left partly written (e.g. if
+# interrupted): it is either the old version or the new one. The data is on
+# disk before it replaces the old version, and the replacement is on disk
+# before this returns, so it also survives a crash or power loss.
+def write_atomically(path, data):
+    temp = path + '.tmp'
+    with open(temp, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, path)
+    sync_directory(os.path.dirname(path))
+
+# Make sure changes to a directory's entries (e.g. a file renamed into it) are
+# on disk. Directories can't be opened to do this on Windows, where it isn't
+# needed.
+def sync_directory(path):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path or os.curdir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# Named for when and what the event was, or if the results don't say, for the
+# file they were read from (if given)
+def get_default_filename(event, path=None):
+    if path is not None and not (event.event_date and event.event_name):
+        return os.path.splitext(os.path.basename(path))[0] + '.xml'
+    return "{}-{}.xml".format(sanitise(event.event_date), sanitise(event.event_name))
+
+def sanitise(text):
+    return text.translate(filename_trans_table)
@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from .convert import ET, InvalidResultsException, using_lxml
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Limits on what a results file may contain. Scorer's own files are small and
+# simple (elements are nested at most three deep), so these are generous.
+ParseLimits = namedtuple('ParseLimits', ['max_size', 'max_depth', 'max_elements', 'max_value_length'])
+
+DEFAULT_LIMITS = ParseLimits(
+    max_size=64 * 1024 * 1024,
+    max_depth=32,
+    max_elements=1000000,
+    max_value_length=64 * 1024,
+)
+
+class UnsafeInput(InvalidResultsException):
+    def __init__(self, msg):
+        InvalidResultsException.__init__(self, "rejected unsafe input: {}".format(msg))
+
+class LimitExceeded(UnsafeInput):
+    def __init__(self, limit, value):
+        UnsafeInput.__init__(self, "{} exceeded ({})".format(limit, value))
+
+# Builds the tree as usual, but rejects DTDs (and hence any entity definitions)
+# and enforces the limits as the document is parsed, rather than afterwards.
+class HardenedTreeBuilder(ET.TreeBuilder):
+    def __init__(self, limits):
+        ET.TreeBuilder.__init__(self)
+        self.limits = limits
+        self.depth = 0
+        self.elements = 0
+        self.text_length = 0
+
+        # The first violation found. lxml reports errors raised by the target
+        # as generic syntax errors, so the original is kept to be raised instead.
+        self.violation = None
+
+    def reject(self, violation):
+        if self.violation is None:
+            self.violation = violation
+        raise violation
+
+    def doctype(self, name, pubid, system):
+        self.reject(UnsafeInput("document type declarations are not allowed"))
+
+    def start(self, tag, attrs, *args):
+        self.depth += 1
+        self.elements += 1
+        self.text_length = 0
+        if self.depth > self.limits.max_depth:
+            self.reject(LimitExceeded('maximum depth', self.depth))
+        if self.elements > self.limits.max_elements:
+            self.reject(LimitExceeded('maximum number of elements', self.elements))
+        for value in attrs.values():
+            if len(value) > self.limits.max_value_length:
+                self.reject(LimitExceeded('maximum attribute length', len(value)))
+        return ET.TreeBuilder.start(self, tag, attrs, *args)
+
+    def end(self, tag):
+        self.depth -= 1
+        self.text_length = 0
+        return ET.TreeBuilder.end(self, tag)
+
+    def data(self, data):
+        self.text_length += len(data)
+        if self.text_length > self.limits.max_value_length:
+            self.reject(LimitExceeded('maximum text length', self.text_length))
+        return ET.TreeBuilder.data(self, data)
+
+def create_parser(builder):
+    if using_lxml:
+        return ET.XMLParser(target=builder, resolve_entities=False, no_network=True, load_dtd=False)
+    else:
+        return ET.XMLParser(target=builder)
+
+# Parse a results file (a file name or object) as ET.parse does, but without
+# resolving any entities or accessing the network, and within the given limits.
+def parse(source, limits=DEFAULT_LIMITS):
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return parse(file, limits)
+
+    builder = HardenedTreeBuilder(limits)
+    parser = create_parser(builder)
+    size = 0
+    try:
+        for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b''):
+            size += len(chunk)
+            if size > limits.max_size:
+                raise LimitExceeded('maximum size', size)
+            parser.feed(chunk)
+        root = parser.close()
+    except Exception:
+        if builder.violation is not None:
+            raise builder.violation from None
+        raise
+    return ET.ElementTree(root)
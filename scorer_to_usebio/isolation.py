@@ -0,0 +1,88 @@
+import math
+import multiprocessing
+import os
+import signal
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class TimeLimitExceeded(Exception):
+    def __init__(self, kind, limit):
+        Exception.__init__(self, "{} time limit of {}s exceeded".format(kind, limit))
+
+class WorkerDied(Exception):
+    def __init__(self, exitcode):
+        Exception.__init__(self, "worker process died (exit code {})".format(exitcode))
+
+# Workers are started from a fresh server process where possible, rather than
+# forked from this (possibly multi-threaded) one.
+def get_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+def run_isolated(conn, cpu_limit, fn, args):
+    if cpu_limit and resource is not None:
+        seconds = int(math.ceil(cpu_limit))
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    try:
+        result = (True, fn(*args))
+    except Exception as err:
+        result = (False, err)
+    conn.send(result)
+    conn.close()
+
+# An executor which runs each call in its own worker process, which is killed
+# if it exceeds its CPU (where supported) or wall-clock time limit, without
+# affecting any other calls. Each worker is only used once, so a bad input can't
+# leave a worker in a bad state for the next.
+class IsolatedExecutor(object):
+    def __init__(self, max_workers=None, cpu_limit=None, wall_limit=None):
+        self.cpu_limit = cpu_limit
+        self.wall_limit = wall_limit
+        self.context = get_context()
+        self.threads = ThreadPoolExecutor(max_workers or os.cpu_count() or 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def submit(self, fn, *args):
+        return self.threads.submit(self.run, fn, args)
+
+    def shutdown(self, wait=True):
+        self.threads.shutdown(wait)
+
+    def run(self, fn, args):
+        (receiver, sender) = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=run_isolated, args=(sender, self.cpu_limit, fn, args))
+        process.daemon = True
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(self.wall_limit):
+                process.terminate()
+                raise TimeLimitExceeded('wall', self.wall_limit)
+            (ok, value) = receiver.recv()
+        except EOFError:
+
+            # The worker died without sending a result
+            process.join()
+            sigxcpu = getattr(signal, 'SIGXCPU', None)
+            if sigxcpu is not None and process.exitcode == -sigxcpu:
+                raise TimeLimitExceeded('CPU', self.cpu_limit)
+            raise WorkerDied(process.exitcode)
+        finally:
+            receiver.close()
+            process.join()
+
+        if not ok:
+            raise value
+        return value
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .convert import ET, Player, Score
+from .files import canonical_path, find_results_files, get_signature
+
+logger = logging.getLogger(__name__)
+
+MASTER_POINT_TYPES = ['a', 'b', 'c']
+
+LedgerEntry = namedtuple('LedgerEntry', ['player', 'name', 'club', 'club_name', 'date', 'event', 'type', 'points'])
+
+# Read master points awarded to each player from a scorer results file. Only
+# the session attributes and pairs are needed, so the results are skipped.
+def read_entries(path):
+    root = None
+    entries = []
+    for (action, elem) in ET.iterparse(path, events=('start', 'end')):
+        if root is None:
+            root = dict(elem.attrib)
+        elif action == 'end' and elem.tag == 'pair':
+            players = [Player.fromxml(elem, which) for which in (1, 2)]
+            for mps in Score.get_master_points(elem):
+                for player in players:
+                    if player.has_id():
+                        entries.append(LedgerEntry(player.id, player.name,
+                                                   root.get('club_no'), root.get('club'),
+                                                   root.get('event_date'), root.get('event_name'),
+                                                   mps.type, mps.points))
+            elem.clear()
+        elif action == 'end' and elem.tag == 'result':
+            elem.clear()
+    return entries
+
+class Ledger(object):
+    def __init__(self):
+
+        # The entries read from each file, with the signature of the version
+        # they were read from. Files are only re-read if they have changed.
+        self.files = {}
+
+        # Running totals for each player at each club: player -> club -> type -> points
+        self.totals = {}
+        self.names = {}
+        self.clubs = {}
+
+    @staticmethod
+    def load(path):
+        ledger = Ledger()
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                data = json.load(file)
+            for (file, record) in data['files'].items():
+                entries = [LedgerEntry(*entry) for entry in record['entries']]
+                ledger.files[file] = (record['signature'], entries)
+            ledger.totals = data['totals']
+            ledger.names = data['names']
+            ledger.clubs = data['clubs']
+        return ledger
+
+    def save(self, path):
+        data = {
+            'files': dict((file, {'signature': signature, 'entries': entries})
+                          for (file, (signature, entries)) in self.files.items()),
+            'totals': self.totals,
+            'names': self.names,
+            'clubs': self.clubs,
+        }
+
+        # Write atomically, so an interrupted update can't corrupt the ledger
+        temp = path + '.tmp'
+        with open(temp, 'w') as file:
+            json.dump(data, file, sort_keys=True)
+        os.replace(temp, path)
+
+    def add_file(self, file, signature, entries):
+        self.remove_file(file)
+        self.files[file] = (signature, entries)
+        for entry in entries:
+            self.names[entry.player] = entry.name
+            self.clubs[entry.club] = entry.club_name
+            self.apply(entry, entry.points)
+
+    def remove_file(self, file):
+        if file not in self.files:
+            return
+        (signature, entries) = self.files.pop(file)
+        for entry in entries:
+            self.apply(entry, -entry.points)
+
+    def apply(self, entry, points):
+        clubs = self.totals.setdefault(entry.player, {})
+        types = clubs.setdefault(entry.club, {})
+        total = types.get(entry.type, 0) + points
+        if total:
+            types[entry.type] = total
+            return
+
+        # Drop totals which have gone back to zero (i.e. the file was removed)
+        del types[entry.type]
+        if not types:
+            del clubs[entry.club]
+        if not clubs:
+            del self.totals[entry.player]
+
+    # Re-key any files recorded by other paths (e.g. by older versions, which
+    # recorded them as given) by their canonical paths, dropping duplicates
+    def canonicalise(self):
+        for file in list(self.files):
+            key = canonical_path(file)
+            if key == file:
+                continue
+            if key in self.files:
+                self.remove_file(file)
+            else:
+                self.files[key] = self.files.pop(file)
+
+    def get_stale_files(self, files):
+        stale = []
+        for file in files:
+            signature = get_signature(file)
+            if file not in self.files or self.files[file][0] != signature:
+                stale.append((file, signature))
+        return stale
+
+    # Bring the ledger up to date with the given files: only new or changed
+    # files are read, using the given executor. Files are recorded by their
+    # canonical paths, so each is only counted once however it is given.
+    def update(self, files, executor):
+        files = list(OrderedDict((canonical_path(file), None) for file in files))
+        self.canonicalise()
+        for file in [file for file in self.files if not os.path.exists(file)]:
+            logger.info("removing deleted file: %s", file)
+            self.remove_file(file)
+
+        stale = self.get_stale_files(files)
+        futures = [(file, signature, executor.submit(read_entries, file)) for (file, signature) in stale]
+        failed = 0
+        for (file, signature, future) in futures:
+            try:
+                self.add_file(file, signature, future.result())
+            except Exception as err:
+                logger.error("error reading %s: %s", file, err)
+                failed += 1
+        return (len(stale), failed)
+
+    def get_player_totals(self):
+        totals = {}
+        for (player, clubs) in self.totals.items():
+            player_totals = totals[player] = {}
+            for types in clubs.values():
+                for (type, points) in types.items():
+                    player_totals[type] = player_totals.get(type, 0) + points
+        return totals
+
+    def write_csv(self, output, by_club=False):
+        writer = csv.writer(output)
+        header = ['player', 'name'] + MASTER_POINT_TYPES + ['total']
+        if by_club:
+            header = ['club', 'club_name'] + header
+        writer.writerow(header)
+
+        def points(types):
+            return [types.get(type, 0) for type in MASTER_POINT_TYPES] + [sum(types.values())]
+
+        if by_club:
+            rows = []
+            for (player, clubs) in self.totals.items():
+                for (club, types) in clubs.items():
+                    rows.append([club, self.clubs.get(club), player, self.names.get(player)] + points(types))
+        else:
+            rows = [[player, self.names.get(player)] + points(types)
+                    for (player, types) in self.get_player_totals().items()]
+        writer.writerows(sorted(rows, key=lambda row: [str(x) for x in row[:len(header) - 4]]))
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio ledger',
+        description='Total master points awarded to each player across scorer results files. '
+                    'Points are reported in hundredths, as in USEBIO.')
+    parser.add_argument('-l', '--ledger', default='ledger.json',
+                        help='ledger file, updated with any new or changed files (default: %(default)s)')
+    parser.add_argument('-c', '--by-club', help='report totals for each player at each club', action='store_true')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files to read in parallel (default: one per CPU)')
+    parser.add_argument('paths', metavar='path', nargs='*',
+                        help='results file(s), or directories containing them, to add to the ledger')
+
+    opts = parser.parse_args(args)
+    ledger = Ledger.load(opts.ledger)
+    if opts.paths:
+        with ProcessPoolExecutor(opts.jobs) as executor:
+            (read, failed) = ledger.update(find_results_files(opts.paths), executor)
+        ledger.save(opts.ledger)
+        logger.info("read %d new or changed file(s), %d failed", read, failed)
+    ledger.write_csv(sys.stdout, opts.by_club)
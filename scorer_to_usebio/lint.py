@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .convert import ET, Event, InvalidEventType, InvalidResultsException, Problem, Session
+from .files import find_results_files
+from .harden import parse
+
+FORMATS = ['json', 'junit']
+
+# Check a results file, carrying on past any problems to find all of them
+def lint_file(path):
+    return check_file(path)[0]
+
+# Check a results file, returning the problems found and a summary of each
+# round's results (by section). Files are parsed safely, since they may come
+# from anywhere.
+def check_file(path):
+    try:
+        root = parse(path).getroot()
+    except (EnvironmentError, SyntaxError, InvalidResultsException) as err:
+        return ([Problem('error', str(err), None, None, None)], {})
+
+    problems = []
+    try:
+        Event.check_scoring_type(root)
+    except InvalidEventType as err:
+        problems.append(Problem('error', str(err), None, None, None))
+
+    session = Session.fromxml(root, strict=False)
+    return (problems + session.problems, session.get_round_summaries())
+
+# Lint the given files using the given executor, yielding (file, problems) in
+# order. A file which can't be checked at all is reported as a single error.
+def lint_files(files, executor):
+    for (file, problems, rounds) in check_files(files, executor):
+        yield (file, problems)
+
+# As lint_files, but yielding (file, problems, round summaries)
+def check_files(files, executor):
+    futures = [(file, executor.submit(check_file, file)) for file in files]
+    for (file, future) in futures:
+        try:
+            (problems, rounds) = future.result()
+        except Exception as err:
+            (problems, rounds) = ([Problem('error', "{}: {}".format(type(err).__name__, err), None, None, None)], {})
+        yield (file, problems, rounds)
+
+def describe(problem):
+    location = []
+    if problem.section is not None:
+        location.append('section {}'.format(problem.section))
+    if problem.board is not None:
+        location.append('board {}'.format(problem.board))
+    if problem.pair is not None:
+        location.append('pair {}'.format(problem.pair))
+    if location:
+        return '{}: {}'.format(', '.join(location), problem.message)
+    return problem.message
+
+def count(results, level):
+    return sum(1 for (file, problems) in results for problem in problems if problem.level == level)
+
+def get_file_report(file, problems, rounds=None):
+    report = {'file': file, 'problems': [problem._asdict() for problem in problems]}
+    if rounds is not None:
+        report['rounds'] = dict((sec_id, [summary._asdict() for summary in summaries])
+                                for (sec_id, summaries) in rounds.get(file, {}).items())
+    return report
+
+# Write the report as JSON, including per-round summaries if given (as file ->
+# section ID -> list of RoundSummary)
+def write_json(results, output, rounds=None):
+    report = {
+        'files': [get_file_report(file, problems, rounds) for (file, problems) in results],
+        'errors': count(results, 'error'),
+        'warnings': count(results, 'warning'),
+    }
+    output.write(json.dumps(report, indent=2, sort_keys=True))
+    output.write('\n')
+
+# JUnit XML, as understood by most CI servers: each file is a test case, failed
+# if it has any errors. Warnings are included as the test case's output.
+def get_junit_xml(results):
+    suite = ET.Element('testsuite')
+    suite.set('name', 'scorer_to_usebio lint')
+    suite.set('tests', str(len(results)))
+    suite.set('failures', str(sum(1 for (file, problems) in results
+                                  if any(problem.level == 'error' for problem in problems))))
+    for (file, problems) in results:
+        case = ET.SubElement(suite, 'testcase')
+        case.set('classname', 'lint')
+        case.set('name', file)
+        errors = [describe(problem) for problem in problems if problem.level == 'error']
+        warnings = [describe(problem) for problem in problems if problem.level == 'warning']
+        if errors:
+            failure = ET.SubElement(case, 'failure')
+            failure.set('message', errors[0])
+            failure.text = '\n'.join(errors)
+        if warnings:
+            ET.SubElement(case, 'system-out').text = '\n'.join(warnings)
+    return ET.ElementTree(suite)
+
+def write_junit(results, output, rounds=None):
+    output.write(ET.tostring(get_junit_xml(results).getroot(), encoding='unicode'))
+    output.write('\n')
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio lint',
+        description='Check scorer results files, reporting all the problems found in each.')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='json', help='report format (default: %(default)s)')
+    parser.add_argument('-o', '--output', metavar='file', help='write the report to this file (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files to check in parallel (default: one per CPU)')
+    parser.add_argument('-r', '--rounds', action='store_true',
+                        help='include a summary of the results entered for each round (JSON only)')
+    parser.add_argument('paths', metavar='path', nargs='+', help='results file(s), or directories containing them')
+
+    opts = parser.parse_args(args)
+    with ProcessPoolExecutor(opts.jobs) as executor:
+        checked = list(check_files(find_results_files(opts.paths), executor))
+    results = [(file, problems) for (file, problems, rounds) in checked]
+    rounds = dict((file, summaries) for (file, problems, summaries) in checked) if opts.rounds else None
+
+    write = write_json if opts.format == 'json' else write_junit
+    if opts.output:
+        with open(opts.output, 'w') as output:
+            write(results, output, rounds)
+    else:
+        write(results, sys.stdout, rounds)
+
+    # Fail if there are any errors, e.g. for use in CI
+    if count(results, 'error'):
+        sys.exit(1)
@@ -0,0 +1,448 @@
+import argparse
+import json
+import logging
+import os
+import threading
+
+from collections import OrderedDict, deque
+from decimal import Decimal
+
+try:
+    from http.server import ThreadingHTTPServer as HTTPServer
+except ImportError:
+    from http.server import HTTPServer
+from http.server import BaseHTTPRequestHandler
+
+from .convert import DATA_ERRORS, ET, Event, InvalidEventType, InvalidResultsException, Pair, Session, Traveller
+
+logger = logging.getLogger(__name__)
+
+# Events kept for clients which reconnect (or fall behind): any further behind
+# than this are sent a new snapshot instead.
+HISTORY = 256
+
+# How often to send a comment to idle clients, so dead connections are noticed
+KEEPALIVE = 15
+
+DIRECTION_CODES = {'ns': 'N', 'ew': 'E', None: ''}
+
+# A pair's standing, accumulated from the results it has played so far. Its top
+# is the total MPs available on those boards, so its percentage is correct after
+# any number of rounds, however many boards it has sat out.
+class Standing(object):
+    def __init__(self, section, dir, number, names=()):
+        self.section = section
+        self.dir = dir
+        self.number = number
+        self.names = names
+        self.mps = 0
+        self.top = 0
+        self.boards = 0
+        self.place = None
+
+    @property
+    def id(self):
+        return '{}-{}{}'.format(self.section, DIRECTION_CODES[self.dir], self.number)
+
+    def add(self, mps, top, sign=1):
+        self.mps += sign * mps
+        self.top += sign * top
+        self.boards += sign
+
+    def percentage(self):
+        if not self.top:
+            return Decimal(0)
+        return Session.percentage(self.mps, self.top)
+
+    def get_state(self):
+        return (self.mps, self.top, self.boards, self.place)
+
+    def to_dict(self, names=False):
+        data = OrderedDict([
+            ('id', self.id),
+            ('place', self.place),
+            ('mps', float(self.mps)),
+            ('percentage', float(self.percentage())),
+            ('boards', self.boards),
+        ])
+        if names:
+            data['section'] = self.section
+            data['number'] = self.number
+            data['names'] = list(self.names)
+        return data
+
+# Get the pairs from the scores, as (section, direction, number) -> names. The
+# scores may not have been written yet, in which case pairs are added as they
+# are found in the results.
+def read_pairs(root):
+    pairs = OrderedDict()
+    for section in root.findall("./scores/scsection"):
+        for pair in section.findall("pair"):
+            try:
+                dir = Pair.get_pair_direction(pair.get('dir'))
+            except DATA_ERRORS as err:
+                logger.warning("ignoring pair %s in section %s: %s", pair.get('no'), section.get('id'), err)
+                continue
+            names = (pair.get('player_name_1'), pair.get('player_name_2'))
+            pairs[(section.get('id'), dir, pair.get('no'))] = names
+    return pairs
+
+# Get the results, as (section, round, table, board) -> the raw attributes that
+# matter for the standings. Results are keyed by where they were played, rather
+# than kept in order, since any may be corrected between reads, and scorer
+# rescores earlier results on a board as later tables play it.
+def read_results(root):
+    results = {}
+    for section in root.findall("./board_results/brsection"):
+        sec_id = section.get('id')
+        for result in section.findall("result"):
+            key = (sec_id, result.get('rnd'), result.get('tab'), result.get('bd'))
+            results[key] = (result.get('ns'), result.get('ew'), result.get('mp_ns'), result.get('mp_ew'))
+    return results
+
+# Standings updated incrementally as results are entered: each update applies
+# only the results which are new or have changed since the last, and reports
+# only the pairs whose standing changed as a result.
+class Standings(object):
+    def __init__(self):
+        self.pairs = OrderedDict()
+        self.names = None
+        self.results = {}
+        self.round = 0
+        self.sequence = 0
+
+    def update(self, root):
+        Event.check_scoring_type(root)
+        names = read_pairs(root)
+        results = read_results(root)
+
+        # Pairs can't move between results, so if they change (e.g. the scores
+        # are written for the first time) start again from scratch.
+        if names != self.names:
+            self.reset(names)
+            self.apply(results)
+            self.rank()
+            return ('snapshot', self.get_snapshot())
+
+        before = dict((key, pair.get_state()) for (key, pair) in self.pairs.items())
+        if not self.apply(results):
+            return None
+        self.rank()
+
+        changed = [pair for (key, pair) in self.pairs.items() if before.get(key) != pair.get_state()]
+        added = [pair for (key, pair) in self.pairs.items() if key not in before]
+        if not changed:
+            return None
+        self.sequence += 1
+        return ('delta', OrderedDict([
+            ('seq', self.sequence),
+            ('round', self.round),
+            ('pairs', [pair.to_dict(names=pair in added) for pair in changed]),
+        ]))
+
+    def reset(self, names):
+        self.pairs = OrderedDict((key, Standing(*key, names=pair)) for (key, pair) in names.items())
+        self.names = names
+        self.results = {}
+        self.round = 0
+        self.sequence += 1
+
+    # Apply the results which differ from those last seen, returning whether
+    # there were any
+    def apply(self, results):
+        old = self.results
+        changed = False
+        for (key, row) in old.items():
+            if results.get(key) != row:
+                self.apply_result(key, row, -1)
+                changed = True
+        for (key, row) in results.items():
+            if old.get(key) != row:
+                self.apply_result(key, row, 1)
+                changed = True
+        self.results = results
+        if changed:
+            rounds = [int(rnd) for (sec_id, rnd, tab, bd) in results if rnd and rnd.isdigit()]
+            self.round = max(rounds) if rounds else 0
+        return changed
+
+    def apply_result(self, key, row, sign):
+        (ns, ew, ns_mps, ew_mps) = row
+
+        # Phantoms are recorded with -9999 MPs (see Traveller.fromxml)
+        if ns_mps == '-9999' or ew_mps == '-9999':
+            return
+        try:
+            ns_mps = Traveller.decode_mps(ns_mps)
+            ew_mps = Traveller.decode_mps(ew_mps)
+        except DATA_ERRORS:
+            if sign > 0:
+                logger.warning("ignoring result with invalid MPs in section %s, round %s, table %s, board %s", *key)
+            return
+
+        top = ns_mps + ew_mps
+        self.get_pair(key[0], 'ns', ns).add(ns_mps, top, sign)
+        self.get_pair(key[0], 'ew', ew).add(ew_mps, top, sign)
+
+    # Pairs which don't always sit the same direction are listed without one
+    def get_pair(self, sec_id, dir, number):
+        for key in ((sec_id, dir, number), (sec_id, None, number)):
+            if key in self.pairs:
+                return self.pairs[key]
+        pair = self.pairs[(sec_id, dir, number)] = Standing(sec_id, dir, number)
+        return pair
+
+    # Places, across sections (and by direction, if there are two winners), as
+    # Session.fixup_places does for the final results
+    def rank(self):
+        pairs = list(self.pairs.values())
+        if Pair.consistent_seating(pairs):
+            groups = [[pair for pair in pairs if pair.dir == dir] for dir in ('ns', 'ew')]
+        else:
+            groups = [pairs]
+
+        for group in groups:
+            place = None
+            prev_score = None
+            ranked = sorted(((pair.percentage(), pair) for pair in group),
+                            key=lambda x: (x[0], x[1].id), reverse=True)
+            for (ii, (percent, pair)) in enumerate(ranked):
+                if percent != prev_score:
+                    place = ii + 1
+                pair.place = place
+                prev_score = percent
+
+    def get_snapshot(self):
+        pairs = sorted(self.pairs.values(), key=lambda pair: (pair.place, pair.id))
+        return OrderedDict([
+            ('seq', self.sequence),
+            ('round', self.round),
+            ('pairs', [pair.to_dict(names=True) for pair in pairs]),
+        ])
+
+# The events sent to clients. The latest snapshot is always kept, so new
+# clients can be brought up to date, along with the last few events.
+class EventStream(object):
+    def __init__(self, history=HISTORY):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.last_id = 0
+        self.snapshot = None
+        self.closed = False
+
+    def publish(self, kind, data, snapshot):
+        with self.condition:
+            self.last_id += 1
+            self.events.append((self.last_id, kind, data))
+            self.snapshot = snapshot
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def get_snapshot(self):
+        with self.condition:
+            return (self.last_id, self.snapshot)
+
+    # Wait for events after the given one. Returns None if the client has
+    # fallen too far behind and must start again from a snapshot.
+    def wait(self, after, timeout):
+        with self.condition:
+            if after > self.last_id:
+                return None
+            self.condition.wait_for(lambda: self.last_id > after or self.closed, timeout)
+            events = [event for event in self.events if event[0] > after]
+            if self.last_id > after and (not events or events[0][0] != after + 1):
+                return None
+            return events
+
+def format_event(id, kind, data):
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(id, kind, json.dumps(data, separators=(',', ':'))).encode('utf-8')
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Live standings</title>
+<style>
+body { font-family: sans-serif; font-size: 2vh; }
+table { border-collapse: collapse; margin: auto; }
+td, th { padding: 0.2em 1em; text-align: right; }
+td.names { text-align: left; }
+tr.changed { background: #ffc; }
+</style>
+</head>
+<body>
+<h1 id="round">Live standings</h1>
+<table>
+<thead><tr><th>Place</th><th>Pair</th><th></th><th>MPs</th><th>%</th><th>Boards</th></tr></thead>
+<tbody id="standings"></tbody>
+</table>
+<script>
+var pairs = {};
+function render(changed) {
+    var body = document.getElementById('standings');
+    var rows = Object.keys(pairs).map(function (id) { return pairs[id]; });
+    rows.sort(function (a, b) { return a.place - b.place || (a.id < b.id ? -1 : 1); });
+    body.innerHTML = '';
+    rows.forEach(function (pair) {
+        var tr = document.createElement('tr');
+        [pair.place, pair.section + pair.number, pair.names.join(' & '), pair.mps, pair.percentage.toFixed(2),
+         pair.boards].forEach(function (value, ii) {
+            var td = document.createElement('td');
+            td.textContent = value;
+            if (ii == 2) td.className = 'names';
+            tr.appendChild(td);
+        });
+        if (changed[pair.id]) tr.className = 'changed';
+        body.appendChild(tr);
+    });
+}
+function title(data) {
+    document.getElementById('round').textContent = 'Live standings' + (data.round ? ' after round ' + data.round : '');
+}
+var source = new EventSource('events');
+source.addEventListener('snapshot', function (e) {
+    var data = JSON.parse(e.data);
+    pairs = {};
+    data.pairs.forEach(function (pair) { pairs[pair.id] = pair; });
+    title(data);
+    render({});
+});
+source.addEventListener('delta', function (e) {
+    var data = JSON.parse(e.data), changed = {};
+    data.pairs.forEach(function (pair) {
+        pairs[pair.id] = Object.assign(pairs[pair.id] || {}, pair);
+        changed[pair.id] = true;
+    });
+    title(data);
+    render(changed);
+});
+</script>
+</body>
+</html>
+'''
+
+class LiveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/':
+            self.send_body('text/html; charset=utf-8', PAGE.encode('utf-8'))
+        elif self.path == '/standings':
+            snapshot = self.server.stream.get_snapshot()[1]
+            self.send_body('application/json', json.dumps(snapshot).encode('utf-8'))
+        elif self.path == '/events':
+            self.send_events()
+        else:
+            self.send_error(404)
+
+    def send_body(self, content_type, body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        stream = self.server.stream
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        # Browsers reconnect with the last event they saw: if it is still in
+        # the history they need only what they missed.
+        last_id = self.headers.get('Last-Event-ID')
+        events = None
+        if last_id and last_id.isdigit():
+            last_id = int(last_id)
+            events = stream.wait(last_id, 0)
+
+        try:
+            while not stream.closed:
+                if events is None:
+                    (last_id, snapshot) = stream.get_snapshot()
+                    if snapshot is not None:
+                        self.wfile.write(format_event(last_id, 'snapshot', snapshot))
+                elif events:
+                    for event in events:
+                        self.wfile.write(format_event(*event))
+                    last_id = events[-1][0]
+                else:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+                events = stream.wait(last_id, KEEPALIVE)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+# Serve the standings from a background thread: the page at http://host:port/,
+# the events it uses at /events and the current standings (as JSON) at
+# /standings. Returns the server: call shutdown() on it to stop.
+def serve_standings(stream, port, host='127.0.0.1'):
+    server = HTTPServer((host, port), LiveHandler)
+    server.daemon_threads = True
+    server.stream = stream
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+# Read the results file if it has changed, publishing any change in the
+# standings. Returns the file's new state, to pass in next time.
+def poll(path, standings, stream, state=None):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return state
+    new_state = (stat.st_mtime_ns, stat.st_size)
+    if new_state == state:
+        return state
+
+    # Scorer may be part way through writing the file: try again next time
+    try:
+        root = ET.parse(path).getroot()
+    except SyntaxError as err:
+        logger.debug("can't read %s yet: %s", path, err)
+        return state
+
+    try:
+        update = standings.update(root)
+    except (InvalidEventType, InvalidResultsException) as err:
+        logger.error("can't show standings for %s: %s", path, err)
+        return new_state
+    if update is not None:
+        stream.publish(update[0], update[1], standings.get_snapshot())
+    return new_state
+
+def watch(path, standings, stream, interval, stopped=None):
+    stopped = stopped or threading.Event()
+    state = None
+    while not stopped.is_set():
+        state = poll(path, standings, stream, state)
+        stopped.wait(interval)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio live',
+        description='Show live standings as results are entered, in browsers updated as each round is scored.')
+    parser.add_argument('-p', '--port', type=int, default=8000, help='port to serve on (default: %(default)s)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to serve on (default: %(default)s): use 0.0.0.0 for other machines')
+    parser.add_argument('-i', '--interval', type=float, default=1.0,
+                        help='how often to check the file for changes, in seconds (default: %(default)s)')
+    parser.add_argument('file', help='scorer results file, as it is being written')
+
+    opts = parser.parse_args(args)
+    standings = Standings()
+    stream = EventStream()
+    server = serve_standings(stream, opts.port, opts.host)
+    print('serving live standings at http://{}:{}/'.format(opts.host, server.server_address[1]))
+    try:
+        watch(opts.file, standings, stream, opts.interval)
+    finally:
+        stream.close()
+        server.shutdown()
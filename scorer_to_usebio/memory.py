@@ -0,0 +1,108 @@
+import logging
+import os
+import tracemalloc
+
+from contextlib import contextmanager
+
+from .convert import ET, Event, InvalidEventType, build_tree, using_lxml
+from .metadata import scan
+from .stream import CHUNK_SIZE, SessionBuilder
+
+logger = logging.getLogger(__name__)
+
+# Approximate peak memory used to convert a file, as a multiple of its size, by
+# parsing it whole (the DOM) or streaming it. Measured (as the growth in RSS)
+# converting synthetic sessions of up to 32 sections, including the grid each
+# section's results are checked against while they are read. lxml uses more, as
+# both libxml2 and lxml keep their own copy of each element.
+MEMORY_FACTORS = {
+    'lxml': (49, 31),
+    'etree': (22, 11),
+}
+
+# Allowance for the model's per-section indexes, mappings, etc.
+SECTION_OVERHEAD = 64 * 1024
+
+def estimate_memory(size, sections, streaming=False):
+    (dom, stream) = MEMORY_FACTORS['lxml' if using_lxml else 'etree']
+    return size * (stream if streaming else dom) + sections * SECTION_OVERHEAD
+
+# Whether a file should be streamed to keep within the given memory budget (in
+# bytes), estimated from its size and number of sections. Only pairs events can
+# be streamed: anything else is always converted whole. Warns if even streaming
+# it would likely exceed the budget.
+def should_stream(path, max_memory):
+    metadata = scan(path)
+    try:
+        Event.check_scoring_type({'scoring_type': metadata.scoring_type})
+    except InvalidEventType:
+        return False
+    size = os.path.getsize(path)
+    if estimate_memory(size, len(metadata.sections)) <= max_memory:
+        return False
+    if estimate_memory(size, len(metadata.sections), streaming=True) > max_memory:
+        logger.warning("%s would likely need more than %d MB even if streamed", path, max_memory // (1024 * 1024))
+    return True
+
+class MemoryReport(object):
+    def __init__(self):
+        self.phases = []
+
+    # Record the peak memory used during a phase, and how much of what it
+    # allocated is still in use at the end (i.e. held by what it produced).
+    # Only memory allocated by Python is traced: not e.g. by libxml2. If
+    # something else is already tracing, it's left running and the phase is
+    # measured from what was traced on entry.
+    @contextmanager
+    def phase(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            (start, _) = tracemalloc.get_traced_memory()
+
+            # Without reset_peak (Python < 3.9) the peak may predate the phase
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        else:
+            start = 0
+            tracemalloc.start()
+        try:
+            yield
+            (retained, peak) = tracemalloc.get_traced_memory()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.phases.append((name, max(peak - start, 0), max(retained - start, 0)))
+
+    def format(self):
+        lines = []
+        for (name, peak, retained) in self.phases:
+            lines.append('  {:<8} peak {:>9.1f} KiB  retained {:>9.1f} KiB'.format(name, peak / 1024, retained / 1024))
+        return '\n'.join(lines)
+
+# Convert a file, either parsing it whole or streaming it, reporting the memory
+# used by each phase of the conversion if a report is given.
+def convert_file(file, include_dtd=False, streaming=False, report=None):
+    phase = report.phase if report is not None else untraced
+    if streaming:
+        with phase('stream'):
+            builder = SessionBuilder()
+            with open(file, 'rb') as stream:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    builder.feed(chunk)
+            event = builder.close()
+    else:
+        with phase('dom'):
+            root = ET.parse(file).getroot()
+        with phase('model'):
+            event = Event.fromxml(root)
+
+        # Finished with the DOM: don't keep it while building the output
+        del root
+
+    with phase('output'):
+        tree = build_tree(event, include_dtd)
+    return (event, tree)
+
+@contextmanager
+def untraced(name):
+    yield
@@ -0,0 +1,84 @@
+import argparse
+import csv
+import sys
+
+from collections import namedtuple
+
+from .convert import ET
+from .files import find_results_files, get_default_filename
+
+# Event metadata is all at the start of the file, so only read a little at a time
+SCAN_CHUNK_SIZE = 4 * 1024
+
+EventMetadata = namedtuple('EventMetadata', [
+    'club_name',
+    'club_id',
+    'scoring_type',
+    'event_name',
+    'event_date',
+    'event_time',
+    'sections',
+])
+
+SectionMetadata = namedtuple('SectionMetadata', ['id', 'tables'])
+
+# Read just the event metadata and sections from a results file, stopping as
+# soon as the results start (i.e. without reading any pairs or results).
+def scan(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return scan(file)
+
+    parser = ET.XMLPullParser(events=('start',))
+    root = None
+    sections = []
+    while True:
+        chunk = source.read(SCAN_CHUNK_SIZE)
+        if not chunk:
+
+            # Make sure the parser reports any errors, e.g. for an empty file
+            parser.close()
+            break
+
+        parser.feed(chunk)
+        for (action, elem) in parser.read_events():
+            if root is None:
+                root = elem
+            elif elem.tag == 'section':
+                sections.append(SectionMetadata(elem.get('sectid'), get_tables(elem)))
+            elif elem.tag in ('board_results', 'scores'):
+                return get_metadata(root, sections)
+
+    return get_metadata(root, sections)
+
+def get_metadata(root, sections):
+    return EventMetadata(root.get('club'),
+                         root.get('club_no'),
+                         root.get('scoring_type'),
+                         root.get('event_name'),
+                         root.get('event_date'),
+                         root.get('event_time'),
+                         sections)
+
+def get_tables(section):
+    try:
+        return int(section.get('tables'))
+    except (TypeError, ValueError):
+        return None
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio scan',
+        description='List the event details of scorer results files as CSV, without converting them.')
+    parser.add_argument('paths', metavar='path', nargs='+', help='results file(s), or directories containing them')
+
+    opts = parser.parse_args(args)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['file', 'date', 'event', 'club', 'club_id', 'scoring_type', 'sections', 'tables', 'filename'])
+    for file in find_results_files(opts.paths):
+        metadata = scan(file)
+        tables = [section.tables for section in metadata.sections]
+        writer.writerow([file, metadata.event_date, metadata.event_name, metadata.club_name, metadata.club_id,
+                         metadata.scoring_type, len(metadata.sections),
+                         sum(tables) if None not in tables else None,
+                         get_default_filename(metadata, file)])
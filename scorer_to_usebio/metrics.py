@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+
+from collections import defaultdict
+
+try:
+    from http.server import ThreadingHTTPServer as HTTPServer
+except ImportError:
+    from http.server import HTTPServer
+from http.server import BaseHTTPRequestHandler
+
+from .files import write_atomically
+
+PREFIX = 'scorer_to_usebio_'
+
+PHASES = ['parse', 'model', 'output']
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
+
+COUNTERS = [
+    ('files_converted', 'Files converted successfully.'),
+    ('travellers', 'Travellers (board results) converted.'),
+    ('pairs', 'Pairs converted.'),
+    ('input_bytes', 'Bytes of scorer results read.'),
+    ('output_bytes', 'Bytes of USEBIO XML written.'),
+]
+
+class Histogram(object):
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for (ii, bound) in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[ii] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    # Counts are cumulative, as in Prometheus: each bucket includes all those
+    # smaller than it.
+    def get_buckets(self):
+        total = 0
+        buckets = []
+        for (bound, count) in zip(self.buckets, self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+# Metrics for conversions, recorded from their results: these may be from any
+# thread (or process, since results are returned to the parent).
+class Metrics(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = dict((name, 0) for (name, help) in COUNTERS)
+        self.failures = defaultdict(int)
+        self.phases = dict((phase, Histogram()) for phase in PHASES)
+
+    def record(self, result):
+        with self.lock:
+            if result.input_size is not None:
+                self.counters['input_bytes'] += result.input_size
+            for (phase, seconds) in result.timings.items():
+                self.phases[phase].observe(seconds)
+
+            if result.error is not None:
+                self.failures[type(result.error).__name__] += 1
+                return
+
+            session = result.event.session
+            self.counters['files_converted'] += 1
+            self.counters['pairs'] += len(session.pairs)
+            self.counters['travellers'] += sum(len(travellers) for section in session.sections.values()
+                                               for travellers in section.boards.values())
+            self.counters['output_bytes'] += len(result.output)
+
+    def get_snapshot(self):
+        with self.lock:
+            snapshot = dict(self.counters)
+            snapshot['time'] = time.time()
+            snapshot['files_failed'] = dict(self.failures)
+            snapshot['phase_seconds'] = dict((phase, {
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'buckets': [[format_bound(bound), count] for (bound, count) in histogram.get_buckets()],
+            }) for (phase, histogram) in self.phases.items())
+        return snapshot
+
+    # Prometheus text exposition format
+    def get_prometheus_text(self):
+        snapshot = self.get_snapshot()
+        lines = []
+
+        def metric(name, type, help):
+            lines.append('# HELP {}{} {}'.format(PREFIX, name, help))
+            lines.append('# TYPE {}{} {}'.format(PREFIX, name, type))
+
+        for (name, help) in COUNTERS:
+            metric(name + '_total', 'counter', help)
+            lines.append('{}{}_total {}'.format(PREFIX, name, snapshot[name]))
+
+        metric('files_failed_total', 'counter', 'Files which failed to convert, by exception.')
+        for (exception, count) in sorted(snapshot['files_failed'].items()):
+            lines.append('{}files_failed_total{{exception="{}"}} {}'.format(PREFIX, exception, count))
+
+        metric('phase_seconds', 'histogram', 'Time taken by each phase of conversion.')
+        for phase in PHASES:
+            histogram = snapshot['phase_seconds'][phase]
+            for (bound, count) in histogram['buckets']:
+                lines.append('{}phase_seconds_bucket{{phase="{}",le="{}"}} {}'.format(PREFIX, phase, bound, count))
+            lines.append('{}phase_seconds_sum{{phase="{}"}} {}'.format(PREFIX, phase, histogram['sum']))
+            lines.append('{}phase_seconds_count{{phase="{}"}} {}'.format(PREFIX, phase, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+# Periodically writes the metrics out: as a Prometheus text file (e.g. for the
+# node exporter's textfile collector), replaced each time, and/or as JSON
+# snapshots, appended one per line.
+class MetricsExporter(object):
+    def __init__(self, metrics, prometheus_path=None, json_path=None, interval=15):
+        self.metrics = metrics
+        self.prometheus_path = prometheus_path
+        self.json_path = json_path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    # Stop, writing the final metrics
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.export()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def export(self):
+        if self.prometheus_path:
+            write_atomically(self.prometheus_path, self.metrics.get_prometheus_text().encode('utf-8'))
+        if self.json_path:
+            with open(self.json_path, 'a') as file:
+                file.write(json.dumps(self.metrics.get_snapshot(), sort_keys=True) + '\n')
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.get_prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Serve the metrics at http://host:port/metrics from a background thread.
+# Returns the server: call shutdown() on it to stop.
+def serve_metrics(metrics, port, host='127.0.0.1'):
+    server = HTTPServer((host, port), MetricsHandler)
+    server.metrics = metrics
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
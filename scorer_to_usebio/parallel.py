@@ -0,0 +1,195 @@
+import codecs
+import re
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .convert import ET, Event, Session, build_tree
+
+# Elements holding a section's results and pairs, which are sent to workers
+SECTION_TAGS = (b'brsection', b'scsection')
+
+ENCODING_DECLARATION = re.compile(br'<\?xml[^>]*\sencoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+
+# Markup that must encode as itself for the sections to be found by searching
+# the bytes of the file
+MARKUP = '<?xml =" \'/>abcdefghijklmnopqrstuvwxyz_'
+
+class SectionData(object):
+    __slots__ = 'id', 'fragments'
+
+    def __init__(self, id):
+        self.id = id
+
+        # Each of the section's results and scores elements, as a (start, end)
+        # byte range in the file, or as the bytes themselves if the input is
+        # not a file that workers can read for themselves
+        self.fragments = []
+
+def read_data(file):
+    if isinstance(file, str):
+        with open(file, 'rb') as stream:
+            return stream.read()
+    return file.read()
+
+# Whether the file's encoding (as declared, or UTF-8) writes markup as ASCII,
+# so its sections can be found by searching its bytes (see find_elements).
+# Anything else, e.g. UTF-16, is parsed whole.
+def is_searchable(data):
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    if b'\x00' in data[:4]:
+        return False
+    match = ENCODING_DECLARATION.match(data)
+    if match is None:
+        return True
+    try:
+        return MARKUP.encode(match.group(1).decode('ascii')) == MARKUP.encode('ascii')
+    except (LookupError, UnicodeError):
+        return False
+
+# The event's attributes and sections, which come before any results or scores
+def read_header(data, end):
+    root = None
+    sections = []
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    parser.feed(data[:end])
+    for (action, elem) in parser.read_events():
+        if root is None:
+            root = dict(elem.attrib)
+            Event.check_scoring_type(root)
+        elif action == 'end' and elem.tag == 'section':
+            sections.append(dict(elem.attrib))
+    if root is None:
+        raise SyntaxError("no session element found")
+    return (root, sections)
+
+# Yield (section ID, start, end) for each of the given elements in the data.
+# Scorer writes these simply, so they can be found without parsing the XML in
+# between: only their start tags are parsed, for the section IDs.
+def find_elements(data, tag):
+    open_tag = b'<' + tag
+    close_tag = b'</' + tag
+    pos = data.find(open_tag)
+    while pos != -1:
+        after = data[pos + len(open_tag):pos + len(open_tag) + 1]
+        if after not in (b' ', b'\t', b'\r', b'\n', b'>', b'/'):
+            pos = data.find(open_tag, pos + 1)
+            continue
+
+        try:
+            tag_end = data.index(b'>', pos) + 1
+            start_tag = data[pos:tag_end]
+            if start_tag.endswith(b'/>'):
+                end = tag_end
+            else:
+                end = data.index(b'>', data.index(close_tag, tag_end)) + 1
+                start_tag = start_tag[:-1] + b'/>'
+        except ValueError:
+            raise SyntaxError("unclosed {} element".format(tag.decode()))
+        yield (ET.fromstring(start_tag).get('id'), pos, end)
+        pos = data.find(open_tag, end)
+
+# Find the event header, and where each section's results and pairs are in the
+# file. Only the header is parsed here: the rest is left to the workers, which
+# are sent just the byte ranges of their section (see read_section).
+def read_section_data(file, data=None):
+    if data is None:
+        data = read_data(file)
+    starts = [pos for pos in (data.find(b'<board_results'), data.find(b'<scores')) if pos != -1]
+    (root, sections) = read_header(data, min(starts) if starts else len(data))
+
+    # Fragments are parsed separately, so need the document's declaration for
+    # its encoding
+    declaration = data[:data.index(b'?>') + 2] if data.startswith(b'<?xml') else b''
+
+    sdata = OrderedDict()
+    for tag in SECTION_TAGS:
+        for (sec_id, start, end) in find_elements(data, tag):
+            if sec_id not in sdata:
+                sdata[sec_id] = SectionData(sec_id)
+            fragment = (start, end) if isinstance(file, str) else data[start:end]
+            sdata[sec_id].fragments.append(fragment)
+
+    return (root, sections, declaration, list(sdata.values()))
+
+def read_fragment(file, fragment):
+    if isinstance(fragment, bytes):
+        return fragment
+    (start, end) = fragment
+    with open(file, 'rb') as stream:
+        stream.seek(start)
+        return stream.read(end - start)
+
+# A session that keeps its warnings to be passed back from the worker reading
+# it, as anything logged in a worker process isn't seen by the caller (e.g. in
+# a Converter's diagnostics)
+class WorkerSession(Session):
+    def __init__(self):
+        Session.__init__(self)
+        self.warnings = []
+
+    def warn(self, msg, section=None, board=None, pair=None):
+        self.warnings.append((msg, section, board, pair))
+
+def read_section(file, sections, declaration, data):
+
+    # Each worker needs to know about all the sections, since pair IDs depend on
+    # how many there are, but only reads pairs and results for its own.
+    session = WorkerSession()
+    for section in sections:
+        session.add_section(section)
+
+    pairs = []
+    results = []
+    for fragment in data.fragments:
+        elem = ET.fromstring(declaration + read_fragment(file, fragment))
+        if elem.tag == 'scsection':
+            pairs.extend(elem.findall('pair'))
+        else:
+            results.extend(elem.findall('result'))
+    session.read_section_pairs(data.id, pairs)
+    session.read_section_boards(data.id, results)
+    return (session.sections[data.id], session.grids.get(data.id), session.warnings)
+
+def read_session(file, executor):
+    contents = read_data(file)
+    if not is_searchable(contents):
+        return Event.fromxml(ET.fromstring(contents))
+    (root, sections, declaration, data) = read_section_data(file, contents)
+    del contents
+
+    # Start with all sections known, so any without pairs or results are still
+    # reported, then replace them with the sections read by the workers.
+    session = Session()
+    for section in sections:
+        session.add_section(section)
+
+    # A single section, or a single worker, gains nothing from sending the
+    # sections to workers, so they are just read here
+    if executor is None or len(data) == 1:
+        results = (read_section(file, sections, declaration, sdata) for sdata in data)
+    else:
+        futures = [executor.submit(read_section, file, sections, declaration, sdata) for sdata in data]
+        results = (future.result() for future in futures)
+    for (section, grid, warnings) in results:
+        session.merge_section(section, grid)
+        for warning in warnings:
+            session.warn(*warning)
+
+    # Only the duplicate check, board tops and places need the whole session
+    session.check_for_duplicates(session.pairs.values())
+    session.check_grids()
+    session.report_unknown_pairs()
+    session.fixup_scores()
+    return Event.fromsession(root, session)
+
+def convert_parallel(file, include_dtd = False, executor = None, jobs = None):
+    if executor is None and jobs == 1:
+        event = read_session(file, None)
+    elif executor is None:
+        with ProcessPoolExecutor(jobs) as executor:
+            event = read_session(file, executor)
+    else:
+        event = read_session(file, executor)
+    return (event, build_tree(event, include_dtd))
@@ -1,6 +1,5 @@
 import logging
 import logging.config
-import string
 import sys
 import tempfile
 from pathlib import Path
@@ -9,13 +8,11 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 import scorer_to_usebio
 import scorer_to_usebio.qt
+from scorer_to_usebio.files import get_default_filename, sanitise
 
 all_filter = 'All files (*)'
 scorer_filter = 'Scorer results files (*.xml)'
 
-alphanum = string.digits + string.ascii_letters
-filename_trans_table = str.maketrans(alphanum + "/ ", alphanum + "-_")
-
 log_file = Path.home() / '.scorer_to_usebio' / 'ScorerConverter.log'
 
 class QLogDisplay(logging.Handler):
@@ -205,12 +202,6 @@ class ScorerConverter(QtWidgets.QMainWindow):
         self.persistent.save()
         self.app.quit()
 
-def get_default_filename(event):
-    return "{}-{}.xml".format(sanitise(event.event_date), sanitise(event.event_name))
-
-def sanitise(text):
-    return text.translate(filename_trans_table)
-
 def configure_logging():
     from PyQt5 import QtCore
 
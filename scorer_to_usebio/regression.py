@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .convert import ET, convert, using_lxml
+from .files import find_results_files
+
+logger = logging.getLogger(__name__)
+
+# Canonical (C14N) form of a converted tree, so the digest only changes when
+# the content does, not e.g. attribute order or how empty elements are written.
+def canonicalize(tree):
+    if using_lxml:
+        return ET.tostring(tree, method='c14n')
+    if not hasattr(ET, 'canonicalize'):
+        raise ImportError("You must install lxml (or use Python 3.8+) in order to canonicalize XML")
+    return ET.canonicalize(ET.tostring(tree.getroot(), encoding='unicode')).encode('utf-8')
+
+def get_canonical_output(path):
+    return canonicalize(convert(path)[1])
+
+# The manifest records a digest of each file's canonical output, or the error
+# it failed with: a file which is expected to fail should keep failing the
+# same way. The output itself is saved too, if a path is given for it.
+def get_digest(path, output_path=None):
+    try:
+        output = get_canonical_output(path)
+    except Exception as err:
+        return 'error: {}: {}'.format(type(err).__name__, err)
+
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as file:
+            file.write(output)
+    return hashlib.sha256(output).hexdigest()
+
+def get_digests(corpus, files, executor, golden=None):
+    futures = []
+    for file in files:
+        name = os.path.relpath(file, corpus)
+        output_path = os.path.join(golden, name) if golden else None
+        futures.append((name, executor.submit(get_digest, file, output_path)))
+    return dict((name, future.result()) for (name, future) in futures)
+
+def load_manifest(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def save_manifest(manifest, path):
+    temp = path + '.tmp'
+    with open(temp, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write('\n')
+    os.replace(temp, path)
+
+# Compare digests against the manifest: returns (changed, added, removed) names
+def compare(manifest, digests):
+    changed = sorted(name for name in digests if name in manifest and manifest[name] != digests[name])
+    added = sorted(name for name in digests if name not in manifest)
+    removed = sorted(name for name in manifest if name not in digests)
+    return (changed, added, removed)
+
+# Describe the differences between two trees, element by element. Children are
+# matched up by their position amongst siblings with the same tag.
+def diff_trees(expected, actual, path=None):
+    if path is None:
+        path = '/' + expected.tag
+    if expected.tag != actual.tag:
+        return ['{}: element {} != {}'.format(path, expected.tag, actual.tag)]
+
+    diffs = []
+    if (expected.text or '').strip() != (actual.text or '').strip():
+        diffs.append('{}: {!r} != {!r}'.format(path, expected.text, actual.text))
+    for name in sorted(set(expected.attrib) | set(actual.attrib)):
+        if expected.get(name) != actual.get(name):
+            diffs.append('{}/@{}: {!r} != {!r}'.format(path, name, expected.get(name), actual.get(name)))
+
+    def by_tag(elem):
+        children = {}
+        for child in elem:
+            children.setdefault(child.tag, []).append(child)
+        return children
+
+    expected_children = by_tag(expected)
+    actual_children = by_tag(actual)
+    for tag in sorted(set(expected_children) | set(actual_children)):
+        expected_list = expected_children.get(tag, [])
+        actual_list = actual_children.get(tag, [])
+        for (ii, (old, new)) in enumerate(zip(expected_list, actual_list), 1):
+            diffs.extend(diff_trees(old, new, '{}/{}[{}]'.format(path, tag, ii)))
+        for ii in range(len(actual_list), len(expected_list)):
+            diffs.append('{}/{}[{}]: missing'.format(path, tag, ii + 1))
+        for ii in range(len(expected_list), len(actual_list)):
+            diffs.append('{}/{}[{}]: unexpected'.format(path, tag, ii + 1))
+    return diffs
+
+def diff_output(golden_path, path):
+    with open(golden_path, 'rb') as file:
+        expected = ET.fromstring(file.read())
+    actual = ET.fromstring(get_canonical_output(path))
+    return diff_trees(expected, actual)
+
+def record_main(opts, digests):
+    save_manifest(digests, opts.manifest)
+    logger.info("recorded %d file(s) in %s", len(digests), opts.manifest)
+
+def check_main(opts, digests):
+    manifest = load_manifest(opts.manifest)
+    (changed, added, removed) = compare(manifest, digests)
+    for name in changed:
+        print('changed: {}'.format(name))
+        print('    expected {}'.format(manifest[name]))
+        print('    got      {}'.format(digests[name]))
+        golden_path = os.path.join(opts.golden, name) if opts.golden else None
+        if golden_path and os.path.exists(golden_path) and not digests[name].startswith('error:'):
+            for diff in diff_output(golden_path, os.path.join(opts.corpus, name)):
+                print('    {}'.format(diff))
+    for name in added:
+        print('new: {}'.format(name))
+    for name in removed:
+        print('missing: {}'.format(name))
+    print('{} file(s): {} unchanged, {} changed, {} new, {} missing'.format(
+        len(digests), len(digests) - len(changed) - len(added), len(changed), len(added), len(removed)))
+    if changed or removed:
+        sys.exit(1)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio regress',
+        description='Convert a corpus of scorer results files and compare the output against a golden manifest.')
+    parser.add_argument('-m', '--manifest', default='golden.json',
+                        help='manifest of expected output digests (default: %(default)s)')
+    parser.add_argument('-g', '--golden', metavar='dir',
+                        help='directory of expected outputs: written when recording, used to show differences')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files to convert in parallel (default: one per CPU)')
+    parser.add_argument('command', choices=['record', 'check'],
+                        help='record the current output as expected, or check it against that recorded')
+    parser.add_argument('corpus', help='directory containing the results files')
+
+    opts = parser.parse_args(args)
+    files = find_results_files([opts.corpus])
+    with ProcessPoolExecutor(opts.jobs) as executor:
+        if opts.command == 'record':
+            record_main(opts, get_digests(opts.corpus, files, executor, opts.golden))
+        else:
+            check_main(opts, get_digests(opts.corpus, files, executor))
@@ -0,0 +1,107 @@
+import argparse
+import csv
+import sys
+
+from collections import defaultdict, namedtuple
+from html import escape
+
+from .convert import ET, Event, Pair, Session
+
+FORMATS = ['csv', 'html']
+
+ScorecardLine = namedtuple('ScorecardLine', [
+    'board',
+    'direction',
+    'opponents',
+    'contract',
+    'declarer',
+    'lead',
+    'tricks',
+    'score',
+    'matchpoints',
+    'percentage',
+])
+
+COLUMNS = ['pair'] + list(ScorecardLine._fields)
+
+def get_scorecard_line(board, pair, traveller, board_top):
+    if traveller.ns == pair.id:
+        (direction, opponents, mps) = ('ns', traveller.ew, traveller.ns_mps)
+        score = traveller.score
+    else:
+        (direction, opponents, mps) = ('ew', traveller.ns, traveller.ew_mps)
+
+        # Scores are recorded from NS's point of view
+        score = traveller.score
+        if score and score.lstrip('-').isdigit():
+            score = str(-int(score))
+
+    return ScorecardLine(board, direction, opponents, traveller.contract, traveller.declarer, traveller.lead,
+                         traveller.tricks, score, mps, Session.percentage(mps, board_top))
+
+# Index a section's travellers by the pairs that played them: pair ID ->
+# [(board, traveller)]. Results against unknown pairs are filed under the
+# section's unknown pair ID, so never appear on a pair's scorecard.
+def get_pair_travellers(section):
+    pair_travellers = defaultdict(list)
+    for (board, travellers) in section.boards.items():
+        for traveller in travellers:
+            pair_travellers[traveller.ns].append((board, traveller))
+            pair_travellers[traveller.ew].append((board, traveller))
+    return pair_travellers
+
+# Generate a scorecard for every pair, in a single pass over each section's
+# travellers.
+def get_scorecards(event):
+    scorecards = []
+    board_top = event.session.board_top
+    for (sec_id, section) in sorted(event.session.sections.items()):
+        consistent = Pair.consistent_seating(section.pairs)
+        pair_travellers = get_pair_travellers(section)
+        for pair in sorted(section.pairs, key=lambda pair: Event.get_pair_key(pair, consistent)):
+            travellers = sorted(pair_travellers.get(pair.id, []), key=lambda x: x[0])
+            lines = [get_scorecard_line(board, pair, traveller, board_top) for (board, traveller) in travellers]
+            scorecards.append((pair, lines))
+    return scorecards
+
+def write_csv(event, output):
+    writer = csv.writer(output)
+    writer.writerow(COLUMNS)
+    for (pair, lines) in get_scorecards(event):
+        for line in lines:
+            writer.writerow([pair.id] + [value if value is not None else '' for value in line])
+
+def write_html(event, output):
+    def write(text, *args):
+        output.write(text.format(*[escape(str(arg)) if arg is not None else '' for arg in args]))
+
+    write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{} {}</title>\n</head>\n<body>\n',
+          event.event_name, event.event_date)
+    write('<h1>{}</h1>\n<p>{} {}</p>\n', event.event_name, event.club_name, event.event_date)
+    for (pair, lines) in get_scorecards(event):
+        names = ' & '.join(player.name for player in pair.players)
+        write('<h2>{}: {}</h2>\n<table>\n<tr>', pair.id, names)
+        for column in ScorecardLine._fields:
+            write('<th>{}</th>', column.replace('_', ' ').title())
+        write('</tr>\n')
+        for line in lines:
+            write('<tr>')
+            for value in line:
+                write('<td>{}</td>', value)
+            write('</tr>\n')
+        write('</table>\n')
+    write('</body>\n</html>\n')
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio scorecards',
+        description="Write each pair's scorecard from a scorer results file.")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='html', help='output format (default: %(default)s)')
+    parser.add_argument('file', help='results file')
+
+    opts = parser.parse_args(args)
+    event = Event.fromxml(ET.parse(opts.file).getroot())
+    if opts.format == 'csv':
+        write_csv(event, sys.stdout)
+    else:
+        write_html(event, sys.stdout)
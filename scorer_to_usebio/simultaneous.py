@@ -0,0 +1,226 @@
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from .convert import DECIMAL_001, ET, Event, Session, build_tree, serialize
+
+# A result to be scored across the field, from the given club and (by index) of
+# its results. Results without a score to compare (i.e. adjusted or not played)
+# have a score of None, and keep the percentages they were given at the club.
+FieldResult = namedtuple('FieldResult', ['club', 'index', 'score', 'ns_percentage', 'ew_percentage'])
+
+# A result's MPs once scored across the field, out of the board's top
+FieldScore = namedtuple('FieldScore', ['club', 'index', 'ns_mps', 'ew_mps', 'top'])
+
+COMBINED_NAME = 'combined.xml'
+
+# The clubs' results, in a fixed order, so each can be referred to by index
+def iter_travellers(event):
+    for (sec_id, sdata) in sorted(event.session.sections.items()):
+        for (board, travellers) in sorted(sdata.boards.items()):
+            for traveller in travellers:
+                yield (board, traveller)
+
+def get_score(traveller):
+    if traveller.contract == 'NP':
+        return None
+    try:
+        return int(traveller.score or 0)
+    except ValueError:
+        return None
+
+def read_event(path):
+    return Event.fromxml(ET.parse(path).getroot())
+
+# Read a club's results, as board -> list of FieldResult
+def read_club(club, path):
+    event = read_event(path)
+    top = event.session.board_top
+    boards = defaultdict(list)
+    for (index, (board, traveller)) in enumerate(iter_travellers(event)):
+        score = get_score(traveller)
+        if score is None:
+            boards[board].append(FieldResult(club, index, None, Session.percentage(traveller.ns_mps, top),
+                                             Session.percentage(traveller.ew_mps, top)))
+        else:
+            boards[board].append(FieldResult(club, index, score, None, None))
+    return (event.club_id, dict(boards))
+
+# Matchpoint NS scores against each other, by sorting them: each gets two MPs
+# for every score it beat, and one for every other score it equalled. Returns
+# the NS MPs for each score, in the order given, and the top.
+def matchpoint(scores):
+    mps = [None] * len(scores)
+    ranked = sorted(range(len(scores)), key=lambda ii: scores[ii])
+    below = 0
+    for (score, group) in itertools.groupby(ranked, key=lambda ii: scores[ii]):
+        group = list(group)
+        for ii in group:
+            mps[ii] = 2 * below + len(group) - 1
+        below += len(group)
+    return (mps, max(2 * (len(scores) - 1), 0))
+
+def score_board(results):
+    scored = [result for result in results if result.score is not None]
+    (mps, top) = matchpoint([result.score for result in scored])
+    scores = [FieldScore(result.club, result.index, ns, top - ns, top) for (result, ns) in zip(scored, mps)]
+    for result in results:
+        if result.score is None:
+            scores.append(FieldScore(result.club, result.index,
+                                     (result.ns_percentage * top / 100).quantize(DECIMAL_001),
+                                     (result.ew_percentage * top / 100).quantize(DECIMAL_001), top))
+    return scores
+
+# Results are spilled to a file for each board as each club is read, so only
+# one club's results need be held at a time while reading, and only one
+# board's while scoring.
+def write_records(path, records):
+    with open(path, 'a') as file:
+        for record in records:
+            file.write('\t'.join('' if value is None else str(value) for value in record))
+            file.write('\n')
+
+def read_records(path, cls, types):
+    records = []
+    with open(path, 'r') as file:
+        for line in file:
+            values = line.rstrip('\n').split('\t')
+            records.append(cls(*[type(value) if value else None for (type, value) in zip(types, values)]))
+    return records
+
+def score_board_file(path):
+    return score_board(read_records(path, FieldResult, (int, int, int, Decimal, Decimal)))
+
+def parse_mps(value):
+    return int(value) if value.lstrip('-').isdigit() else Decimal(value)
+
+# Rescore a club's results with the MPs from the field, and write them out,
+# with the pairs placed within the club. Returns the club's pairs, scored
+# across the field.
+def write_club(path, scores_path, output_path):
+    event = read_event(path)
+    scores = dict((score.index, score) for score in read_records(scores_path, FieldScore,
+                                                                (int, int, parse_mps, parse_mps, int)))
+    totals = defaultdict(lambda: [0, 0])
+    for (index, (board, traveller)) in enumerate(iter_travellers(event)):
+        score = scores[index]
+        traveller.ns_mps = score.ns_mps
+        traveller.ew_mps = score.ew_mps
+        for (id, mps) in ((traveller.ns, score.ns_mps), (traveller.ew, score.ew_mps)):
+            totals[id][0] += mps
+            totals[id][1] += score.top
+
+    for pair in event.session.pairs.values():
+        pair.matchpoints = totals[pair.id]
+        pair.score.total_score = pair.score.percentage = (Session.percentage(*pair.matchpoints)
+                                                          if pair.matchpoints[1] else Decimal(0))
+        pair.score.adjustment = None
+    event.update_places()
+    with open(output_path, 'wb') as file:
+        file.write(serialize(build_tree(event)))
+    return list(event.session.pairs.values())
+
+# Label each club by its number, made unique if a club sent more than one file
+def get_labels(clubs):
+    labels = []
+    seen = defaultdict(int)
+    for club in clubs:
+        seen[club] += 1
+        labels.append(str(club) if seen[club] == 1 else '{}-{}'.format(club, seen[club]))
+    return labels
+
+# Score the field across all the clubs' files, writing each club's results (as
+# <club>.xml) and the combined results to the output directory. Returns the
+# national event (without its travellers, which are only written out).
+def score_field(files, output_dir, executor, event_name=None, club_name='Simultaneous pairs', club_id=0):
+    with tempfile.TemporaryDirectory() as work:
+        board_paths = {}
+        clubs = []
+        for (club, (club_id_no, boards)) in enumerate(executor.map(read_club, range(len(files)), files)):
+            clubs.append(club_id_no)
+            for (board, results) in boards.items():
+                path = board_paths.setdefault(board, os.path.join(work, 'board-{}.tsv'.format(board)))
+                write_records(path, results)
+
+        # Score each board, then gather the scores by club
+        score_paths = [os.path.join(work, 'club-{}.tsv'.format(club)) for club in range(len(files))]
+        boards = sorted(board_paths)
+        for scores in executor.map(score_board_file, [board_paths[board] for board in boards]):
+            by_club = defaultdict(list)
+            for score in scores:
+                by_club[score.club].append(score)
+            for (club, records) in by_club.items():
+                write_records(score_paths[club], records)
+
+        labels = get_labels(clubs)
+        outputs = [os.path.join(output_dir, '{}.xml'.format(label)) for label in labels]
+        club_pairs = list(executor.map(write_club, files, score_paths, outputs))
+
+    event = get_national_event(files[0], labels, club_pairs, event_name, club_name, club_id)
+    write_combined(event, labels, outputs, os.path.join(output_dir, COMBINED_NAME))
+    return event
+
+def get_national_event(first, labels, club_pairs, event_name, club_name, club_id):
+    session = Session()
+    for (label, pairs) in zip(labels, club_pairs):
+        for pair in pairs:
+            pair.id = get_national_id(label, pair.id)
+            session.pairs[pair.id] = pair
+
+    root = ET.parse(first).getroot()
+    return Event(club_name, club_id, 'PAIRS', 'MATCH_POINTS', event_name or root.get('event_name'),
+                 root.get('event_date'), session)
+
+def get_national_id(label, id):
+    return '{} {}'.format(label, id)
+
+# Write the combined results: the national ranking, then each club's boards in
+# a section of their own. These are copied from each club's results one at a
+# time, rather than building the whole document, which may be very large.
+def write_combined(event, labels, outputs, path):
+    (xml, national) = event.get_event_xml()
+    event.write_participants(national, list(event.session.pairs.values()))
+    document = serialize(ET.ElementTree(xml))
+    closing = b'</EVENT></USEBIO>'
+    assert document.endswith(closing)
+
+    with open(path, 'wb') as file:
+        file.write(document[:-len(closing)])
+        for (label, output) in zip(labels, outputs):
+            section = ET.Element('SECTION')
+            section.set('SECTION_ID', label)
+            for board in ET.parse(output).getroot().iter('BOARD'):
+                for line in board.findall('TRAVELLER_LINE'):
+                    for number in (line.find('NS_PAIR_NUMBER'), line.find('EW_PAIR_NUMBER')):
+                        number.text = get_national_id(label, number.text)
+                section.append(board)
+            file.write(serialize(ET.ElementTree(section)))
+        file.write(closing)
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog='scorer_to_usebio simultaneous',
+        description='Score a simultaneous pairs event across the results files of every club that played it, '
+                    'writing each club\'s results and the combined results.')
+    parser.add_argument('-o', '--output', metavar='dir', required=True, help='directory to write the results to')
+    parser.add_argument('-n', '--name', help='event name (default: that of the first file)')
+    parser.add_argument('--club-name', default='Simultaneous pairs',
+                        help='organiser named in the combined results (default: %(default)s)')
+    parser.add_argument('--club-id', type=int, default=0,
+                        help='organiser number in the combined results (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('files', metavar='file', nargs='+', help="each club's results file")
+
+    opts = parser.parse_args(args)
+    if not os.path.isdir(opts.output):
+        parser.error("output directory '{}' does not exist".format(opts.output))
+    with ProcessPoolExecutor(opts.jobs) as executor:
+        event = score_field(opts.files, opts.output, executor, opts.name, opts.club_name, opts.club_id)
+    print('scored {} pairs from {} clubs'.format(len(event.session.pairs), len(opts.files)), file=sys.stderr)
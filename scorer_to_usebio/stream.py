@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from .convert import ET, Event, Session, build_tree
+
+CHUNK_SIZE = 64 * 1024
+
+class SessionBuilder(object):
+    def __init__(self):
+        self.parser = ET.XMLPullParser(events=('start', 'end'))
+        self.root = None
+        self.session = Session()
+        self.sections_read = False
+        self.scores_read = False
+
+        # Section currently being read from the board results/scores
+        self.section_id = None
+
+        # Elements currently open, from the root down to the one being read
+        self.open_elements = []
+
+        # Sections for which pairs have been read and hence whose results can be
+        # processed immediately.
+        self.paired = set()
+
+        # Sections whose board results have all been read, and hence can be
+        # checked (see Session.check_grid) once they have been processed.
+        self.results_read = set()
+
+        # Pairs and results waiting until they can be processed.
+        #
+        # Scorer writes all board results before any scores, so results have to
+        # be held until the pairs they refer to have been read. They are kept as
+        # plain attribute dictionaries, so the parsed elements can be discarded.
+        self.pending_pairs = defaultdict(list)
+        self.pending_results = defaultdict(list)
+
+    def feed(self, data):
+        self.parser.feed(data)
+        self.process_events()
+
+    def close(self):
+        self.parser.close()
+        self.process_events()
+
+        # Anything still pending refers to a section that has no scores: process
+        # it the same as a fully parsed document would.
+        for (sec_id, results) in self.pending_results.items():
+            self.session.read_section_boards(sec_id, results)
+        self.pending_results.clear()
+
+        if not self.scores_read:
+            self.session.check_for_duplicates(self.session.pairs.values())
+
+        self.session.check_grids()
+        self.session.report_unknown_pairs()
+        self.session.fixup_scores()
+        return Event.fromsession(self.root, self.session)
+
+    def process_events(self):
+        for (action, elem) in self.parser.read_events():
+            if action == 'start':
+                self.open_elements.append(elem)
+                self.start(elem)
+            else:
+                self.open_elements.pop()
+                self.end(elem)
+
+    def start(self, elem):
+        if self.root is None:
+            self.root = dict(elem.attrib)
+            Event.check_scoring_type(self.root)
+        elif elem.tag == 'brsection':
+            self.section_id = elem.get('id')
+        elif elem.tag == 'scsection':
+            self.section_id = elem.get('id')
+
+            # Make sure the section gets processed even if it has no pairs
+            self.pending_pairs[self.section_id]
+
+    def end(self, elem):
+        tag = elem.tag
+        if tag == 'result':
+            self.add_result(dict(elem.attrib))
+        elif tag == 'pair':
+            self.pending_pairs[self.section_id].append(dict(elem.attrib))
+        elif tag == 'section':
+            self.session.add_section(elem)
+        elif tag == 'sections':
+            self.sections_read = True
+            self.process_pending_pairs()
+        elif tag == 'scsection':
+            self.process_pending_pairs()
+        elif tag == 'scores':
+            self.scores_read = True
+            self.session.check_for_duplicates(self.session.pairs.values())
+        elif tag == 'brsection':
+            self.results_read.add(self.section_id)
+            if self.section_id in self.paired:
+                self.session.check_grid(self.section_id)
+        elif tag != 'board_results':
+            return
+
+        # Discard elements as soon as we're done with them. Clearing an element
+        # leaves it in its parent, so also remove the elements before it from
+        # there: the element itself is only removed once the next one is done
+        # with, since the parser may not have finished with it yet.
+        elem.clear()
+        if self.open_elements:
+            parent = self.open_elements[-1]
+            while parent[0] is not elem:
+                del parent[0]
+
+    def add_result(self, result):
+        if self.section_id in self.paired:
+            self.session.read_section_boards(self.section_id, [result])
+        else:
+            self.pending_results[self.section_id].append(result)
+
+    def process_pending_pairs(self):
+
+        # Pair IDs depend on the number of sections, so we can't assign them
+        # until all the sections are known.
+        if not self.sections_read:
+            return
+
+        for (sec_id, pairs) in self.pending_pairs.items():
+            self.session.read_section_pairs(sec_id, pairs)
+            self.paired.add(sec_id)
+            results = self.pending_results.pop(sec_id, None)
+            if results:
+                self.session.read_section_boards(sec_id, results)
+            if sec_id in self.results_read:
+                self.session.check_grid(sec_id)
+        self.pending_pairs.clear()
+
+def convert_stream(stream, include_dtd = False, chunk_size = CHUNK_SIZE):
+    builder = SessionBuilder()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        builder.feed(chunk)
+    event = builder.close()
+    return (event, build_tree(event, include_dtd))
@@ -8,6 +8,7 @@ setup(name='scorer-to-usebio',
       author_email='duaneg@dghda.com',
       license='GNU AGPLv3+',
       packages=['scorer_to_usebio'],
+      python_requires='>=3.5',
       include_package_data=True,
       entry_points={
           'console_scripts': [
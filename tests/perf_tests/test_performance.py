@@ -0,0 +1,23 @@
+import os
+import unittest
+
+from scorer_to_usebio import benchmark
+
+DIR = os.path.dirname(__file__)
+BASELINE = os.path.join(DIR, 'baseline.json')
+
+# Timings depend on the machine, so only check them when asked to
+PERF_VARIABLE = 'SCORER_TO_USEBIO_PERF'
+
+@unittest.skipUnless(os.environ.get(PERF_VARIABLE), 'set ${} to run performance tests'.format(PERF_VARIABLE))
+class PerformanceTest(unittest.TestCase):
+    def test(self):
+        baseline = benchmark.load_baseline(BASELINE)
+        backend = benchmark.get_backend()
+        self.assertIn(backend, baseline['backends'])
+
+        tolerances = dict(benchmark.DEFAULT_TOLERANCES)
+        tolerances.update(baseline['tolerances'])
+        results = benchmark.measure(benchmark.get_workload())
+        (report, regressed) = benchmark.compare(baseline['backends'][backend], results, tolerances)
+        self.assertFalse(regressed, msg='performance regression:\n' + '\n'.join(report))
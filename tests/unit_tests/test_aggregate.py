@@ -0,0 +1,112 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from scorer_to_usebio.aggregate import aggregate, aggregate_files, get_pair_key, main, read_carry_forward
+from scorer_to_usebio.convert import ET, Event, Player
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def find_pair(event, name):
+    for pair in event.session.pairs.values():
+        if name in [player.name for player in pair.players]:
+            return pair
+
+class TestAggregate(unittest.TestCase):
+    def setUp(self):
+        self.root = ET.parse(example('pairs.xml')).getroot()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pair_key(self):
+        self.assertEqual(get_pair_key((Player('A', '1'), Player('B', '2'))),
+                         get_pair_key((Player('b', '2'), Player('a', '1'))))
+        self.assertEqual(get_pair_key((Player('A', '0'), Player('B', ''))),
+                         get_pair_key((Player('b ', None), Player(' a', '0'))))
+        self.assertNotEqual(get_pair_key((Player('A', '1'), Player('B', '2'))),
+                            get_pair_key((Player('A', '1'), Player('B', '3'))))
+
+    def test_same_session_twice(self):
+        single = Event.fromxml(self.root)
+        event = aggregate([Event.fromxml(self.root), Event.fromxml(self.root)])
+        self.assertEqual(len(event.session.pairs), len(single.session.pairs))
+        self.assertEqual(list(event.session.sections), ['1', '2'])
+        self.assertEqual(event.max_boards, 2 * single.max_boards)
+        self.assertEqual(event.winners, single.winners)
+
+        # Twice the MPs out of twice the top gives the same places
+        for pair in single.session.pairs.values():
+            combined = find_pair(event, pair.players[0].name)
+            self.assertEqual(combined.matchpoints, [2 * pair.matchpoints[0], 2 * pair.matchpoints[1]])
+            self.assertEqual(event.places[combined.id], single.places[pair.id])
+
+    def test_pairs_matched(self):
+        second = copy.deepcopy(self.root)
+        pairs = second.findall('./scores/scsection/pair')
+
+        # The same players listed in the other order, and a new pair (matched
+        # by NZB number, so a new name alone would not do)
+        (first, new) = (pairs[0], pairs[1])
+        (name_1, id_1) = (first.get('player_name_1'), first.get('nzb_no_1'))
+        first.set('player_name_1', first.get('player_name_2'))
+        first.set('nzb_no_1', first.get('nzb_no_2'))
+        first.set('player_name_2', name_1)
+        first.set('nzb_no_2', id_1)
+        new.set('player_name_1', 'New Player')
+        new.set('nzb_no_1', '9999')
+
+        event = aggregate([Event.fromxml(self.root), Event.fromxml(second)])
+        self.assertEqual(len(event.session.pairs), 27)
+        self.assertEqual(find_pair(event, 'New Player').id, '27')
+        self.assertEqual(find_pair(event, name_1).boards_played, 52)
+
+        # Travellers refer to the pairs by their numbers for the whole event
+        numbers = set(event.session.pairs)
+        for section in event.session.sections.values():
+            for travellers in section.boards.values():
+                for traveller in travellers:
+                    self.assertIn(traveller.ns, numbers)
+                    self.assertIn(traveller.ew, numbers)
+
+        # Pairs always sat the same way, so there are still two winners
+        self.assertEqual(event.winners, 2)
+        self.assertEqual(sorted(event.places.values())[:2], [1, 1])
+
+    def test_carry_forward(self):
+        path = os.path.join(self.dir, 'carry.csv')
+        pair = self.root.find('./scores/scsection/pair[@nzb_no_1="26"]')
+        with open(path, 'w') as file:
+            file.write('nzb_no_1,nzb_no_2,match_points\n')
+            file.write('{},{},100/200\n'.format(pair.get('nzb_no_2'), pair.get('nzb_no_1')))
+        carry_forward = read_carry_forward(path)
+
+        event = aggregate([Event.fromxml(self.root)], carry_forward)
+        (scored, available) = [Decimal(mps) for mps in pair.get('match_points').split('/')]
+        self.assertEqual(find_pair(event, pair.get('player_name_1')).matchpoints, [scored + 100, available + 200])
+
+    def test_no_sessions(self):
+        self.assertRaises(ValueError, aggregate, [])
+
+    def test_aggregate_files(self):
+        files = [example('pairs.xml'), example('pairs-with-np-passed.xml')]
+        with ThreadPoolExecutor(2) as executor:
+            event = aggregate_files(files, executor, event_name='Championship')
+        self.assertEqual(event.event_name, 'Championship')
+        self.assertEqual(event.session.pairs['1'].boards_played, 52)
+
+        output = os.path.join(self.dir, 'event.xml')
+        main(['-j', '2', '-n', 'Championship', '-o', output] + files)
+        root = ET.parse(output).getroot()
+        self.assertEqual(root.find('EVENT/EVENT_DESCRIPTION').text, 'Championship')
+        self.assertEqual(len(root.findall('EVENT/PARTICIPANTS/PAIR')), 26)
+        self.assertEqual([section.get('SECTION_ID') for section in root.findall('EVENT/SECTION')], ['1', '2'])
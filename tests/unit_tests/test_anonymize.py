@@ -0,0 +1,111 @@
+try:
+    import lxml.etree as ET
+except ImportError:
+    try:
+        import xml.etree.cElementTree as ET
+    except ImportError:
+        import xml.etree.ElementTree as ET
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from scorer_to_usebio.anonymize import Pseudonyms, StreamingWriter, anonymize, anonymize_file, main
+from scorer_to_usebio.convert import convert
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def anonymize_bytes(data, key='key'):
+    output = io.BytesIO()
+    anonymize(io.BytesIO(data), output, Pseudonyms(key))
+    return output.getvalue()
+
+class TestPseudonyms(unittest.TestCase):
+    def test_consistent(self):
+        self.assertEqual(Pseudonyms('a').get_player('Fred', '123'), Pseudonyms('a').get_player('Fred', '123'))
+
+    def test_keyed(self):
+        self.assertNotEqual(Pseudonyms('a').get_player('Fred', '123'), Pseudonyms('b').get_player('Fred', '123'))
+
+    def test_identified_by_number(self):
+        pseudonyms = Pseudonyms('a')
+        self.assertEqual(pseudonyms.get_player('Fred', '123'), pseudonyms.get_player('Frederick', '123'))
+        self.assertNotEqual(pseudonyms.get_player('Fred', '123'), pseudonyms.get_player('Fred', '124'))
+
+    def test_numbers_distinct(self):
+
+        # Many more players than a national body would have, without any two
+        # given the same number
+        pseudonyms = Pseudonyms('a')
+        ids = set(pseudonyms.get_player('', str(id))[1] for id in range(1, 100001))
+        self.assertEqual(len(ids), 100000)
+
+    def test_no_number(self):
+        pseudonyms = Pseudonyms('a')
+        (name, id) = pseudonyms.get_player('Fred', '0')
+        self.assertEqual(id, '0')
+        self.assertNotEqual(name, 'Fred')
+        self.assertNotEqual(pseudonyms.get_player('Fred', ''), pseudonyms.get_player('Joe', ''))
+
+class TestAnonymize(unittest.TestCase):
+    def test_preserves_document(self):
+        data = b'<a x="1&amp;&quot;"><b>t&lt;</b> <c/><pair player_name_1="Fred" nzb_no_1="12" no="1"/></a>'
+        output = anonymize_bytes(data)
+        (name, id) = Pseudonyms('key').get_player('Fred', '12')
+        expected = '<a x="1&amp;&quot;"><b>t&lt;</b> <c/><pair player_name_1="{}" nzb_no_1="{}" no="1"/></a>'
+        self.assertEqual(output, '<?xml version="1.0"?>\n{}\n'.format(expected.format(name, id)).encode('utf-8'))
+
+    def test_consistent_across_files(self):
+        players = set()
+        for name in ('pairs.xml', 'pairs-with-np-passed.xml'):
+            with open(example(name), 'rb') as file:
+                root = ET.XML(anonymize_bytes(file.read()))
+            players.add(frozenset((pair.get('player_name_1'), pair.get('nzb_no_1')) for pair in root.iter('pair')))
+
+        # These examples come from the same (anonymized) players
+        self.assertEqual(len(players), 1)
+
+    def test_converts(self):
+        with tempfile.TemporaryDirectory() as dir:
+            output = anonymize_file('key', example('multi-section-multi-movement-pairs.xml'), os.path.join(dir, 'a.xml'))
+            (event, tree) = convert(output)
+        (orig_event, orig_tree) = convert(example('multi-section-multi-movement-pairs.xml'))
+        self.assertEqual(len(event.session.pairs), len(orig_event.session.pairs))
+        self.assertEqual(list(event.places.values()), list(orig_event.places.values()))
+
+    def test_elements_discarded(self):
+
+        # Elements are removed from the tree once written, so only those still
+        # open (and the last two of each one's children, since each element is
+        # only finished with once the next has been read) are kept
+        writer = StreamingWriter(io.BytesIO())
+        for (action, elem) in ET.iterparse(example('pairs.xml'), events=('start', 'end')):
+            if action == 'start':
+                writer.start(elem, dict(elem.attrib))
+            elif elem.tag == 'session':
+                self.assertEqual([child.tag for child in elem], ['board_results', 'scores'])
+                self.assertLessEqual(len(list(elem.iter())), 5)
+            else:
+                writer.end(elem)
+
+    def test_same_names(self):
+
+        # Files with the same name in different directories don't overwrite
+        # each other
+        with tempfile.TemporaryDirectory() as dir:
+            files = []
+            for (subdir, name) in (('a', 'pairs.xml'), ('b', 'handicap_pairs.xml')):
+                os.mkdir(os.path.join(dir, subdir))
+                files.append(os.path.join(dir, subdir, 'pairs.xml'))
+                shutil.copy(example(name), files[-1])
+            output = os.path.join(dir, 'out')
+            os.mkdir(output)
+            main(['-k', 'key', '-j', '1', '-o', output] + files)
+            for (subdir, file) in zip(('a', 'b'), files):
+                with open(file, 'rb') as input, open(os.path.join(output, subdir, 'pairs.xml'), 'rb') as converted:
+                    self.assertEqual(converted.read(), anonymize_bytes(input.read()))
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scorer_to_usebio.archive import Archive, parse_date, read_event_rows
+from scorer_to_usebio.files import find_results_files
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.archive = Archive(os.path.join(self.dir, 'archive.sqlite'))
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.dir)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date('5/12/2015'), '2015-12-05')
+        self.assertEqual(parse_date('bad'), 'bad')
+        self.assertIsNone(parse_date(None))
+
+    def test_read_event_rows(self):
+        (event, pairs, players) = read_event_rows(example('pairs.xml'))
+        self.assertEqual(event, (330, 'Palmerston North Bridge Club', '2015-11-16', 'Monday Afternoon November Pairs'))
+        self.assertEqual(len(pairs), 26)
+        self.assertEqual(len(players), 52)
+        self.assertIn(('10 NS', 'A', 'ns', 2, 56.73, 26), pairs)
+
+    def test_ingest_and_query(self):
+        files = find_results_files([EXAMPLES_DIR])
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(self.archive.ingest(files, executor), (len(files), 0))
+
+            # Unchanged files are not ingested again
+            self.assertEqual(self.archive.ingest(files, executor), (0, 0))
+
+        results = self.archive.get_results(nzb_no='3', start='2015-01-01', end='2015-12-31')
+        self.assertEqual([row[2] for row in results], [
+            'Whitehead Trophy Handicap Pairs',
+            'Monday Afternoon November Pairs',
+            'PN Christmas Cheer',
+            'Monday Summer Bridge Dec 2015',
+        ])
+        self.assertEqual(results[1][3:], ('10 NS', 'ns', 2, 56.73, '3', 'p1_2', '2', 'p1_1'))
+        self.assertEqual(len(self.archive.get_results(nzb_no='3')), 5)
+        self.assertEqual(len(self.archive.get_results(club_id=1)), 0)
+
+    def test_ingest_changed(self):
+        path = os.path.join(self.dir, 'event.xml')
+        shutil.copy(example('pairs.xml'), path)
+        with ThreadPoolExecutor(1) as executor:
+            self.archive.ingest([path], executor)
+            shutil.copy(example('handicap_pairs.xml'), path)
+            self.assertEqual(self.archive.ingest([path], executor), (1, 0))
+
+        events = self.archive.db.execute('SELECT event_name FROM events').fetchall()
+        self.assertEqual(events, [('Whitehead Trophy Handicap Pairs',)])
+        pairs = self.archive.db.execute('SELECT COUNT(*) FROM pairs').fetchone()[0]
+        self.assertEqual(pairs, len(read_event_rows(path)[1]))
+
+    def test_ingest_error(self):
+        path = os.path.join(self.dir, 'bad.xml')
+        with open(path, 'w') as file:
+            file.write('<session scoring_type="IMP"/>')
+        with ThreadPoolExecutor(1) as executor:
+            self.assertEqual(self.archive.ingest([path], executor), (1, 1))
+
+    def test_ingest_partial_failure(self):
+        path = os.path.join(self.dir, 'event.xml')
+        shutil.copy(example('pairs.xml'), path)
+        with ThreadPoolExecutor(1) as executor:
+            self.archive.ingest([path], executor)
+        (event, pairs, players) = read_event_rows(path)
+
+        # A pair given twice makes adding the changed event fail part way
+        # through, which must leave the previous version as it was
+        class BadExecutor(object):
+            def submit(self, func, file):
+                future = Future()
+                future.set_result((event, pairs + pairs[:1], players))
+                return future
+
+        shutil.copy(example('handicap_pairs.xml'), path)
+        self.assertEqual(self.archive.ingest([path], BadExecutor()), (1, 1))
+        self.assertEqual(self.archive.db.execute('SELECT COUNT(*) FROM events').fetchone()[0], 1)
+        self.assertEqual(self.archive.db.execute('SELECT COUNT(*) FROM pairs').fetchone()[0], len(pairs))
+        self.assertEqual(self.archive.db.execute('SELECT COUNT(*) FROM players').fetchone()[0], len(players))
+
+    def test_ingest_paths(self):
+        path = os.path.join(self.dir, 'event.xml')
+        shutil.copy(example('pairs.xml'), path)
+        cwd = os.getcwd()
+        with ThreadPoolExecutor(1) as executor:
+            self.assertEqual(self.archive.ingest([path, os.path.join(self.dir, '.', 'event.xml')], executor), (1, 0))
+            os.chdir(self.dir)
+            try:
+                self.assertEqual(self.archive.ingest(['event.xml'], executor), (0, 0))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(self.archive.db.execute('SELECT file FROM events').fetchall(), [(os.path.realpath(path),)])
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.batch import Journal, JournalEntry, convert_batch, convert_pipelined, get_digest
+from scorer_to_usebio.convert import convert, serialize
+from scorer_to_usebio.converter import Converter
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+class TestBatch(unittest.TestCase):
+    convert = staticmethod(convert_batch)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, 'in')
+        self.output = os.path.join(self.dir, 'out')
+        os.mkdir(self.input)
+        os.mkdir(self.output)
+        self.files = []
+        for name in ['pairs.xml', 'handicap_pairs.xml']:
+            self.files.append(os.path.join(self.input, name))
+            shutil.copy(os.path.join(EXAMPLES_DIR, name), self.files[-1])
+        self.bad = os.path.join(self.input, 'bad.xml')
+        self.write(self.bad, b'<session scoring_type="IMP"/>')
+        self.files.append(self.bad)
+        self.journal_path = os.path.join(self.output, 'journal.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, path, data):
+        with open(path, 'wb') as file:
+            file.write(data)
+
+    def run_batch(self, resume=False, files=None):
+        journal = Journal(self.journal_path)
+        try:
+            with ThreadPoolExecutor(2) as executor:
+                return self.convert(files or self.files, self.output, journal, Converter(), resume, executor)
+        finally:
+            journal.close()
+
+    def read_journal(self):
+        with open(self.journal_path, 'r') as file:
+            return [json.loads(line) for line in file]
+
+    def test_convert_batch(self):
+        self.assertEqual(self.run_batch(), (2, 1, 0))
+        with open(os.path.join(self.output, 'pairs.xml'), 'rb') as file:
+            self.assertEqual(file.read(), serialize(convert(self.files[0])[1]))
+        self.assertFalse(os.path.exists(os.path.join(self.output, 'bad.xml')))
+
+        entries = dict((entry['input'], entry) for entry in self.read_journal())
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[self.files[0]]['status'], 'ok')
+        self.assertEqual(entries[self.files[0]]['digest'], get_digest(self.files[0]))
+        self.assertTrue(entries[self.bad]['status'].startswith('error: InvalidEventType'))
+
+    def test_resume(self):
+        self.run_batch()
+
+        # Only the failure is retried
+        self.assertEqual(self.run_batch(resume=True), (0, 1, 2))
+        self.assertEqual(len(self.read_journal()), 4)
+
+        # Changed or missing outputs are converted again
+        with open(os.path.join(EXAMPLES_DIR, 'pairs-with-np-passed.xml'), 'rb') as file:
+            self.write(self.files[0], file.read())
+        os.remove(os.path.join(self.output, 'handicap_pairs.xml'))
+        self.write(self.bad, b'<session scoring_type="IMP" />')
+        self.assertEqual(self.run_batch(resume=True), (2, 1, 0))
+
+    def test_no_resume(self):
+        self.run_batch()
+        self.assertEqual(self.run_batch(), (2, 1, 0))
+
+    def test_missing_input(self):
+        missing = os.path.join(self.input, 'missing.xml')
+        self.assertEqual(self.run_batch(files=[missing]), (0, 1, 0))
+        self.assertEqual(self.read_journal()[0]['input'], missing)
+
+    def test_truncated_journal(self):
+        self.run_batch()
+        with open(self.journal_path, 'a') as file:
+            file.write('{"input": "in/x.xml", "dig')
+        journal = Journal(self.journal_path)
+        journal.close()
+        self.assertEqual(len(journal.entries), 3)
+        self.assertTrue(journal.is_done(self.files[0], get_digest(self.files[0])))
+        self.assertFalse(journal.is_done(self.bad, get_digest(self.bad)))
+
+    def test_resume_other_path(self):
+
+        # Inputs are recognised however they are given
+        self.run_batch()
+        cwd = os.getcwd()
+        os.chdir(self.input)
+        try:
+            files = [os.path.basename(file) for file in self.files]
+            self.assertEqual(self.run_batch(resume=True, files=files), (0, 1, 2))
+        finally:
+            os.chdir(cwd)
+
+    def test_same_names(self):
+
+        # Files with the same name in different directories keep their
+        # directories, rather than overwriting each other
+        other = os.path.join(self.dir, 'other')
+        os.mkdir(other)
+        files = [self.files[0], os.path.join(other, 'pairs.xml')]
+        shutil.copy(os.path.join(EXAMPLES_DIR, 'handicap_pairs.xml'), files[1])
+        self.assertEqual(self.run_batch(files=files), (2, 0, 0))
+        outputs = [os.path.join(self.output, 'in', 'pairs.xml'), os.path.join(self.output, 'other', 'pairs.xml')]
+        for (file, output) in zip(files, outputs):
+            with open(output, 'rb') as converted:
+                self.assertEqual(converted.read(), serialize(convert(file)[1]))
+        entries = dict((entry['input'], entry['output']) for entry in self.read_journal())
+        self.assertEqual(entries, dict(zip(files, outputs)))
+
+# The pipelined batch should behave just as the plain one does
+class TestPipelinedBatch(TestBatch):
+    convert = staticmethod(convert_pipelined)
+
+    def test_read_ahead(self):
+        # More files than are read ahead at once, each given more than once
+        files = []
+        for name in ['pairs-with-np-passed.xml', 'three_quarter_howell_with_phantom.xml']:
+            files.append(os.path.join(self.input, name))
+            shutil.copy(os.path.join(EXAMPLES_DIR, name), files[-1])
+        journal = Journal(self.journal_path)
+        try:
+            with ThreadPoolExecutor(2) as executor:
+                result = convert_pipelined((self.files + files) * 2, self.output, journal, Converter(), False,
+                                           executor, readahead=2)
+        finally:
+            journal.close()
+        self.assertEqual(result, (4, 1, 0))
+        self.assertEqual(len(self.read_journal()), 5)
+        with open(os.path.join(self.output, 'handicap_pairs.xml'), 'rb') as file:
+            self.assertEqual(file.read(), serialize(convert(self.files[1])[1]))
@@ -0,0 +1,64 @@
+import unittest
+
+from scorer_to_usebio.benchmark import (DEFAULT_TOLERANCES, PHASES, compare, count_travellers, get_workload,
+                                        measure, synthetic_session, time_phases)
+from scorer_to_usebio.convert import ET, Event
+
+def results(relative_throughput, peak_memory, retained_blocks):
+    return dict((phase, {'relative_throughput': relative_throughput, 'peak_memory': peak_memory,
+                         'retained_blocks': retained_blocks})
+                for phase in PHASES)
+
+class TestBenchmark(unittest.TestCase):
+    def test_synthetic_session(self):
+        data = synthetic_session(2, 5, 4)
+        self.assertEqual(data, synthetic_session(2, 5, 4))
+        event = Event.fromxml(ET.fromstring(data))
+        self.assertEqual(sorted(event.session.sections), ['A', 'B'])
+        self.assertEqual(len(event.session.pairs), 20)
+        self.assertEqual(event.session.board_top, 8)
+        self.assertEqual(count_travellers(data), 40)
+
+    def test_workload(self):
+        names = [name for (name, data) in get_workload()]
+        self.assertIn('pairs.xml', names)
+        self.assertIn('synthetic-8x20x32', names)
+
+    def test_measure(self):
+        measured = measure([('small', synthetic_session(1, 3, 2))], repeat=1)
+        self.assertEqual(sorted(measured), sorted(PHASES))
+        for phase in PHASES:
+            self.assertGreater(measured[phase]['relative_throughput'], 0)
+
+    def test_compare(self):
+        (report, regressed) = compare(results(100, 100, 100), results(80, 105, 100), DEFAULT_TOLERANCES)
+        self.assertFalse(regressed)
+        self.assertEqual(len(report), 9)
+
+    def test_compare_regressed(self):
+        (report, regressed) = compare(results(100, 100, 100), results(100, 120, 100), DEFAULT_TOLERANCES)
+        self.assertTrue(regressed)
+        self.assertTrue(report[1].endswith('REGRESSED'))
+        self.assertTrue(report[0].endswith('ok'))
+
+    def test_compare_slower(self):
+        (report, regressed) = compare(results(100, 100, 100), results(70, 100, 100), DEFAULT_TOLERANCES)
+        self.assertTrue(regressed)
+
+    def test_time_phases(self):
+
+        # The reference workload is timed along with the phases
+        (reference, times) = time_phases(synthetic_session(1, 3, 2), 3)
+        self.assertGreater(reference, 0)
+        self.assertEqual(sorted(times), sorted(PHASES))
+        for phase in PHASES:
+            self.assertGreater(times[phase], 0)
+
+    def test_compare_not_recorded(self):
+        baseline = results(100, 100, 100)
+        for phase in PHASES:
+            del baseline[phase]['relative_throughput']
+        (report, regressed) = compare(baseline, results(10, 100, 100), DEFAULT_TOLERANCES)
+        self.assertTrue(regressed)
+        self.assertTrue(report[0].endswith('NOT RECORDED'))
+        self.assertTrue(report[1].endswith('ok'))
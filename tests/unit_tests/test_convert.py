@@ -85,6 +85,30 @@ class TestTraveller(unittest.TestCase):
         self.assertEqual(Traveller.get_trick_count("1 S", "+1"), 8)
         self.assertEqual(Traveller.get_trick_count("1 S", "+6"), 13)
 
+    def test_decode_contract(self):
+        self.assertEqual(Traveller.decode_contract("3 NT x", "-2"), ("3NTx", 7))
+        self.assertEqual(Traveller.decode_contract("N P", ""), ("NP", 0))
+        self.assertEqual(Traveller.decode_contract("", ""), ("", 0))
+        self.assertRaises(InvalidResultsException, Traveller.decode_contract, "1 2 3 4", "=")
+
+    def test_decode_contract_shared(self):
+        clear_caches()
+        first = Traveller.decode_contract("4 S", "+1")
+        self.assertIs(Traveller.decode_contract("4 S", "+1"), first)
+        self.assertEqual(first, ("4S", 11))
+
+    def test_fromxml_interned(self):
+        xml = ET.XML('<result cont="4 S" dec="N" lead="HA" res="=" score="420" mp_ns="30" mp_ew="10"/>')
+        t1 = Traveller.fromxml(xml, '1', '2')
+        t2 = Traveller.fromxml(ET.XML(ET.tostring(xml)), '3', '4')
+        self.assertEqual((t1.contract, t1.tricks, t1.ns_mps, t1.ew_mps), ("4S", 10, Decimal(3), Decimal(1)))
+        self.assertIs(t1.lead, t2.lead)
+        self.assertIs(t1.score, t2.score)
+
+    def test_fromxml_phantom(self):
+        xml = ET.XML('<result cont="" res="" mp_ns="-9999" mp_ew="-9999"/>')
+        self.assertIsNone(Traveller.fromxml(xml, '1', '2'))
+
 class TestSection(unittest.TestCase):
     def test_get_set_pair_id(self):
         section = Section('A', False)
@@ -94,6 +118,39 @@ class TestSection(unittest.TestCase):
         self.assertEqual(section.get_pair_id('ew', 1), 2)
         self.assertRaises(DuplicatePairMapping, section.set_pair_id, 'ns', 1, 1)
 
+class TestResultGrid(unittest.TestCase):
+    def test_add(self):
+        grid = ResultGrid()
+        self.assertEqual(grid.add('1', '1', 1, '1', '1'), ())
+        self.assertEqual(grid.add('1', '1', 2, '1', '1'), ())
+        self.assertEqual(grid.add('1', '2', 3, '2', '2'), ())
+        self.assertRaises(DuplicateResult, grid.add, '1', '1', 2, '1', '1')
+        self.assertEqual(grid.add('2', '1', 3, '1', '3'), ())
+
+        # Entered against the wrong table
+        self.assertEqual(grid.add('2', '1', 4, '2', '2'), (
+            'round 2, table 1: result for 2/2 at the table of 1/3',
+        ))
+
+        # Entered with the wrong pair number
+        self.assertEqual(grid.add('2', '2', 5, '1', '4'), (
+            'round 2: ns pair 1 at tables 1 and 2',
+        ))
+        self.assertEqual(grid.misplaced, {'2': 2})
+
+    def test_missing(self):
+        grid = ResultGrid()
+        for (round, table, board) in [(1, 1, 1), (1, 1, 2), (1, 2, 3), (2, 1, 3), (2, 1, 4), (2, 2, 1), (2, 2, 2),
+                                      (10, 1, 5), (10, 1, 6)]:
+            grid.add(str(round), str(table), board, str(table), str(10 * round + table))
+        self.assertRaises(DuplicateResult, grid.add, '2', '2', 2, '2', '22')
+        self.assertEqual(grid.get_missing(), [('1', '2', 1, 2), ('10', '2', 0, 2)])
+        self.assertEqual(grid.get_summaries(), [
+            RoundSummary('1', 2, 3, 1, 0, 0),
+            RoundSummary('2', 2, 4, 0, 1, 0),
+            RoundSummary('10', 1, 2, 2, 0, 0),
+        ])
+
 class TestSession(unittest.TestCase):
     def test_check_for_duplicates_given_dup_players(self):
         pairs = [pair(id='1'), pair(id='2')]
@@ -118,6 +175,52 @@ class TestSession(unittest.TestCase):
         self.assertEqual(p2[0].id, '(B) 0 NS')
         self.assertEqual(p2[1].id, '(B) 0 EW')
 
+    def test_read_section_boards(self):
+        session = Session()
+        session.sections['A'] = Section('A', False)
+        pairs = [pair(number='1', dir='ns'), pair(number='1', dir='ew', players=(player(3), player(4)))]
+        session.assign_ids(session.sections['A'], pairs)
+        session.read_section_boards('A', [
+            {'bd': '1', 'ns': '1', 'ew': '1', 'cont': '1 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+            {'bd': '2', 'ns': '1', 'ew': '2', 'cont': '1 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+            {'bd': '3', 'ns': '1', 'ew': '2', 'cont': '1 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+            {'bd': '4', 'ns': '1', 'ew': '3', 'cont': '', 'res': '', 'mp_ns': '-9999', 'mp_ew': '-9999'},
+        ])
+        self.assertEqual(pairs[0].boards_played, 3)
+        self.assertEqual(pairs[1].boards_played, 1)
+        self.assertEqual(session.sections['A'].boards[2][0].ew, 'unknown: A')
+        self.assertEqual(session.sections['A'].unknown_pairs, set([('ew', '2')]))
+        if hasattr(self, 'assertLogs'):
+            with self.assertLogs(level='ERROR') as cm:
+                session.report_unknown_pairs()
+            self.assertEqual(len(cm.output), 1)
+
+    def test_read_section_boards_grid(self):
+        results = [
+            {'rnd': '1', 'tab': '1', 'bd': '1', 'ns': '1', 'ew': '1', 'cont': '1 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+            {'rnd': '1', 'tab': '1', 'bd': '2', 'ns': '1', 'ew': '1', 'cont': '1 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+            {'rnd': '1', 'tab': '1', 'bd': '2', 'ns': '1', 'ew': '1', 'cont': '2 NT', 'res': '=', 'mp_ns': '10', 'mp_ew': '10'},
+        ]
+        for strict in [True, False]:
+            session = Session(strict)
+            session.sections['A'] = Section('A', False)
+            pairs = [pair(number='1', dir='ns'), pair(number='1', dir='ew', players=(player(3), player(4)))]
+            session.assign_ids(session.sections['A'], pairs)
+
+            # The duplicate is only warned about (recorded when not strict), and
+            # still used
+            session.read_section_boards('A', results)
+            self.assertEqual(pairs[0].boards_played, 3)
+            self.assertEqual(session.problems, [] if strict else [
+                Problem('warning', 'duplicate result for round 1, table 1, board 2', 'A', '2', None),
+            ])
+
+            # The grid is only kept until the section has been checked
+            self.assertIn('A', session.grids)
+            session.check_grids()
+            self.assertEqual(session.grids, {})
+            self.assertEqual(list(session.get_round_summaries().items()), [('A', [RoundSummary('1', 1, 2, 0, 1, 0)])])
+
     def test_fixup_scores(self):
         session = Session()
         session.sections['A'] = Section('A', False)
@@ -141,6 +244,9 @@ class TestSession(unittest.TestCase):
         self.assertEqual(session.sections['A'].boards[1][5].score, 'A5050')
         self.assertEqual(session.sections['A'].boards[1][6].score, 'A5252')
 
+        # Only logged when strict
+        self.assertEqual(session.problems, [])
+
     def test_fixup_places_single_winner(self):
         session = Session()
         self.add_pairs(session, None, "0/3", "2/3", "1/3", "1/3")
@@ -180,6 +286,21 @@ class TestEvent(unittest.TestCase):
         xml = ET.XML('<session type="foo"/>')
         self.assertRaises(InvalidEventType, Event.fromxml, xml)
 
+    def test_places(self):
+        session = Session()
+        for (number, mps, place) in (('1', '1/3', 1), ('2', '2/3', 1)):
+            pr = pair(id=number, number=number, mps=mps, players=(player(number), player(number)))
+            pr.score = Score(place, None, None, None, None)
+            pr.boards_played = int(number)
+            session.pairs[pr.id] = pr
+        event = Event("", 1, 'PAIRS', None, "", "", session)
+
+        # Scorer's places are replaced as soon as the event is created, not
+        # only once they are first asked for
+        self.assertEqual(session.pairs['1'].score.place, 2)
+        self.assertEqual(event.places, {'1': 2, '2': 1})
+        self.assertEqual(event.max_boards, 2)
+
     def test_get_pair_key(self):
         self.assertEqual(Event.get_pair_key(pair(number='1', dir='ns'), False), (None, 1))
         self.assertEqual(Event.get_pair_key(pair(number='1', dir='ns'), True), (False, 1))
@@ -0,0 +1,107 @@
+import logging
+import os
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.convert import InvalidEventType, convert, serialize
+from scorer_to_usebio.converter import Converter, Diagnostic, diagnostics_handler
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+UNKNOWN_PAIR = b'''<session club="Club" club_no="1" scoring_type="MP" event_name="Test" event_date="1/1/2016">
+  <sections><section sectid="A"/></sections>
+  <board_results>
+    <brsection id="A">
+      <result bd="1" ns="1" ew="2" cont="1 NT" res="=" score="90" mp_ns="20" mp_ew="0"/>
+      <result bd="1" ns="2" ew="3" cont="1 NT" res="=" score="90" mp_ns="0" mp_ew="20"/>
+    </brsection>
+  </board_results>
+  <scores>
+    <scsection id="A">
+      <pair player_name_1="a" player_name_2="b" match_points="2/4" dir="" no="1" nzb_no_1="1" nzb_no_2="2" res="50" raw_score="50" handicap="0"/>
+      <pair player_name_1="c" player_name_2="d" match_points="2/4" dir="" no="2" nzb_no_1="3" nzb_no_2="4" res="50" raw_score="50" handicap="0"/>
+    </scsection>
+  </scores>
+</session>'''
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def examples():
+    return [example(name) for name in sorted(os.listdir(EXAMPLES_DIR))]
+
+class TestConverter(unittest.TestCase):
+    def test_invalid_pool(self):
+        self.assertRaises(ValueError, Converter, pool='fork')
+
+    def test_convert(self):
+        result = Converter().convert(example('pairs.xml'))
+        self.assertIsNone(result.error)
+        self.assertEqual(result.name, example('pairs.xml'))
+        self.assertEqual(result.output, serialize(convert(example('pairs.xml'))[1]))
+        self.assertEqual(result.diagnostics, [])
+
+    def test_timings(self):
+        result = Converter().convert(example('pairs.xml'))
+        self.assertEqual(sorted(result.timings), ['model', 'output', 'parse'])
+        self.assertEqual(result.input_size, os.path.getsize(example('pairs.xml')))
+
+        # Only the phases run are timed
+        result = Converter().convert(b'<session scoring_type="IMP"/>')
+        self.assertEqual(sorted(result.timings), ['model', 'parse'])
+        self.assertEqual(result.input_size, 29)
+
+    def test_convert_bytes(self):
+        with open(example('pairs.xml'), 'rb') as file:
+            result = Converter().convert(file.read())
+        self.assertIsNone(result.name)
+        self.assertEqual(result.event.event_name, 'Monday Afternoon November Pairs')
+
+    def test_convert_error(self):
+        result = Converter().convert(b'<session scoring_type="IMP"/>')
+        self.assertIsInstance(result.error, InvalidEventType)
+        self.assertIsNone(result.output)
+
+    def test_diagnostics(self):
+        inputs = [UNKNOWN_PAIR, example('pairs.xml')] * 4
+        with ThreadPoolExecutor(4) as executor:
+            results = list(Converter().convert_many(inputs, executor))
+
+        # Diagnostics are only recorded against the conversion that raised them
+        for result in results[0::2]:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.diagnostics, [
+                Diagnostic('ERROR', 'unknown pair IDs in section A: 3 ew'),
+            ])
+        for result in results[1::2]:
+            self.assertEqual(result.diagnostics, [])
+
+    def test_diagnostics_handler_detached(self):
+
+        # Outside a conversion the package's logger is left alone, so problems
+        # reach logging's last resort handler when logging isn't configured
+        logger = logging.getLogger('scorer_to_usebio')
+        self.assertNotIn(diagnostics_handler, logger.handlers)
+        with diagnostics_handler.capture():
+            self.assertIn(diagnostics_handler, logger.handlers)
+        self.assertNotIn(diagnostics_handler, logger.handlers)
+        Converter().convert(UNKNOWN_PAIR)
+        self.assertNotIn(diagnostics_handler, logger.handlers)
+
+    def test_convert_many_ordered(self):
+        inputs = examples()
+        with ThreadPoolExecutor(3) as executor:
+            results = list(Converter().convert_many(inputs, executor))
+        self.assertEqual([result.name for result in results], inputs)
+
+    def test_convert_many_unordered(self):
+        inputs = examples()
+        results = list(Converter(workers=2).convert_many(inputs, ordered=False))
+        self.assertEqual(sorted(result.name for result in results), inputs)
+
+    def test_convert_many_processes(self):
+        inputs = examples()[:2]
+        results = list(Converter(pool='process', workers=2).convert_many(inputs))
+        self.assertEqual([result.output for result in results],
+                         [serialize(convert(input)[1]) for input in inputs])
@@ -0,0 +1,88 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+from scorer_to_usebio.aggregate import aggregate
+from scorer_to_usebio.convert import ET, Event
+from scorer_to_usebio.diff import Difference, diff_events, diff_usebio, format_difference, get_fields, main
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.root = ET.parse(example('pairs.xml')).getroot()
+        self.usebio = Event.fromxml(self.root).get_usebio_xml()
+
+    def test_fields(self):
+        pair = ET.fromstring('<PAIR><PAIR_NUMBER>1</PAIR_NUMBER><PLAYER><PLAYER_NAME>A</PLAYER_NAME></PLAYER>'
+                             '<PLAYER><PLAYER_NAME>B</PLAYER_NAME></PLAYER></PAIR>')
+        self.assertEqual(list(get_fields(pair).items()), [
+            ('PAIR_NUMBER', '1'), ('PLAYER[1]/PLAYER_NAME', 'A'), ('PLAYER[2]/PLAYER_NAME', 'B')])
+
+    def test_same(self):
+        self.assertEqual(diff_usebio(self.usebio, copy.deepcopy(self.usebio)), [])
+
+    def test_reordered(self):
+        # Reordering pairs and traveller lines makes no difference
+        new = copy.deepcopy(self.usebio)
+        participants = new.find('EVENT/PARTICIPANTS')
+        participants[:] = reversed(list(participants))
+        board = new.find('EVENT/BOARD')
+        board[1:] = reversed(list(board)[1:])
+        self.assertEqual(diff_usebio(self.usebio, new), [])
+
+    def test_changes(self):
+        new = copy.deepcopy(self.usebio)
+        pair = new.find('EVENT/PARTICIPANTS/PAIR')
+        pair.find('PLACE').text = '99'
+        board = new.find('EVENT/BOARD')
+        (first, second) = board.findall('TRAVELLER_LINE')[:2]
+        first.find('SCORE').text = '-50'
+        board.remove(second)
+        new.find('EVENT/EVENT_DESCRIPTION').text = 'Corrected'
+
+        key = (board.findtext('BOARD_NUMBER'), second.findtext('NS_PAIR_NUMBER'), second.findtext('EW_PAIR_NUMBER'))
+        diffs = diff_usebio(self.usebio, new)
+        self.assertEqual([diff[:3] for diff in diffs], [
+            ('event', None, 'EVENT/EVENT_DESCRIPTION'),
+            ('pair', pair.findtext('PAIR_NUMBER'), 'PLACE'),
+            ('traveller', ('1', first.findtext('NS_PAIR_NUMBER'), first.findtext('EW_PAIR_NUMBER')), 'SCORE'),
+            ('traveller', key, None)])
+        self.assertEqual(diffs[3].new, None)
+        self.assertEqual(format_difference(diffs[1]), "pair 1 NS: PLACE: '10' -> '99'")
+        self.assertEqual(format_difference(diffs[3]), 'board {} {} v {}: removed'.format(*key))
+
+    def test_event_participants(self):
+
+        # Aggregated events have their pairs at the event level, but boards in
+        # the sections (one per session)
+        old = aggregate([Event.fromxml(self.root), Event.fromxml(self.root)]).get_usebio_xml()
+        self.assertIsNotNone(old.find('EVENT/SECTION'))
+        new = copy.deepcopy(old)
+        pair = new.find('EVENT/PARTICIPANTS/PAIR')
+        pair.find('PLACE').text = '99'
+        diffs = diff_usebio(old, new)
+        self.assertEqual([diff[:3] for diff in diffs], [('pair', pair.findtext('PAIR_NUMBER'), 'PLACE')])
+
+    def test_events(self):
+        # A corrected result moves MPs (and so places) between the pairs
+        new = copy.deepcopy(self.root)
+        result = new.find('./board_results/brsection/result')
+        result.set('mp_ns', '240')
+        diffs = diff_events(Event.fromxml(self.root), Event.fromxml(new))
+        self.assertIn(Difference('traveller', ('1', '1 NS', '1 EW'), 'NS_MATCH_POINTS', '16', '24'), diffs)
+
+    def test_main(self):
+        dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir)
+        path = os.path.join(dir, 'pairs.xml')
+        ET.ElementTree(self.usebio).write(path)
+        main([path, example('pairs.xml')])
+
+        with self.assertRaises(SystemExit):
+            main([path, example('pairs-with-np-passed.xml')])
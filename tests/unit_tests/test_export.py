@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from scorer_to_usebio.convert import convert
+from scorer_to_usebio.export import StringDictionary, TravellerDataset, main, numpy
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def dataset(*names):
+    dataset = TravellerDataset()
+    for name in names:
+        dataset.add_event(name, convert(example(name))[0])
+    return dataset
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def assertDatasetsEqual(self, first, second):
+        for name in first.columns:
+            self.assertEqual(first.columns[name].tolist(), second.columns[name].tolist(), msg=name)
+        for name in first.dictionaries:
+            self.assertEqual(first.dictionaries[name].values, second.dictionaries[name].values, msg=name)
+
+    def test_string_dictionary(self):
+        dictionary = StringDictionary()
+        self.assertEqual(dictionary.encode(None), 0)
+        self.assertEqual(dictionary.encode('4S'), 1)
+        self.assertEqual(dictionary.encode('3NT'), 2)
+        self.assertEqual(dictionary.encode('4S'), 1)
+        self.assertEqual(dictionary.values, ['', '4S', '3NT'])
+
+    def test_add_event(self):
+        data = dataset('multi-section-multi-movement-pairs.xml')
+        self.assertEqual(len(data), 858)
+        adjusted = [ii for (ii, code) in enumerate(data.columns['adjustment']) if code]
+        self.assertEqual(len(adjusted), 2)
+        self.assertEqual(data.columns['score'][adjusted[0]], 0)
+
+        first = convert(example('multi-section-multi-movement-pairs.xml'))[0].session.sections['A'].boards[1][0]
+        self.assertEqual(data.dictionaries['contracts'].values[data.columns['contract'][0]], first.contract)
+        self.assertEqual(data.dictionaries['pairs'].values[data.columns['ns'][0]], first.ns)
+        self.assertEqual(data.columns['ns_mps'][0], float(first.ns_mps))
+
+    def test_csv(self):
+        data = dataset('pairs.xml', 'handicap_pairs.xml')
+        path = os.path.join(self.dir, 'dataset.csv')
+        data.save(path)
+        self.assertDatasetsEqual(TravellerDataset.load(path), data)
+
+    def test_append(self):
+        path = os.path.join(self.dir, 'dataset.csv')
+        dataset('pairs.xml').save(path)
+        loaded = TravellerDataset.load(path)
+        loaded.add_event('handicap_pairs.xml', convert(example('handicap_pairs.xml'))[0])
+        self.assertDatasetsEqual(loaded, dataset('pairs.xml', 'handicap_pairs.xml'))
+
+    def test_replace(self):
+
+        # Adding a session again replaces its travellers
+        data = dataset('pairs.xml', 'handicap_pairs.xml')
+        data.add_event('pairs.xml', convert(example('pairs.xml'))[0])
+        expected = dataset('handicap_pairs.xml', 'pairs.xml')
+        self.assertEqual(len(data), len(expected))
+        sessions = data.dictionaries['sessions'].values
+        self.assertEqual(sorted(sessions[code] for code in data.columns['session']),
+                         sorted(expected.dictionaries['sessions'].values[code]
+                                for code in expected.columns['session']))
+
+    def test_bad_event(self):
+
+        # A session which fails part way through adds no rows
+        data = dataset('pairs.xml')
+        event = convert(example('handicap_pairs.xml'))[0]
+        next(iter(event.session.sections.values())).boards[1][-1].ns_mps = None
+        self.assertRaises(TypeError, data.add_event, 'handicap_pairs.xml', event)
+        expected = dataset('pairs.xml')
+        for name in expected.columns:
+            self.assertEqual(data.columns[name].tolist(), expected.columns[name].tolist(), msg=name)
+
+    def test_main(self):
+        bad = os.path.join(self.dir, 'bad.xml')
+        with open(bad, 'wb') as file:
+            file.write(b'<session scoring_type="IMP"/>')
+        path = os.path.join(self.dir, 'dataset.csv')
+
+        # Files which can't be read are skipped, and appending a file again
+        # replaces its travellers
+        with self.assertLogs('scorer_to_usebio.export', 'ERROR'):
+            main(['-o', path, example('pairs.xml'), bad])
+        main(['-a', '-o', path, example('pairs.xml'), example('handicap_pairs.xml')])
+        loaded = TravellerDataset.load(path)
+        self.assertEqual(len(loaded), len(dataset('pairs.xml', 'handicap_pairs.xml')))
+        self.assertEqual(loaded.dictionaries['sessions'].values[1], os.path.realpath(example('pairs.xml')))
+
+    @unittest.skipIf(numpy is None, "npz format requires numpy")
+    def test_npz(self):
+        data = dataset('pairs.xml', 'handicap_pairs.xml')
+        path = os.path.join(self.dir, 'dataset.npz')
+        data.save(path)
+        self.assertDatasetsEqual(TravellerDataset.load(path), data)
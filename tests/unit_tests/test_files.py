@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from scorer_to_usebio.files import find_results_files, get_signature, write_atomically
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+class TestFiles(unittest.TestCase):
+    def test_find_results_files(self):
+        files = find_results_files([EXAMPLES_DIR])
+        self.assertEqual([os.path.basename(file) for file in files], sorted(os.listdir(EXAMPLES_DIR)))
+
+    def test_find_results_files_explicit(self):
+        self.assertEqual(find_results_files(['a.txt', EXAMPLES_DIR])[0], 'a.txt')
+
+    def test_get_signature(self):
+        path = os.path.join(EXAMPLES_DIR, 'pairs.xml')
+        self.assertEqual(get_signature(path), get_signature(path))
+        self.assertEqual(get_signature(path)[0], os.path.getsize(path))
+
+    def test_write_atomically(self):
+        dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dir, 'out.xml')
+            with patch('os.fsync', wraps=os.fsync) as fsync:
+                write_atomically(path, b'data')
+
+            # Both the file and (where possible) its directory are synced
+            self.assertEqual(fsync.call_count, 2 if hasattr(os, 'O_DIRECTORY') else 1)
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), b'data')
+            self.assertEqual(os.listdir(dir), ['out.xml'])
+        finally:
+            shutil.rmtree(dir)
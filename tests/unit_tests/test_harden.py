@@ -0,0 +1,64 @@
+import io
+import os
+import unittest
+
+from scorer_to_usebio.convert import ET, InvalidResultsException
+from scorer_to_usebio.converter import Converter
+from scorer_to_usebio.harden import DEFAULT_LIMITS, LimitExceeded, UnsafeInput, parse
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+ENTITIES = b'''<?xml version="1.0"?>
+<!DOCTYPE session [<!ENTITY a "aaaaaaaaaa"><!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>
+<session club="&b;"/>'''
+
+EXTERNAL = b'''<?xml version="1.0"?>
+<!DOCTYPE session [<!ENTITY x SYSTEM "http://example.com/x">]>
+<session club="&x;"/>'''
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def limits(**kwargs):
+    return DEFAULT_LIMITS._replace(**kwargs)
+
+class TestHarden(unittest.TestCase):
+    def test_parse(self):
+        path = example('pairs.xml')
+        self.assertEqual(ET.tostring(parse(path).getroot()), ET.tostring(ET.parse(path).getroot()))
+
+    def test_entities(self):
+        self.assertRaises(UnsafeInput, parse, io.BytesIO(ENTITIES))
+        self.assertRaises(UnsafeInput, parse, io.BytesIO(EXTERNAL))
+
+    def test_unsafe_is_invalid(self):
+        self.assertTrue(issubclass(UnsafeInput, InvalidResultsException))
+
+    def test_max_size(self):
+        path = example('pairs.xml')
+        self.assertRaises(LimitExceeded, parse, path, limits(max_size=1000))
+
+    def test_max_depth(self):
+        data = b'<a>' * 5 + b'</a>' * 5
+        parse(io.BytesIO(data), limits(max_depth=5))
+        self.assertRaises(LimitExceeded, parse, io.BytesIO(data), limits(max_depth=4))
+
+    def test_max_elements(self):
+        data = b'<a><b/><b/><b/></a>'
+        parse(io.BytesIO(data), limits(max_elements=4))
+        self.assertRaises(LimitExceeded, parse, io.BytesIO(data), limits(max_elements=3))
+
+    def test_max_value_length(self):
+        self.assertRaises(LimitExceeded, parse, io.BytesIO(b'<a x="' + b'x' * 101 + b'"/>'),
+                          limits(max_value_length=100))
+        self.assertRaises(LimitExceeded, parse, io.BytesIO(b'<a>' + b'x' * 101 + b'</a>'),
+                          limits(max_value_length=100))
+
+    def test_invalid_xml(self):
+        self.assertRaises(SyntaxError, parse, io.BytesIO(b'<a>'))
+
+    def test_converter(self):
+        converter = Converter(limits=DEFAULT_LIMITS)
+        self.assertEqual(converter.convert(example('pairs.xml')).output,
+                         Converter().convert(example('pairs.xml')).output)
+        self.assertIsInstance(converter.convert(ENTITIES).error, UnsafeInput)
@@ -0,0 +1,50 @@
+import os
+import time
+import unittest
+
+from scorer_to_usebio.converter import Converter
+from scorer_to_usebio.isolation import IsolatedExecutor, TimeLimitExceeded, WorkerDied
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestIsolation(unittest.TestCase):
+    def test_run(self):
+        with IsolatedExecutor(2) as executor:
+            futures = [executor.submit(pow, 2, n) for n in range(4)]
+            self.assertEqual([future.result() for future in futures], [1, 2, 4, 8])
+
+    def test_error(self):
+        with IsolatedExecutor(1) as executor:
+            self.assertRaises(ZeroDivisionError, executor.submit(divmod, 1, 0).result)
+
+    def test_wall_limit(self):
+        with IsolatedExecutor(2, wall_limit=0.5) as executor:
+            start = time.time()
+            slow = executor.submit(time.sleep, 30)
+            fast = executor.submit(pow, 2, 3)
+            self.assertRaises(TimeLimitExceeded, slow.result)
+            self.assertEqual(fast.result(), 8)
+            self.assertLess(time.time() - start, 10)
+
+    def test_worker_died(self):
+        with IsolatedExecutor(1) as executor:
+            self.assertRaises(WorkerDied, executor.submit(os._exit, 3).result)
+
+    def test_converter(self):
+        self.assertRaises(ValueError, Converter, wall_limit=1)
+
+        inputs = [example('pairs.xml'), example('handicap_pairs.xml')]
+        converter = Converter(pool='process', workers=2, cpu_limit=30, wall_limit=30)
+        results = list(converter.convert_many(inputs))
+        self.assertEqual([result.name for result in results], inputs)
+        self.assertEqual(results[0].output, Converter().convert(inputs[0]).output)
+
+    def test_converter_killed(self):
+        with IsolatedExecutor(1, wall_limit=0.01) as executor:
+            future = executor.submit(time.sleep, 30)
+            result = Converter.get_result(future, 'slow.xml')
+        self.assertEqual(result.name, 'slow.xml')
+        self.assertIsInstance(result.error, TimeLimitExceeded)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.ledger import Ledger, LedgerEntry, read_entries
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def entry(player, club='1', type='c', points=100):
+    return LedgerEntry(player, 'name ' + player, club, 'club ' + club, '1/1/2016', 'event', type, points)
+
+class TestLedger(unittest.TestCase):
+    def test_read_entries(self):
+        entries = read_entries(example('pairs.xml'))
+        self.assertEqual(entries[0], LedgerEntry('1', 'p0_2', '330', 'Palmerston North Bridge Club',
+                                                 '16/11/2015', 'Monday Afternoon November Pairs', 'c', 4000))
+
+        # Players without NZB numbers are skipped
+        self.assertNotIn('0', [entry.player for entry in entries])
+
+    def test_add_remove(self):
+        ledger = Ledger()
+        ledger.add_file('a', [1, 1], [entry('1'), entry('2'), entry('1', club='2', type='a')])
+        ledger.add_file('b', [1, 1], [entry('1', points=50)])
+        self.assertEqual(ledger.get_player_totals(), {'1': {'a': 100, 'c': 150}, '2': {'c': 100}})
+        self.assertEqual(ledger.totals['1'], {'1': {'c': 150}, '2': {'a': 100}})
+
+        # Replacing a file's entries reverses the old ones
+        ledger.add_file('a', [1, 2], [entry('2')])
+        self.assertEqual(ledger.get_player_totals(), {'1': {'c': 50}, '2': {'c': 100}})
+        ledger.remove_file('b')
+        self.assertEqual(ledger.totals, {'2': {'1': {'c': 100}}})
+
+    def test_incremental_update(self):
+        dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dir, 'ledger.json')
+            shutil.copy(example('pairs.xml'), dir)
+            files = [os.path.join(dir, 'pairs.xml')]
+
+            with ThreadPoolExecutor(2) as executor:
+                ledger = Ledger.load(path)
+                self.assertEqual(ledger.update(files, executor), (1, 0))
+                ledger.save(path)
+                totals = ledger.get_player_totals()
+
+                # Nothing has changed, so nothing should be re-read
+                ledger = Ledger.load(path)
+                self.assertEqual(ledger.get_player_totals(), totals)
+                self.assertEqual(ledger.update(files, executor), (0, 0))
+
+                shutil.copy(example('handicap_pairs.xml'), dir)
+                files.append(os.path.join(dir, 'handicap_pairs.xml'))
+                self.assertEqual(ledger.update(files, executor), (1, 0))
+
+                os.unlink(files[1])
+                self.assertEqual(ledger.update(files[:1], executor), (0, 0))
+                self.assertEqual(ledger.get_player_totals(), totals)
+
+                # The same file given by another path, or from another
+                # directory, is the same file
+                other = os.path.join(dir, '.', 'pairs.xml')
+                self.assertEqual(ledger.update([other], executor), (0, 0))
+                cwd = os.getcwd()
+                os.chdir(dir)
+                try:
+                    self.assertEqual(ledger.update(['pairs.xml'], executor), (0, 0))
+                finally:
+                    os.chdir(cwd)
+                self.assertEqual(list(ledger.files), [os.path.realpath(files[0])])
+                self.assertEqual(ledger.get_player_totals(), totals)
+        finally:
+            shutil.rmtree(dir)
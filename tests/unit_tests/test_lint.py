@@ -0,0 +1,169 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.convert import ET, InvalidResultsException, Problem, RoundSummary, Session
+from scorer_to_usebio.lint import check_file, get_junit_xml, lint_file, lint_files, write_json
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+# Several problems: a bad direction, a duplicate pair number, an invalid
+# contract and a result for an unknown pair.
+PROBLEMS = b'''<session club="Club" club_no="1" scoring_type="MP" event_name="Test" event_date="1/1/2016">
+  <sections><section sectid="A"/></sections>
+  <board_results>
+    <brsection id="A">
+      <result bd="1" ns="1" ew="2" cont="1 NT" res="=" score="90" mp_ns="20" mp_ew="0"/>
+      <result bd="2" ns="1" ew="2" cont="1 N T X" res="=" score="90" mp_ns="20" mp_ew="0"/>
+      <result bd="3" ns="1" ew="3" cont="1 NT" res="=" score="90" mp_ns="20" mp_ew="0"/>
+    </brsection>
+  </board_results>
+  <scores>
+    <scsection id="A">
+      <pair player_name_1="a" player_name_2="b" match_points="2/4" dir="" no="1" nzb_no_1="1" nzb_no_2="2" res="50" raw_score="50" handicap="0"/>
+      <pair player_name_1="c" player_name_2="d" match_points="2/4" dir="" no="2" nzb_no_1="3" nzb_no_2="4" res="50" raw_score="50" handicap="0"/>
+      <pair player_name_1="g" player_name_2="h" match_points="2/4" dir="" no="2" nzb_no_1="7" nzb_no_2="8" res="50" raw_score="50" handicap="0"/>
+      <pair player_name_1="e" player_name_2="f" match_points="2/4" dir="S" no="3" nzb_no_1="5" nzb_no_2="6" res="50" raw_score="50" handicap="0"/>
+    </scsection>
+  </scores>
+</session>'''
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestLint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.problems = os.path.join(self.dir, 'problems.xml')
+        with open(self.problems, 'wb') as file:
+            file.write(PROBLEMS)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_strict(self):
+        root = ET.fromstring(PROBLEMS)
+        self.assertRaises(InvalidResultsException, Session.fromxml, root)
+
+    def test_lint_file(self):
+        self.assertEqual(lint_file(self.problems), [
+            Problem('error', "invalid/unknown direction 'S'", 'A', None, '3'),
+            Problem('error', 'duplicate mapping for 2 ns: 2/2', 'A', None, '2'),
+            Problem('error', 'duplicate mapping for 2 ew: 2/2', 'A', None, '2'),
+            Problem('error', 'invalid contract: 1 N T X', 'A', '2', None),
+            Problem('warning', "unknown pair ID '3' for ew", 'A', '3', None),
+        ])
+
+    def test_lint_clean(self):
+        self.assertEqual(lint_file(example('pairs.xml')), [])
+
+    def test_lint_invalid_xml(self):
+        path = os.path.join(self.dir, 'invalid.xml')
+        with open(path, 'w') as file:
+            file.write('<session')
+        problems = lint_file(path)
+        self.assertEqual(len(problems), 1)
+        self.assertEqual(problems[0].level, 'error')
+
+    def test_lint_missing_attributes(self):
+        path = os.path.join(self.dir, 'missing.xml')
+        with open(path, 'wb') as file:
+            file.write(PROBLEMS.replace(b' cont="1 NT" res="=" score="90" mp_ns="20"', b' res="=" score="90"', 1)
+                               .replace(b' match_points="2/4" dir="" no="1"', b' dir="" no="1"'))
+
+        # Each is reported where it was found, and the rest still checked
+        problems = lint_file(path)
+        self.assertIn(Problem('error', 'missing attribute(s): match_points', 'A', None, '1'), problems)
+        self.assertIn(Problem('error', 'missing attribute(s): cont, mp_ns', 'A', '1', None), problems)
+        self.assertIn(Problem('error', 'invalid contract: 1 N T X', 'A', '2', None), problems)
+
+    def test_lint_invalid_mps(self):
+        path = os.path.join(self.dir, 'mps.xml')
+        with open(path, 'wb') as file:
+            file.write(PROBLEMS.replace(b'mp_ns="20" mp_ew="0"', b'mp_ns="20" mp_ew="x"', 1)
+                       .replace(b'ew="3" cont="1 NT" res="=" score="90" mp_ns="20"',
+                                b'ew="3" cont="1 NT" res="=" score="90" mp_ns="NaN"'))
+
+        # The attribute, board and value are all given
+        problems = lint_file(path)
+        self.assertIn(Problem('error', "invalid mp_ew for board 1: 'x'", 'A', '1', None), problems)
+        self.assertIn(Problem('error', "invalid mp_ns for board 3: 'NaN'", 'A', '3', None), problems)
+
+    def test_lint_zero_top(self):
+        path = os.path.join(self.dir, 'top.xml')
+        with open(path, 'wb') as file:
+            file.write(PROBLEMS.replace(b'score="90" mp_ns="20"', b'score="Adj" mp_ns="0"'))
+
+        # Adjustments can't be calculated, but only those boards are affected
+        problems = lint_file(path)
+        self.assertIn(Problem('error', "board top is zero: can't calculate adjustment for 1/2", 'A', '1', None),
+                      problems)
+        self.assertIn(Problem('error', 'invalid contract: 1 N T X', 'A', '2', None), problems)
+
+    def test_lint_unsafe(self):
+        path = os.path.join(self.dir, 'unsafe.xml')
+        with open(path, 'wb') as file:
+            file.write(b'<!DOCTYPE session [<!ENTITY a "aaaa">]><session scoring_type="MP">&a;</session>')
+        self.assertEqual(lint_file(path), [
+            Problem('error', 'rejected unsafe input: document type declarations are not allowed', None, None, None),
+        ])
+
+    def test_lint_files(self):
+        files = [example('pairs.xml'), self.problems]
+        with ThreadPoolExecutor(2) as executor:
+            results = list(lint_files(files, executor))
+        self.assertEqual([file for (file, problems) in results], files)
+        self.assertEqual(results[1][1], lint_file(self.problems))
+
+    def test_lint_rounds(self):
+        root = ET.parse(example('pairs.xml')).getroot()
+        results = root.find('./board_results/brsection')
+        results.remove(results.findall('result')[-1])
+        moved = results.findall('result')[0]
+        moved.set('rnd', '2')
+        path = os.path.join(self.dir, 'rounds.xml')
+        ET.ElementTree(root).write(path)
+
+        (problems, rounds) = check_file(path)
+        # The moved result takes the table first, so the rest are out of place
+        self.assertEqual([(problem.board, problem.message) for problem in problems], [
+            ('3', 'misplaced result: round 2, table 1: result for 1/13 at the table of 1/1'),
+            ('4', 'misplaced result: round 2, table 1: result for 1/13 at the table of 1/1'),
+            ('5', 'misplaced result: round 2: ew pair 1 at tables 1 and 2'),
+            (None, 'round 1, table 1: 1 of 2 results missing'),
+            (None, 'round 13, table 13: 1 of 2 results missing'),
+        ])
+        self.assertEqual(rounds['A'][0], RoundSummary('1', 13, 25, 1, 0, 0))
+        self.assertEqual(rounds['A'][1], RoundSummary('2', 13, 27, 0, 0, 3))
+
+        output = io.StringIO()
+        write_json([(path, problems)], output, {path: rounds})
+        report = json.loads(output.getvalue())
+        self.assertEqual(report['files'][0]['rounds']['A'][0]['missing'], 1)
+
+    def test_json(self):
+        output = io.StringIO()
+        write_json([(self.problems, lint_file(self.problems))], output)
+        report = json.loads(output.getvalue())
+        self.assertEqual(report['errors'], 4)
+        self.assertEqual(report['warnings'], 1)
+        self.assertEqual(report['files'][0]['problems'][3],
+                         {'level': 'error', 'message': 'invalid contract: 1 N T X',
+                          'section': 'A', 'board': '2', 'pair': None})
+
+    def test_junit(self):
+        root = get_junit_xml([(example('pairs.xml'), []),
+                              (self.problems, lint_file(self.problems))]).getroot()
+        self.assertEqual(root.get('tests'), '2')
+        self.assertEqual(root.get('failures'), '1')
+        cases = root.findall('testcase')
+        self.assertIsNone(cases[0].find('failure'))
+        self.assertEqual(cases[1].find('failure').get('message'),
+                         "section A, pair 3: invalid/unknown direction 'S'")
+        self.assertEqual(cases[1].find('system-out').text,
+                         "section A, board 3: unknown pair ID '3' for ew")
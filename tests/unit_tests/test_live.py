@@ -0,0 +1,149 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from urllib.request import urlopen
+
+from scorer_to_usebio.convert import ET
+from scorer_to_usebio.live import EventStream, Standings, poll, serve_standings
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+# The session as it would be after the given number of rounds had been entered
+def after_round(root, rounds):
+    root = copy.deepcopy(root)
+    for section in root.findall("./board_results/brsection"):
+        for result in section.findall("result"):
+            if int(result.get('rnd')) > rounds:
+                section.remove(result)
+    return root
+
+def get_standings(standings):
+    return dict((pair.id, (pair.mps, pair.top, pair.boards, pair.place)) for pair in standings.pairs.values())
+
+def read_event(response):
+    fields = {}
+    while True:
+        line = response.readline().decode('utf-8').rstrip('\n')
+        if not line:
+            return fields
+        if not line.startswith(':'):
+            (name, value) = line.split(': ', 1)
+            fields[name] = value
+
+class TestLive(unittest.TestCase):
+    def setUp(self):
+        self.root = ET.parse(example('pairs.xml')).getroot()
+
+    def test_final(self):
+        standings = Standings()
+        (kind, snapshot) = standings.update(self.root)
+        self.assertEqual(kind, 'snapshot')
+        self.assertEqual(snapshot['round'], 13)
+
+        # The MPs are as scorer calculated them, and so are the places
+        expected = {}
+        for pair in self.root.findall("./scores/scsection/pair"):
+            expected['A-{}{}'.format(pair.get('dir'), pair.get('no'))] = (pair.get('match_points'), pair.get('place'))
+        self.assertEqual(len(snapshot['pairs']), len(expected))
+        for pair in snapshot['pairs']:
+            (mps, place) = expected[pair['id']]
+            self.assertEqual(int(pair['mps']), int(mps.split('/')[0]))
+            self.assertEqual(pair['place'], int(place))
+
+    def test_incremental(self):
+        standings = Standings()
+        standings.update(after_round(self.root, 0))
+        for rounds in range(1, 14):
+            (kind, delta) = standings.update(after_round(self.root, rounds))
+            self.assertEqual(kind, 'delta')
+            self.assertEqual(delta['round'], rounds)
+
+            # Applying just the new results gives the same as starting afresh
+            fresh = Standings()
+            fresh.update(after_round(self.root, rounds))
+            self.assertEqual(get_standings(standings), get_standings(fresh))
+            self.assertTrue(all('names' not in pair for pair in delta['pairs']))
+
+        self.assertIsNone(standings.update(self.root))
+
+    def test_correction(self):
+        standings = Standings()
+        standings.update(self.root)
+        before = get_standings(standings)
+
+        result = self.root.find("./board_results/brsection/result")
+        (ns_mps, ew_mps) = (result.get('mp_ns'), result.get('mp_ew'))
+        result.set('mp_ns', ew_mps)
+        result.set('mp_ew', ns_mps)
+        (kind, delta) = standings.update(self.root)
+        self.assertEqual(kind, 'delta')
+        self.assertEqual(set(pair['id'] for pair in delta['pairs'] if pair['mps'] != before[pair['id']][0]),
+                         set(['A-N1', 'A-E1']))
+
+        result.set('mp_ns', ns_mps)
+        result.set('mp_ew', ew_mps)
+        standings.update(self.root)
+        self.assertEqual(get_standings(standings), before)
+
+    def test_no_scores(self):
+        root = after_round(self.root, 1)
+        root.remove(root.find('scores'))
+        standings = Standings()
+        (kind, snapshot) = standings.update(root)
+        self.assertEqual(len(snapshot['pairs']), 26)
+
+        # Once the scores are written the pairs get their names
+        (kind, snapshot) = standings.update(after_round(self.root, 1))
+        self.assertEqual(kind, 'snapshot')
+        self.assertTrue(all(pair['names'] for pair in snapshot['pairs']))
+
+    def test_stream(self):
+        stream = EventStream(history=2)
+        self.assertEqual(stream.wait(0, 0), [])
+        for ii in range(3):
+            stream.publish('delta', ii, 'snapshot')
+        self.assertEqual(stream.wait(1, 0), [(2, 'delta', 1), (3, 'delta', 2)])
+        self.assertIsNone(stream.wait(0, 0))
+        self.assertIsNone(stream.wait(4, 0))
+        self.assertEqual(stream.get_snapshot(), (3, 'snapshot'))
+
+    def test_server(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        path = os.path.join(tempdir, 'live.xml')
+        ET.ElementTree(after_round(self.root, 1)).write(path)
+
+        standings = Standings()
+        stream = EventStream()
+        state = poll(path, standings, stream)
+        self.assertEqual(poll(path, standings, stream, state), state)
+
+        server = serve_standings(stream, 0)
+        try:
+            url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+            with urlopen(url + '/standings') as response:
+                self.assertEqual(json.loads(response.read().decode('utf-8'))['round'], 1)
+
+            with urlopen(url + '/events') as response:
+                event = read_event(response)
+                self.assertEqual(event['event'], 'snapshot')
+                self.assertEqual(len(json.loads(event['data'])['pairs']), 26)
+
+                ET.ElementTree(after_round(self.root, 2)).write(path)
+                os.utime(path, (0, 0))
+                threading.Thread(target=poll, args=(path, standings, stream, state)).start()
+                event = read_event(response)
+                self.assertEqual(event['event'], 'delta')
+                self.assertEqual(json.loads(event['data'])['round'], 2)
+        finally:
+            stream.close()
+            server.shutdown()
+            server.server_close()
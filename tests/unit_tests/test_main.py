@@ -0,0 +1,34 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from scorer_to_usebio.__main__ import COMMANDS, get_command
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def test_get_command(self):
+        self.assertEqual(get_command(['scan', 'a.xml']), sys.modules['scorer_to_usebio.metadata'].main)
+        self.assertIsNone(get_command(['a.xml']))
+        self.assertIsNone(get_command([]))
+
+    def test_commands_exist(self):
+        for command in COMMANDS:
+            self.assertTrue(callable(get_command([command])), msg=command)
+
+    def test_file_named_as_command(self):
+
+        # Converted, rather than running the command
+        with open('lint', 'wb'):
+            pass
+        self.assertIsNone(get_command(['lint']))
+        self.assertIsNotNone(get_command(['diff']))
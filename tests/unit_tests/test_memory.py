@@ -0,0 +1,74 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from unittest.mock import patch
+
+from scorer_to_usebio.convert import convert, serialize
+from scorer_to_usebio.memory import MemoryReport, convert_file, estimate_memory, should_stream
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestMemory(unittest.TestCase):
+    def test_estimate_memory(self):
+        self.assertGreater(estimate_memory(1000, 1), estimate_memory(1000, 1, streaming=True))
+        self.assertGreater(estimate_memory(1000, 2), estimate_memory(1000, 1))
+        self.assertGreater(estimate_memory(2000, 1), estimate_memory(1000, 1))
+
+    def test_should_stream(self):
+        path = example('multi-section-multi-movement-pairs.xml')
+        self.assertFalse(should_stream(path, 1024 * 1024 * 1024))
+        with self.assertLogs('scorer_to_usebio.memory', 'WARNING'):
+            self.assertTrue(should_stream(path, 1024))
+
+        # Over budget whole, but not when streamed: no warning
+        size = os.path.getsize(path)
+        budget = (estimate_memory(size, 2) + estimate_memory(size, 2, streaming=True)) // 2
+        with patch('scorer_to_usebio.memory.logger') as logger:
+            self.assertTrue(should_stream(path, budget))
+        logger.warning.assert_not_called()
+
+        # Only pairs events can be streamed
+        with tempfile.NamedTemporaryFile(suffix='.xml') as file:
+            file.write(b'<session scoring_type="IMP"><sections><section sectid="A"/></sections></session>')
+            file.flush()
+            self.assertFalse(should_stream(file.name, 1))
+
+    def test_convert_file(self):
+        path = example('multi-section-multi-movement-pairs.xml')
+        expected = serialize(convert(path)[1])
+        for streaming in [False, True]:
+            (event, tree) = convert_file(path, streaming=streaming)
+            self.assertEqual(serialize(tree), expected)
+
+    def test_report(self):
+        path = example('pairs.xml')
+        report = MemoryReport()
+        convert_file(path, report=report)
+        self.assertEqual([phase[0] for phase in report.phases], ['dom', 'model', 'output'])
+        for (name, peak, retained) in report.phases:
+            self.assertGreaterEqual(peak, retained)
+            self.assertGreater(retained, 0)
+        self.assertEqual(len(report.format().splitlines()), 3)
+
+    def test_report_streaming(self):
+        report = MemoryReport()
+        convert_file(example('pairs.xml'), streaming=True, report=report)
+        self.assertEqual([phase[0] for phase in report.phases], ['stream', 'output'])
+
+    def test_report_tracing(self):
+        # Tracing that was already running is left running
+        tracemalloc.start()
+        try:
+            report = MemoryReport()
+            convert_file(example('pairs.xml'), report=report)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        for (name, peak, retained) in report.phases:
+            self.assertGreaterEqual(peak, retained)
+            self.assertGreater(retained, 0)
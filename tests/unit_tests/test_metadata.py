@@ -0,0 +1,69 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from scorer_to_usebio.files import get_default_filename
+from scorer_to_usebio.metadata import EventMetadata, SectionMetadata, main, scan
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class ReadCountingFile(io.BytesIO):
+    def __init__(self, data):
+        io.BytesIO.__init__(self, data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = io.BytesIO.read(self, size)
+        self.bytes_read += len(data)
+        return data
+
+class TestMetadata(unittest.TestCase):
+    def test_scan(self):
+        metadata = scan(example('multi-section-multi-movement-pairs.xml'))
+        self.assertEqual(metadata, EventMetadata('Palmerston North Bridge Club', '330', 'MP', 'PN Christmas Cheer',
+                                                 '5/12/2015', 'Morning', [
+                                                     SectionMetadata('A', 13),
+                                                     SectionMetadata('B', 13),
+                                                     SectionMetadata('C', 7),
+                                                 ]))
+        self.assertEqual(get_default_filename(metadata), '5-12-2015-PN_Christmas_Cheer.xml')
+
+    def test_stops_at_results(self):
+        with open(example('multi-section-multi-movement-pairs.xml'), 'rb') as file:
+            data = file.read()
+        file = ReadCountingFile(data)
+        scan(file)
+        self.assertLess(file.bytes_read, len(data) // 10)
+
+    def test_no_results(self):
+        metadata = scan(io.BytesIO(b'<session event_name="x"><sections><section sectid="A"/></sections></session>'))
+        self.assertEqual(metadata.event_name, 'x')
+        self.assertEqual(metadata.sections, [SectionMetadata('A', None)])
+
+    def test_default_filename(self):
+
+        # Named for the input if the event's date or name is missing
+        metadata = scan(io.BytesIO(b'<session event_name="x"><sections/></session>'))
+        self.assertEqual(get_default_filename(metadata, os.path.join('dir', 'in.txt')), 'in.xml')
+
+    def test_main_missing_header(self):
+        path = os.path.join(tempfile.mkdtemp(), 'in.xml')
+        try:
+            with open(path, 'wb') as file:
+                file.write(b'<session><sections><section sectid="A"/></sections></session>')
+            output = io.StringIO()
+            with patch('sys.stdout', output):
+                main([path])
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        self.assertEqual(output.getvalue().splitlines()[1].split(',')[-1], 'in.xml')
+
+    def test_invalid(self):
+        self.assertRaises(SyntaxError, scan, io.BytesIO(b''))
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from scorer_to_usebio.convert import convert
+from scorer_to_usebio.converter import Converter
+from scorer_to_usebio.metrics import Histogram, Metrics, MetricsExporter, serve_metrics
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        converter = Converter()
+        self.metrics.record(converter.convert(example('pairs.xml')))
+        self.metrics.record(converter.convert(example('handicap_pairs.xml')))
+        self.metrics.record(converter.convert(b'<session scoring_type="IMP"/>'))
+
+    def test_histogram(self):
+        histogram = Histogram([1, 2, float('inf')])
+        for value in [0.5, 1.5, 1.5, 3]:
+            histogram.observe(value)
+        self.assertEqual(histogram.get_buckets(), [(1, 1), (2, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 6.5)
+
+    def test_snapshot(self):
+        snapshot = self.metrics.get_snapshot()
+        event = convert(example('pairs.xml'))[0]
+        self.assertEqual(snapshot['files_converted'], 2)
+        self.assertEqual(snapshot['files_failed'], {'InvalidEventType': 1})
+        self.assertEqual(snapshot['travellers'], 338 + 198)
+        self.assertGreater(snapshot['pairs'], len(event.session.pairs))
+        self.assertEqual(snapshot['input_bytes'], os.path.getsize(example('pairs.xml')) +
+                         os.path.getsize(example('handicap_pairs.xml')) + 29)
+        self.assertEqual(snapshot['phase_seconds']['parse']['count'], 3)
+        self.assertEqual(snapshot['phase_seconds']['output']['count'], 2)
+
+    def test_prometheus_text(self):
+        text = self.metrics.get_prometheus_text()
+        lines = text.splitlines()
+        self.assertIn('# TYPE scorer_to_usebio_files_converted_total counter', lines)
+        self.assertIn('scorer_to_usebio_files_converted_total 2', lines)
+        self.assertIn('scorer_to_usebio_files_failed_total{exception="InvalidEventType"} 1', lines)
+        self.assertIn('scorer_to_usebio_phase_seconds_bucket{phase="parse",le="+Inf"} 3', lines)
+        self.assertIn('scorer_to_usebio_phase_seconds_count{phase="model"} 3', lines)
+
+    def test_exporter(self):
+        dir = tempfile.mkdtemp()
+        try:
+            prometheus = os.path.join(dir, 'metrics.prom')
+            snapshots = os.path.join(dir, 'metrics.jsonl')
+            exporter = MetricsExporter(self.metrics, prometheus, snapshots, interval=60)
+            exporter.start()
+            exporter.stop()
+            with open(prometheus, 'r') as file:
+                self.assertEqual(file.read(), self.metrics.get_prometheus_text())
+            with open(snapshots, 'r') as file:
+                self.assertEqual(json.loads(file.readline())['files_converted'], 2)
+        finally:
+            shutil.rmtree(dir)
+
+    def test_serve(self):
+        server = serve_metrics(self.metrics, 0)
+        try:
+            url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+            with urlopen(url + '/metrics') as response:
+                self.assertEqual(response.read().decode('utf-8'), self.metrics.get_prometheus_text())
+            self.assertRaises(HTTPError, urlopen, url + '/other')
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,120 @@
+try:
+    import lxml.etree as ET
+except ImportError:
+    try:
+        import xml.etree.cElementTree as ET
+    except ImportError:
+        import xml.etree.ElementTree as ET
+
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.convert import DuplicatePairMapping, InvalidEventType, convert
+from scorer_to_usebio.parallel import convert_parallel, read_section_data
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestParallel(unittest.TestCase):
+    def test_read_section_data(self):
+        path = example('multi-section-multi-movement-pairs.xml')
+        (root, sections, declaration, data) = read_section_data(path)
+        self.assertEqual(root['event_name'], 'PN Christmas Cheer')
+        self.assertEqual(declaration, b'<?xml version="1.0"?>')
+        self.assertEqual([section['sectid'] for section in sections], ['A', 'B', 'C'])
+        self.assertEqual([sdata.id for sdata in data], ['A', 'B', 'C'])
+
+        # Each section's results and scores are sent as byte ranges of the file
+        with open(path, 'rb') as file:
+            contents = file.read()
+        fragments = [ET.fromstring(contents[start:end]) for sdata in data for (start, end) in sdata.fragments]
+        self.assertEqual([(elem.tag, elem.get('id')) for elem in fragments], [
+            ('brsection', 'A'), ('scsection', 'A'), ('brsection', 'B'), ('scsection', 'B'),
+            ('brsection', 'C'), ('scsection', 'C'),
+        ])
+        self.assertEqual(sum(len(elem.findall('result')) for elem in fragments), 858)
+
+    def test_read_section_data_stream(self):
+
+        # The fragments themselves are sent if workers can't read the file
+        with open(example('pairs.xml'), 'rb') as file:
+            (root, sections, declaration, data) = read_section_data(file)
+        self.assertEqual([ET.fromstring(fragment).tag for fragment in data[0].fragments], ['brsection', 'scsection'])
+
+    def test_result_outside_section(self):
+
+        # Ignored, as when converting serially
+        with open(example('multi-section-multi-movement-pairs.xml'), 'rb') as file:
+            contents = file.read()
+        contents = contents.replace(b'<board_results>', b'<board_results><result bd="1" ns="1" ew="1"/>', 1)
+        with ThreadPoolExecutor(2) as executor:
+            tree = convert_parallel(io.BytesIO(contents), executor=executor)[1]
+        self.assertEqual(ET.tostring(tree.getroot()),
+                         ET.tostring(convert(example('multi-section-multi-movement-pairs.xml'))[1].getroot()))
+
+    def test_unclosed_section(self):
+        with open(example('pairs.xml'), 'rb') as file:
+            contents = file.read()
+        contents = contents[:contents.index(b'</brsection>')]
+        self.assertRaises(SyntaxError, read_section_data, io.BytesIO(contents))
+
+    def test_invalid_scoring_type(self):
+        self.assertRaises(InvalidEventType, read_section_data, io.BytesIO(b'<session scoring_type="IMP"/>'))
+
+    def test_matches_convert(self):
+        with ThreadPoolExecutor(2) as executor:
+            for name in sorted(os.listdir(EXAMPLES_DIR)):
+                tree = convert_parallel(example(name), executor=executor)[1]
+                expected = convert(example(name))[1]
+                self.assertEqual(ET.tostring(tree.getroot()), ET.tostring(expected.getroot()), msg=name)
+
+    def test_worker_processes(self):
+        path = example('multi-section-multi-movement-pairs.xml')
+        tree = convert_parallel(path, jobs=2)[1]
+        self.assertEqual(ET.tostring(tree.getroot()), ET.tostring(convert(path)[1].getroot()))
+
+    def test_single_worker(self):
+        path = example('multi-section-multi-movement-pairs.xml')
+        tree = convert_parallel(path, jobs=1)[1]
+        self.assertEqual(ET.tostring(tree.getroot()), ET.tostring(convert(path)[1].getroot()))
+
+    def test_worker_warnings(self):
+
+        # Warnings from the workers are logged by the caller, e.g. so a
+        # Converter includes them in its diagnostics
+        with open(example('multi-section-multi-movement-pairs.xml'), 'rb') as file:
+            contents = file.read()
+        contents = contents.replace(b'tab="1" bd="2" rnd="1"', b'tab="1" bd="2" rnd="2"', 1)
+        path = os.path.join(tempfile.mkdtemp(), 'misplaced.xml')
+        try:
+            with open(path, 'wb') as file:
+                file.write(contents)
+            with self.assertLogs('scorer_to_usebio.convert', 'WARNING') as logs:
+                convert_parallel(path, jobs=2)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        self.assertTrue(any('misplaced result' in message for message in logs.output))
+
+    def test_utf16(self):
+
+        # Sections can't be found by searching the bytes, so it's parsed whole
+        path = example('multi-section-multi-movement-pairs.xml')
+        with open(path, 'rb') as file:
+            contents = file.read().decode('utf-8')
+        contents = contents.replace('<?xml version="1.0"?>', '<?xml version="1.0" encoding="UTF-16"?>', 1)
+        with ThreadPoolExecutor(2) as executor:
+            tree = convert_parallel(io.BytesIO(contents.encode('utf-16')), executor=executor)[1]
+        self.assertEqual(ET.tostring(tree.getroot()), ET.tostring(convert(path)[1].getroot()))
+
+    def test_exceptions_pickle(self):
+        exc = pickle.loads(pickle.dumps(DuplicatePairMapping('ns', '1', '1 NS', '2 NS')))
+        self.assertIsInstance(exc, DuplicatePairMapping)
+        self.assertEqual(str(exc), "duplicate mapping for 1 ns: 1 NS/2 NS")
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer_to_usebio.convert import ET, convert
+from scorer_to_usebio.regression import canonicalize, compare, diff_trees, get_digest, get_digests
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class TestRegression(unittest.TestCase):
+    def test_canonicalize(self):
+        a = ET.ElementTree(ET.fromstring('<a y="2" x="1"><b/></a>'))
+        b = ET.ElementTree(ET.fromstring('<a x="1" y="2"><b></b></a>'))
+        self.assertEqual(canonicalize(a), canonicalize(b))
+
+    def test_digest(self):
+        output = canonicalize(convert(example('pairs.xml'))[1])
+        self.assertEqual(get_digest(example('pairs.xml')), hashlib.sha256(output).hexdigest())
+
+    def test_digest_error(self):
+        path = example('missing.xml')
+        self.assertTrue(get_digest(path).startswith('error: '))
+
+    def test_digests(self):
+        dir = tempfile.mkdtemp()
+        try:
+            files = [example('pairs.xml'), example('handicap_pairs.xml')]
+            with ThreadPoolExecutor(2) as executor:
+                digests = get_digests(EXAMPLES_DIR, files, executor, dir)
+            self.assertEqual(sorted(digests), ['handicap_pairs.xml', 'pairs.xml'])
+            with open(os.path.join(dir, 'pairs.xml'), 'rb') as file:
+                self.assertEqual(hashlib.sha256(file.read()).hexdigest(), digests['pairs.xml'])
+        finally:
+            shutil.rmtree(dir)
+
+    def test_compare(self):
+        manifest = {'a.xml': '1', 'b.xml': '2', 'c.xml': '3'}
+        digests = {'a.xml': '1', 'b.xml': '4', 'd.xml': '5'}
+        self.assertEqual(compare(manifest, digests), (['b.xml'], ['d.xml'], ['c.xml']))
+
+    def test_diff_trees(self):
+        expected = ET.fromstring('<a><b>1</b><b x="1">2</b><c/></a>')
+        actual = ET.fromstring('<a><b>1</b><b x="2">3</b><b/></a>')
+        self.assertEqual(diff_trees(expected, actual), [
+            "/a/b[2]: '2' != '3'",
+            "/a/b[2]/@x: '1' != '2'",
+            '/a/b[3]: unexpected',
+            '/a/c[1]: missing',
+        ])
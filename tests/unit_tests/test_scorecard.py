@@ -0,0 +1,57 @@
+import io
+import os
+import unittest
+
+from decimal import Decimal
+
+from scorer_to_usebio.convert import Traveller, convert
+from scorer_to_usebio.scorecard import ScorecardLine, get_scorecard_line, get_scorecards, write_csv, write_html
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+class Pair(object):
+    def __init__(self, id):
+        self.id = id
+
+class TestScorecard(unittest.TestCase):
+    def test_get_scorecard_line(self):
+        traveller = Traveller('1', '2', '4S', 'N', 'HA', 10, '-50', Decimal(3), Decimal(1))
+        self.assertEqual(get_scorecard_line(5, Pair('1'), traveller, Decimal(4)),
+                         ScorecardLine(5, 'ns', '2', '4S', 'N', 'HA', 10, '-50', Decimal(3), Decimal('75.00')))
+        self.assertEqual(get_scorecard_line(5, Pair('2'), traveller, Decimal(4)),
+                         ScorecardLine(5, 'ew', '1', '4S', 'N', 'HA', 10, '50', Decimal(1), Decimal('25.00')))
+
+    def test_zero_score(self):
+        traveller = Traveller('1', '2', None, None, None, 0, '0', Decimal(2), Decimal(2))
+        self.assertEqual(get_scorecard_line(1, Pair('2'), traveller, Decimal(4)).score, '0')
+
+    def test_adjusted_score(self):
+        traveller = Traveller('1', '2', None, None, None, 0, 'A6040', Decimal(3), Decimal(2))
+        self.assertEqual(get_scorecard_line(1, Pair('2'), traveller, Decimal(5)).score, 'A6040')
+
+    def test_get_scorecards(self):
+        event = convert(example('multi-section-multi-movement-pairs.xml'))[0]
+        scorecards = get_scorecards(event)
+        self.assertEqual(len(scorecards), len(event.session.pairs))
+        for (pair, lines) in scorecards:
+            self.assertEqual(len(lines), pair.boards_played)
+            self.assertEqual([line.board for line in lines], sorted(line.board for line in lines))
+
+        # Each traveller appears on the scorecards of both pairs that played it
+        total = sum(len(lines) for (pair, lines) in scorecards)
+        travellers = sum(len(travellers) for section in event.session.sections.values()
+                         for travellers in section.boards.values())
+        self.assertEqual(total, travellers * 2)
+
+    def test_write(self):
+        event = convert(example('pairs.xml'))[0]
+        output = io.StringIO()
+        write_csv(event, output)
+        self.assertEqual(output.getvalue().splitlines()[1], '1 NS,1,ns,1 EW,4S,S,H4,12,480,16,66.67')
+
+        output = io.StringIO()
+        write_html(event, output)
+        self.assertIn('<h2>1 NS: p10_1 &amp; p10_2</h2>', output.getvalue())
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from scorer_to_usebio.convert import ET
+from scorer_to_usebio.simultaneous import (FieldResult, iter_travellers, main, matchpoint, read_event, score_board,
+                                           score_field)
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def get_mps(root):
+    return [line.find('NS_MATCH_POINTS').text for line in root.iter('TRAVELLER_LINE')]
+
+# Each pair's (percentage, place), for each group of pairs placed together
+# (i.e. each direction, if there are two winners)
+def get_places(root):
+    two_winners = root.find('EVENT/WINNER_TYPE').text == '2'
+    places = {}
+    for pair in root.iter('PAIR'):
+        group = pair.find('DIRECTION').text if two_winners else None
+        places.setdefault(group, []).append((Decimal(pair.find('PERCENTAGE').text), int(pair.find('PLACE').text)))
+    return places
+
+class TestSimultaneous(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def score(self, files):
+        with ThreadPoolExecutor(2) as executor:
+            return score_field(files, self.dir, executor)
+
+    def test_matchpoint(self):
+        self.assertEqual(matchpoint([100, 200, 200, -50]), ([2, 5, 5, 0], 6))
+        self.assertEqual(matchpoint([420]), ([0], 0))
+        self.assertEqual(matchpoint([]), ([], 0))
+
+    def test_score_board(self):
+        results = [FieldResult(0, 0, 100, None, None), FieldResult(1, 0, None, Decimal(60), Decimal(40)),
+                   FieldResult(1, 1, 50, None, None), FieldResult(0, 1, 100, None, None)]
+        scores = dict(((score.club, score.index), score[2:]) for score in score_board(results))
+        self.assertEqual(scores, {(0, 0): (3, 1, 4), (1, 1): (0, 4, 4), (0, 1): (3, 1, 4),
+                                  (1, 0): (Decimal('2.40'), Decimal('1.60'), 4)})
+
+    def test_single_club(self):
+        # A field of one club is scored just as scorer did
+        event = self.score([example('pairs.xml')])
+        original = read_event(example('pairs.xml'))
+        root = ET.parse(os.path.join(self.dir, '330.xml')).getroot()
+        self.assertEqual(get_mps(root), [str(traveller.ns_mps) for (board, traveller) in iter_travellers(original)])
+        for pair in original.session.pairs.values():
+            self.assertEqual(event.session.pairs['330 ' + pair.id].score.place, int(pair.score.place))
+
+    def test_field(self):
+        files = [example('pairs.xml'), example('pairs.xml'), example('pairs-with-np-passed.xml')]
+        event = self.score(files)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['330-2.xml', '330.xml', '420.xml', 'combined.xml'])
+        self.assertEqual(len(event.session.pairs), 3 * 26)
+
+        # Identical clubs tie throughout, and their boards' tops are from the
+        # whole field
+        first = ET.parse(os.path.join(self.dir, '330.xml')).getroot()
+        self.assertEqual(get_mps(first), get_mps(ET.parse(os.path.join(self.dir, '330-2.xml')).getroot()))
+        for pair in event.session.pairs.values():
+            if pair.id.startswith('330 '):
+                twin = event.session.pairs[pair.id.replace('330 ', '330-2 ', 1)]
+                self.assertEqual(pair.score.place, twin.score.place)
+                self.assertEqual(pair.matchpoints, twin.matchpoints)
+
+        # Each club's pairs are placed by their percentages across the field
+        for name in ['330.xml', '330-2.xml', '420.xml']:
+            for pairs in get_places(ET.parse(os.path.join(self.dir, name)).getroot()).values():
+                pairs.sort(key=lambda pair: pair[0], reverse=True)
+                self.assertEqual(pairs[0][1], 1, msg=name)
+                for ((percentage, place), (prev_percentage, prev_place)) in zip(pairs[1:], pairs):
+                    if percentage == prev_percentage:
+                        self.assertEqual(place, prev_place, msg=name)
+                    else:
+                        self.assertGreater(place, prev_place, msg=name)
+
+        combined = ET.parse(os.path.join(self.dir, 'combined.xml')).getroot()
+        self.assertEqual(combined.find('CLUB/CLUB_NAME').text, 'Simultaneous pairs')
+        self.assertEqual(len(combined.findall('EVENT/PARTICIPANTS/PAIR')), 78)
+        self.assertEqual([section.get('SECTION_ID') for section in combined.findall('EVENT/SECTION')],
+                         ['330', '330-2', '420'])
+        numbers = set(pair.find('PAIR_NUMBER').text for pair in combined.iter('PAIR'))
+        for line in combined.iter('TRAVELLER_LINE'):
+            self.assertIn(line.find('NS_PAIR_NUMBER').text, numbers)
+            self.assertIn(line.find('EW_PAIR_NUMBER').text, numbers)
+
+    def test_main(self):
+        main(['-j', '2', '-n', 'National Simultaneous', '-o', self.dir, example('pairs-with-np-passed.xml')])
+        combined = ET.parse(os.path.join(self.dir, 'combined.xml')).getroot()
+        self.assertEqual(combined.find('EVENT/EVENT_DESCRIPTION').text, 'National Simultaneous')
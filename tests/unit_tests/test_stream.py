@@ -0,0 +1,86 @@
+try:
+    import lxml.etree as ET
+except ImportError:
+    try:
+        import xml.etree.cElementTree as ET
+    except ImportError:
+        import xml.etree.ElementTree as ET
+
+import os
+import unittest
+
+from scorer_to_usebio.convert import InvalidEventType, convert
+from scorer_to_usebio.stream import SessionBuilder, convert_stream
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+SCORES_FIRST = b'''<session club="Club" club_no="1" scoring_type="MP" event_name="Test" event_date="1/1/2016">
+  <sections><section sectid="A"/></sections>
+  <scores>
+    <scsection id="A">
+      <pair player_name_1="a" player_name_2="b" match_points="12/20" dir="" no="1" nzb_no_1="1" nzb_no_2="2" res="60" raw_score="60" handicap="0"/>
+      <pair player_name_1="c" player_name_2="d" match_points="8/20" dir="" no="2" nzb_no_1="3" nzb_no_2="4" res="40" raw_score="40" handicap="0"/>
+    </scsection>
+  </scores>
+  <board_results>
+    <brsection id="A">
+      <result bd="1" ns="1" ew="2" dec="N" cont="1 NT" lead="S2" res="=" score="90" mp_ns="20" mp_ew="0"/>
+    </brsection>
+  </board_results>
+</session>'''
+
+def example(name):
+    return os.path.join(EXAMPLES_DIR, name)
+
+def feed(data, chunk_size):
+    builder = SessionBuilder()
+    for ii in range(0, len(data), chunk_size):
+        builder.feed(data[ii:ii + chunk_size])
+    return builder.close()
+
+class TestSessionBuilder(unittest.TestCase):
+    def test_matches_convert(self):
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            with open(example(name), 'rb') as file:
+                (event, tree) = convert_stream(file, chunk_size=1000)
+            expected = convert(example(name))[1]
+            self.assertEqual(ET.tostring(tree.getroot()), ET.tostring(expected.getroot()), msg=name)
+
+    def test_single_byte_chunks(self):
+        with open(example('three_quarter_howell_with_phantom.xml'), 'rb') as file:
+            data = file.read()
+        event = feed(data, 1)
+        self.assertEqual(event.event_name, 'Monday Summer Bridge Dec 2015')
+        self.assertEqual(len(event.session.pairs), 11)
+
+    def test_scores_before_results(self):
+        event = feed(SCORES_FIRST, 50)
+        pairs = event.session.pairs
+        self.assertEqual(pairs['1'].boards_played, 1)
+        self.assertEqual(pairs['2'].boards_played, 1)
+        self.assertEqual(event.places['1'], 1)
+        traveller = event.session.sections['A'].boards[1][0]
+        self.assertEqual((traveller.ns, traveller.ew, traveller.tricks), ('1', '2', 7))
+
+    def test_elements_discarded(self):
+
+        # Only the elements still being read, and the last of each one's
+        # children, are kept: the rest of the tree is discarded as it is read
+        with open(example('pairs.xml'), 'rb') as file:
+            data = file.read()
+        builder = SessionBuilder()
+        builder.feed(data[:data.rindex(b'</session>')])
+        root = builder.open_elements[0]
+        self.assertEqual([elem.tag for elem in root], ['scores'])
+        self.assertLessEqual(len(list(root.iter())), 3)
+        builder.feed(data[data.rindex(b'</session>'):])
+        self.assertEqual(builder.close().session.pairs.keys(), convert(example('pairs.xml'))[0].session.pairs.keys())
+
+    def test_invalid_scoring_type_fails_early(self):
+        builder = SessionBuilder()
+        self.assertRaises(InvalidEventType, builder.feed, b'<session scoring_type="IMP">')
+
+    def test_invalid_xml(self):
+        builder = SessionBuilder()
+        builder.feed(b'<session scoring_type="MP"><sections>')
+        self.assertRaises(SyntaxError, builder.close)